@@ -0,0 +1,162 @@
+"""Пакетный прогон больших файлов тестовых векторов.
+
+Векторы читаются потоком и обрабатываются пачками по BATCH_VECTORS:
+пачка транспонируется в слова входов (бит i слова — i-й вектор пачки),
+и сгенерированный код схемы считает всю пачку за один проход — каждый
+вентиль одна побитовая операция над словом. Выходы и расхождения с
+ожидаемыми значениями отдаются генераторами, поэтому память не зависит
+от длины файла.
+
+Строка файла: «входы [| ожидаемые выходы]», биты — по входам в порядке
+имен и по выходам в порядке создания; x в ожидаемых — безразличное
+значение, # — комментарий. NumPy не обязателен: он нужен только
+evaluate_matrix для булевых матриц.
+"""
+from itertools import islice
+
+from logic_core import CompiledNetlist
+
+BATCH_VECTORS = 4096  # Векторов в пачке: шире — меньше вызовов, но длиннее слова
+
+
+def parse_vectors(lines):
+    """(номер строки, входы, ожидаемые выходы или None) из строк файла векторов"""
+    for number, line in enumerate(lines, 1):
+        line = line.split("#", 1)[0]
+        inputs, sep, expected = line.partition("|")
+        inputs = inputs.replace(" ", "").strip()
+        if not inputs and not sep: continue
+        yield number, inputs, expected.replace(" ", "").strip().lower() if sep else None
+
+
+def read_vector_file(path):
+    """parse_vectors по файлу, читаемому построчно"""
+    with open(path, encoding="utf-8") as f:
+        yield from parse_vectors(f)
+
+
+class Mismatch:
+    """Вектор, на котором выходы схемы разошлись с ожидаемыми"""
+    __slots__ = ('line', 'inputs', 'expected', 'outputs')
+
+    def __init__(self, line, inputs, expected, outputs):
+        self.line = line
+        self.inputs = inputs
+        self.expected = expected
+        self.outputs = outputs  # '~' — выход колеблется
+
+    def __str__(self):
+        return f"строка {self.line}: {self.inputs} | ожидалось {self.expected}, получено {self.outputs}"
+
+
+class BatchEvaluator:
+    """Прогон векторов пачками через сгенерированный код схемы.
+
+    Тактовые генераторы, как и в таблице истинности, держатся в нуле.
+    check() копит счетчики checked и mismatches по мере чтения.
+    """
+    def __init__(self, netlist, chunk=BATCH_VECTORS):
+        if chunk < 1:
+            raise ValueError("Размер пачки должен быть положительным")
+        self.compiled = CompiledNetlist(netlist, netlist.connections)
+        self.inputs, self.outputs = netlist.ports()
+        self.chunk = chunk
+        index = {g: j for j, g in enumerate(self.inputs)}
+        self.input_slots = [index.get(g) for g in self.compiled.input_order]  # None — тактовый генератор
+        self.output_pos = [self.compiled.position[g] for g in self.outputs]
+        self.checked = 0
+        self.mismatches = 0
+
+    def run_words(self, columns, count):
+        """Слова выходов и маски колебаний; columns — слова входов в порядке имен"""
+        values, bad = self.compiled.run([columns[j] if j is not None else 0 for j in self.input_slots],
+                                        (1 << count) - 1)
+        return [values[p] for p in self.output_pos], [bad[p] for p in self.output_pos]
+
+    def check_vector(self, line, bits, width, what):
+        if len(bits) != width or bits.strip(what):
+            raise ValueError(f"Строка {line}: некорректный вектор {bits!r} (нужно {width} бит из {what})")
+
+    def pack(self, rows):
+        """Слова по столбцам строк из 0/1: бит i слова — символ строки rows[i]"""
+        return [int("".join(column)[::-1], 2) for column in zip(*rows)]
+
+    def unpack(self, words, bad, count):
+        """Строки выходов по векторам пачки; '~' — выход колеблется"""
+        columns = []
+        for word, unstable in zip(words, bad):
+            column = format(word, f"0{count}b")[::-1]
+            if unstable:
+                column = "".join("~" if (unstable >> i) & 1 else c for i, c in enumerate(column))
+            columns.append(column)
+        return ["".join(row) for row in zip(*columns)] if columns else [""] * count
+
+    def chunks(self, records):
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.chunk))
+            if not chunk: return
+            yield chunk
+
+    def evaluate(self, records):
+        """(номер строки, входы, выходы) для каждой записи parse_vectors"""
+        n = len(self.inputs)
+        for chunk in self.chunks(records):
+            for line, bits, _ in chunk:
+                self.check_vector(line, bits, n, "01")
+            words, bad = self.run_words(self.pack([bits for _, bits, _ in chunk]), len(chunk))
+            for (line, bits, _), outputs in zip(chunk, self.unpack(words, bad, len(chunk))):
+                yield line, bits, outputs
+
+    def check(self, records):
+        """Расхождения (Mismatch) с ожидаемыми выходами; записи без них только считаются"""
+        n, m = len(self.inputs), len(self.outputs)
+        for chunk in self.chunks(records):
+            expected = []
+            for line, bits, want in chunk:
+                self.check_vector(line, bits, n, "01")
+                if want is None: want = "x" * m
+                self.check_vector(line, want, m, "01x")
+                expected.append(want)
+            count = len(chunk)
+            words, bad = self.run_words(self.pack([bits for _, bits, _ in chunk]), count)
+            # Ожидаемые значения и маски «не безразлично» — такими же словами по выходам
+            want_words = self.pack([e.replace("x", "0") for e in expected])
+            care_words = self.pack([e.replace("0", "1").replace("x", "0") for e in expected])
+            diff = 0
+            for word, unstable, want, care in zip(words, bad, want_words, care_words):
+                diff |= ((word ^ want) | unstable) & care
+            self.checked += count
+            if not diff: continue
+            outputs = self.unpack(words, bad, count)
+            while diff:
+                low = diff & -diff
+                i = low.bit_length() - 1
+                diff ^= low
+                line, bits, _ = chunk[i]
+                self.mismatches += 1
+                yield Mismatch(line, bits, expected[i], outputs[i])
+
+    def evaluate_matrix(self, matrix):
+        """Булева матрица векторов (строка — вектор, столбец — вход) -> матрицы выходов и колебаний.
+
+        Требует NumPy; матрица обрабатывается целиком, поэтому большие
+        наборы стоит подавать частями.
+        """
+        import numpy as np  # Нужен только здесь
+        matrix = np.asarray(matrix, dtype=bool)
+        if matrix.ndim != 2 or matrix.shape[1] != len(self.inputs):
+            raise ValueError(f"Нужна матрица векторов по {len(self.inputs)} входам, а не {matrix.shape}")
+        count = matrix.shape[0]
+        columns = [int.from_bytes(np.packbits(matrix[:, j], bitorder="little").tobytes(), "little")
+                   for j in range(matrix.shape[1])]
+        words, bad = self.run_words(columns, count)
+        size = (count + 7) // 8
+
+        def to_matrix(words):
+            result = np.zeros((count, len(words)), dtype=bool)
+            for k, word in enumerate(words):
+                bits = np.frombuffer(word.to_bytes(size, "little"), dtype=np.uint8)
+                result[:, k] = np.unpackbits(bits, count=count, bitorder="little")
+            return result
+        return to_matrix(words), to_matrix(bad)
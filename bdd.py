@@ -0,0 +1,521 @@
+"""Символьный анализ схем на ROBDD (сокращенных упорядоченных BDD).
+
+Функция выхода строится как граф решений без перебора 2^n строк: проверка
+эквивалентности выхода выражению или другой схеме, число выполняющих
+наборов и компактная таблица истинности в виде кубов (строк с '-').
+Схемы с контурами обратной связи не поддерживаются.
+"""
+import re
+from array import array
+from collections import OrderedDict
+
+from logic_core import ONE, CompiledNetlist, TruthTable, input_pattern
+
+BDD_CACHE_SIZE = 1 << 16  # Записей в кэше операций (LRU)
+SIFT_MAX_GROWTH = 1.2     # Просеивание бросает направление, когда граф вырос во столько раз
+
+FALSE, TRUE = 0, 1
+
+# Коды операций apply()
+AND, OR, XOR = 0, 1, 2
+
+
+def terminal_case(op, u, v):
+    """Результат op(u, v), если он ясен без разбора по переменной, иначе None"""
+    if op == AND:
+        if u == FALSE or v == FALSE: return FALSE
+        if u == TRUE or u == v: return v
+        if v == TRUE: return u
+    elif op == OR:
+        if u == TRUE or v == TRUE: return TRUE
+        if u == FALSE or u == v: return v
+        if v == FALSE: return u
+    else:
+        if u == v: return FALSE
+        if u == FALSE: return v
+        if v == FALSE: return u
+    return None
+
+
+class BDD:
+    """Менеджер ROBDD: уникальная таблица узлов и кэш операций с вытеснением.
+
+    Узел — целое число: 0 и 1 — терминалы, остальные — индексы в массивах
+    var/low/high. Уровень переменной — ее позиция в names (порядок BDD).
+    """
+    def __init__(self, names, cache_size=BDD_CACHE_SIZE):
+        self.names = list(names)
+        self.level_of = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+        # Терминалы стоят ниже всех переменных
+        self.var = array('l', [n, n])
+        self.low = array('l', [0, 1])
+        self.high = array('l', [0, 1])
+        self.unique = {}            # (уровень, low, high) -> узел
+        self.cache = OrderedDict()  # (операция, u, v) -> узел (LRU)
+        self.cache_size = cache_size
+        # Только на время перестановки уровней (begin_reorder .. end_reorder)
+        self.ref = None             # Число ссылок на узел (родители и корни)
+        self.levels = None          # Уровень -> множество живых узлов
+        self.live = 0               # Число живых внутренних узлов
+
+    def __len__(self):
+        return len(self.var)
+
+    def mk(self, level, low, high):
+        if low == high: return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.var)
+            self.var.append(level)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = node
+        return node
+
+    def variable(self, name):
+        if name not in self.level_of:
+            raise ValueError(f"Неизвестная переменная: {name}")
+        return self.mk(self.level_of[name], FALSE, TRUE)
+
+    def apply(self, op, u, v):
+        """op(u, v) с явным стеком: глубина графа (число переменных) не ограничена рекурсией"""
+        var, low, high, cache = self.var, self.low, self.high, self.cache
+        # Задача (u, v, -1) — разобрать пару; (u, v, уровень) — собрать узел из двух
+        # последних результатов, когда обе половины уже посчитаны
+        stack, results = [(u, v, -1)], []
+        while stack:
+            u, v, level = stack.pop()
+            if level >= 0:
+                high_node = results.pop()
+                node = self.mk(level, results.pop(), high_node)
+                cache[(op, u, v)] = node
+                if len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+                results.append(node)
+                continue
+
+            node = terminal_case(op, u, v)
+            if node is None:
+                if u > v: u, v = v, u  # Все операции коммутативны
+                node = cache.get((op, u, v))
+                if node is not None:
+                    cache.move_to_end((op, u, v))
+            if node is not None:
+                results.append(node)
+                continue
+
+            lu, lv = var[u], var[v]
+            level = min(lu, lv)
+            u0, u1 = (low[u], high[u]) if lu == level else (u, u)
+            v0, v1 = (low[v], high[v]) if lv == level else (v, v)
+            stack.append((u, v, level))
+            stack.append((u1, v1, -1))
+            stack.append((u0, v0, -1))
+        return results[0]
+
+    def neg(self, u):
+        return self.apply(XOR, u, TRUE)
+
+    def size(self, roots):
+        """Число внутренних узлов, достижимых из roots"""
+        seen, stack = set(), [r for r in roots if r > TRUE]
+        while stack:
+            u = stack.pop()
+            if u in seen: continue
+            seen.add(u)
+            for w in (self.low[u], self.high[u]):
+                if w > TRUE: stack.append(w)
+        return len(seen)
+
+    def fold(self, u, memo, combine):
+        """Значение узла u снизу вверх без рекурсии.
+
+        memo — значения терминалов (дополняется значениями узлов),
+        combine(w, значение low, значение high) — значение узла w.
+        """
+        low, high = self.low, self.high
+        stack = [u]
+        while stack:
+            w = stack[-1]
+            if w in memo:
+                stack.pop()
+                continue
+            lo, hi = low[w], high[w]
+            if lo in memo and hi in memo:
+                stack.pop()
+                memo[w] = combine(w, memo[lo], memo[hi])
+            else:
+                if lo not in memo: stack.append(lo)
+                if hi not in memo: stack.append(hi)
+        return memo[u]
+
+    def count(self, u):
+        """Число выполняющих наборов среди 2^n наборов всех переменных"""
+        var, low, high = self.var, self.low, self.high
+
+        def combine(w, lo, hi):
+            return (lo << (var[low[w]] - var[w] - 1)) + (hi << (var[high[w]] - var[w] - 1))
+
+        return self.fold(u, {FALSE: 0, TRUE: 1}, combine) << var[u]
+
+    def satisfy_one(self, u):
+        """Один выполняющий набор {имя: 0/1} (непомеченные переменные — 0) или None"""
+        if u == FALSE: return None
+        assignment = dict.fromkeys(self.names, 0)
+        while u != TRUE:
+            name = self.names[self.var[u]]
+            if self.high[u] != FALSE:
+                assignment[name] = 1
+                u = self.high[u]
+            else:
+                u = self.low[u]
+        return assignment
+
+    def cubes(self, u):
+        """Пути к 1 в виде строк из '0'/'1'/'-' по переменным в порядке names"""
+        n = len(self.names)
+        stack = [(u, ['-'] * n)]
+        while stack:
+            w, cube = stack.pop()
+            if w == FALSE: continue
+            if w == TRUE:
+                yield "".join(cube)
+                continue
+            lvl = self.var[w]
+            lo, hi = cube[:], cube
+            lo[lvl], hi[lvl] = '0', '1'
+            stack.append((self.high[w], hi))
+            stack.append((self.low[w], lo))
+
+    def word(self, u, columns):
+        """Упакованный столбец таблицы истинности: бит i — значение в строке i.
+
+        columns — имена входов в порядке столбцов (первый — старший бит номера строки).
+        """
+        n = len(columns)
+        num_rows = 1 << n
+        mask = (1 << num_rows) - 1
+        pattern = {name: input_pattern(n - 1 - j, num_rows) for j, name in enumerate(columns)}
+
+        def combine(w, lo, hi):
+            x = pattern[self.names[self.var[w]]]
+            return (x & hi) | (~x & mask & lo)
+
+        return self.fold(u, {FALSE: 0, TRUE: mask}, combine)
+
+    # --- ПЕРЕСТАНОВКА СОСЕДНИХ УРОВНЕЙ НА МЕСТЕ ---
+
+    def begin_reorder(self, roots):
+        """Готовит счетчики ссылок; узлы, недостижимые из roots, выбрасываются из таблицы"""
+        var, low, high = self.var, self.low, self.high
+        self.ref = array('l', [0]) * len(var)
+        self.levels = [set() for _ in self.names]
+        self.unique = {}
+        self.cache.clear()
+        stack = [r for r in roots if r > TRUE]
+        for r in stack:
+            self.ref[r] += 1
+        seen = set()
+        while stack:
+            u = stack.pop()
+            if u in seen: continue
+            seen.add(u)
+            self.unique[(var[u], low[u], high[u])] = u
+            self.levels[var[u]].add(u)
+            for w in (low[u], high[u]):
+                if w > TRUE:
+                    self.ref[w] += 1
+                    stack.append(w)
+        self.live = len(seen)
+
+    def end_reorder(self):
+        self.ref = self.levels = None
+        self.cache.clear()  # В кэше могут остаться удаленные узлы
+
+    def node(self, level, low, high):
+        """mk() со счетчиками ссылок: новый узел ссылается на своих детей"""
+        if low == high: return low
+        key = (level, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.var)
+            self.var.append(level)
+            self.low.append(low)
+            self.high.append(high)
+            self.ref.append(0)
+            self.unique[key] = u
+            self.levels[level].add(u)
+            self.live += 1
+            for w in (low, high):
+                if w > TRUE: self.ref[w] += 1
+        return u
+
+    def deref(self, u):
+        """Снимает ссылку; узел без ссылок удаляется вместе с ссылками на детей"""
+        stack = [u]
+        while stack:
+            u = stack.pop()
+            if u <= TRUE: continue
+            self.ref[u] -= 1
+            if self.ref[u]: continue
+            del self.unique[(self.var[u], self.low[u], self.high[u])]
+            self.levels[self.var[u]].discard(u)
+            self.live -= 1
+            stack += (self.low[u], self.high[u])
+
+    def swap(self, i):
+        """Меняет местами переменные уровней i и i+1, сохраняя функцию каждого живого узла.
+
+        Узлы уровня i+1 и узлы уровня i, не зависящие от него, только
+        переносятся на другой уровень; узел уровня i, зависящий от i+1,
+        переписывается на месте (тот же номер) через два новых узла уровня i+1.
+        """
+        var, low, high, unique, ref = self.var, self.low, self.high, self.unique, self.ref
+        j = i + 1
+        xs, ys = self.levels[i], self.levels[j]
+        moved, rewritten = [], []
+        for u in xs:
+            f0, f1 = low[u], high[u]
+            del unique[(i, f0, f1)]
+            if var[f0] == j or var[f1] == j:
+                f00, f01 = (low[f0], high[f0]) if var[f0] == j else (f0, f0)
+                f10, f11 = (low[f1], high[f1]) if var[f1] == j else (f1, f1)
+                rewritten.append((u, f0, f1, f00, f01, f10, f11))
+            else:
+                moved.append(u)
+        for u in ys:
+            del unique[(j, low[u], high[u])]
+            var[u] = i
+            unique[(i, low[u], high[u])] = u
+        for u in moved:
+            var[u] = j
+            unique[(j, low[u], high[u])] = u
+        self.levels[i], self.levels[j] = set(ys), set(moved)
+        self.names[i], self.names[j] = self.names[j], self.names[i]
+        self.level_of[self.names[i]], self.level_of[self.names[j]] = i, j
+
+        for u, f0, f1, f00, f01, f10, f11 in rewritten:
+            lo, hi = self.node(j, f00, f10), self.node(j, f01, f11)
+            for w in (lo, hi):
+                if w > TRUE: ref[w] += 1
+            low[u], high[u] = lo, hi
+            unique[(i, lo, hi)] = u
+            self.levels[i].add(u)
+            self.deref(f0)
+            self.deref(f1)
+
+
+def sift(bdd, roots, rounds=1, max_growth=SIFT_MAX_GROWTH):
+    """Перестановка переменных просеиванием (Rudell) на месте.
+
+    Каждая переменная (начиная с самых населенных уровней) проходит вниз
+    и вверх обменами соседних уровней и остается там, где граф был меньше
+    всего. Обмен трогает только узлы двух уровней; направление бросается,
+    когда граф вырос больше чем в max_growth раз. Номера узлов roots
+    сохраняются. Возвращает (bdd, roots).
+    """
+    n = len(bdd.names)
+    bdd.begin_reorder(roots)
+    try:
+        for _ in range(rounds):
+            start = bdd.live
+            for name in sorted(bdd.names, key=lambda v: -len(bdd.levels[bdd.level_of[v]])):
+                pos = origin = bdd.level_of[name]
+                best_size, best_pos = bdd.live, pos
+                limit = max_growth * bdd.live
+
+                def step(target):
+                    nonlocal pos, best_size, best_pos
+                    if target > pos: bdd.swap(pos)
+                    else: bdd.swap(target)
+                    pos = target
+                    if bdd.live < best_size:
+                        best_size, best_pos = bdd.live, pos
+
+                while pos < n - 1 and bdd.live <= limit:
+                    step(pos + 1)
+                # Вверх: через исходную позицию — всегда, выше нее — пока граф не разросся
+                while pos > 0 and (pos > origin or bdd.live <= limit):
+                    step(pos - 1)
+                while pos != best_pos:
+                    step(pos + 1 if pos < best_pos else pos - 1)
+            if bdd.live >= start: break
+    finally:
+        bdd.end_reorder()
+    return bdd, roots
+
+
+# --- ПОСТРОЕНИЕ ПО СХЕМЕ ---
+
+def circuit_order(netlist):
+    """Начальный порядок переменных: входы в порядке обхода в глубину от выходов.
+
+    Входы, сходящиеся к общим вентилям, оказываются рядом — обычно это дает
+    заметно меньший граф, чем алфавитный порядок.
+    """
+    inputs, outputs = netlist.ports()
+    order, seen = [], set()
+    for out in outputs:
+        stack = [out]
+        while stack:
+            gate = stack.pop()
+            if gate in seen: continue
+            seen.add(gate)
+            if gate.g_type == 'INPUT':
+                order.append(gate.name)
+            for idx in reversed(range(gate.arity)):
+                conn = netlist.driver(gate, idx)
+                if conn is not None: stack.append(conn.from_gate)
+    names = set(order)
+    return order + [g.name for g in inputs if g.name not in names]
+
+
+def gate_nodes(bdd, compiled, inputs=None):
+    """BDD каждого вентиля сокращенной схемы; inputs — {вход: узел} вместо переменных"""
+    if any(is_loop for _, is_loop in compiled.components):
+        raise ValueError("Схема с контуром обратной связи не поддерживается BDD")
+
+    node = {ONE: TRUE}  # Константы сокращенной схемы: None -> FALSE, ONE -> TRUE
+    for gate in compiled.order:
+        drivers = [node.get(d, FALSE) for d in compiled.drivers[gate]]
+        a, b = (drivers + [FALSE, FALSE])[:2]
+        g_type = gate.g_type
+        if g_type == 'INPUT':
+            node[gate] = inputs[gate] if inputs is not None else bdd.variable(gate.name)
+        elif g_type == 'CLOCK': node[gate] = FALSE  # Как в таблице истинности: такт держится в нуле
+        elif g_type == 'OUTPUT': node[gate] = a
+        elif g_type == 'NOT': node[gate] = bdd.neg(a)
+        elif g_type == 'AND': node[gate] = bdd.apply(AND, a, b)
+        elif g_type == 'OR': node[gate] = bdd.apply(OR, a, b)
+        elif g_type == 'XOR': node[gate] = bdd.apply(XOR, a, b)
+        elif g_type == 'NAND': node[gate] = bdd.neg(bdd.apply(AND, a, b))
+        elif g_type == 'NOR': node[gate] = bdd.neg(bdd.apply(OR, a, b))
+        elif g_type == 'XNOR': node[gate] = bdd.neg(bdd.apply(XOR, a, b))
+        elif g_type == 'PIN': node[gate] = node[compiled.drivers[gate][0]][gate.extra]
+        elif g_type == 'BLOCK':
+            # Блок раскрывается: его входы подставляются вместо переменных
+            component = gate.extra
+            sub_inputs, sub_outputs = component.netlist.ports()
+            sub = gate_nodes(bdd, component.compiled, dict(zip(sub_inputs, drivers)))
+            node[gate] = tuple(sub[g] for g in sub_outputs)
+    return node
+
+
+def build_outputs(bdd, netlist):
+    """BDD выходов схемы (в порядке ports()) в менеджере bdd"""
+    node = gate_nodes(bdd, CompiledNetlist(netlist, netlist.connections))
+    return [node[g] for g in netlist.ports()[1]]
+
+
+def build_bdd(netlist, order=None, reorder_vars=False):
+    """(менеджер, BDD выходов) схемы; reorder_vars — дополнительно просеять порядок"""
+    bdd = BDD(order or circuit_order(netlist))
+    roots = build_outputs(bdd, netlist)
+    if reorder_vars:
+        bdd, roots = sift(bdd, roots)
+    return bdd, roots
+
+
+def bdd_truth_table(netlist):
+    """Таблица истинности через BDD: каждый выход — один проход по узлам графа"""
+    bdd, roots = build_bdd(netlist)
+    inputs, outputs = netlist.ports()
+    columns = [g.name for g in inputs]
+    num_rows = 1 << len(columns) if columns else 0
+    words = [bdd.word(r, columns) if columns else 0 for r in roots]
+    return TruthTable(columns, [f"O{i+1}" for i in range(len(outputs))], num_rows, words, [0] * len(roots))
+
+
+# --- ВЫРАЖЕНИЯ ---
+
+TOKEN_RE = re.compile(r"\s*(?:([A-Za-z0-9_][A-Za-z0-9_.\[\]]*)|(.))")
+
+
+def parse_expr(bdd, text):
+    """Разбирает выражение над входами: ~ ! (НЕ), & * (И), ^ (ИСКЛ. ИЛИ), | + (ИЛИ), скобки, 0/1.
+
+    Слова and/or/xor/not тоже допускаются. Приоритет: НЕ > И > ИСКЛ. ИЛИ > ИЛИ.
+    Имена входов могут быть числовыми (как в ISCAS): 0 и 1 — константы,
+    только если входа с таким именем нет.
+    """
+    tokens = []
+    for name, op in TOKEN_RE.findall(text):
+        if name:
+            word = name.lower()
+            if word in ("and", "or", "xor", "not"):
+                tokens.append({"and": "&", "or": "|", "xor": "^", "not": "~"}[word])
+            elif name in ("0", "1") and name not in bdd.level_of:
+                tokens.append(("const", int(name)))
+            else:
+                tokens.append(("var", name))
+        elif op.strip(): tokens.append({"!": "~", "*": "&", "+": "|"}.get(op, op))
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def binary(op, code, operand):
+        def parse():
+            u = operand()
+            while peek() == op:
+                take()
+                u = bdd.apply(code, u, operand())
+            return u
+        return parse
+
+    def atom():
+        tok = take() if peek() is not None else None
+        if tok == "~": return bdd.neg(atom())
+        if tok == "(":
+            u = expr()
+            if take() != ")": raise ValueError("Ожидалась ')'")
+            return u
+        if isinstance(tok, tuple):
+            return bdd.variable(tok[1]) if tok[0] == "var" else (TRUE if tok[1] else FALSE)
+        raise ValueError(f"Некорректное выражение: {text!r}")
+
+    expr = binary("|", OR, binary("^", XOR, binary("&", AND, atom)))
+    try:
+        u = expr()
+    except IndexError:
+        raise ValueError(f"Некорректное выражение: {text!r}") from None
+    except RecursionError:
+        raise ValueError("Слишком глубокая вложенность скобок или отрицаний в выражении") from None
+    if pos != len(tokens):
+        raise ValueError(f"Лишние символы в выражении: {text!r}")
+    return u
+
+
+# --- ЭКВИВАЛЕНТНОСТЬ ---
+
+def check_expression(netlist, output, text):
+    """Сравнивает выход номер output (с нуля) с выражением.
+
+    Возвращает None, если функции совпадают, иначе контрпример {вход: 0/1}.
+    """
+    bdd, roots = build_bdd(netlist)
+    if not 0 <= output < len(roots):
+        raise ValueError(f"Нет выхода O{output+1}")
+    return bdd.satisfy_one(bdd.apply(XOR, roots[output], parse_expr(bdd, text)))
+
+
+def compare_circuits(netlist, reference):
+    """Сравнивает выходы двух схем попарно (O1 с O1, ...); входы сопоставляются по имени.
+
+    Возвращает список: None для совпавшего выхода или контрпример {вход: 0/1}.
+    """
+    order = circuit_order(reference)
+    known = set(order)
+    order += [name for name in circuit_order(netlist) if name not in known]
+    bdd = BDD(order)
+    mine, theirs = build_outputs(bdd, netlist), build_outputs(bdd, reference)
+    if len(mine) != len(theirs):
+        raise ValueError(f"Разное число выходов: {len(mine)} и {len(theirs)}")
+    return [bdd.satisfy_one(bdd.apply(XOR, a, b)) for a, b in zip(mine, theirs)]
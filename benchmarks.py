@@ -0,0 +1,349 @@
+"""Набор замеров производительности на синтетических схемах.
+
+Генераторы строят параметризованные схемы прямо из LogicGate/Connection:
+сумматоры с последовательным и ускоренным переносом, матричный умножитель,
+дерево четности, случайный DAG с заданными числом входов узла и глубиной,
+цепочку защелок (контуры обратной связи).
+
+Замеряются вычисление схемы (как пересчет в GUI), событийное переключение
+входа, таблица истинности (как пересчет в GUI), удаление вентилей, а при
+наличии дисплея — перерисовка проводов при перетаскивании и удаление на
+холсте. Результат — JSON; сравнение с прошлым прогоном отмечает регрессии.
+"""
+import json
+import platform
+import random
+import statistics
+import time
+
+from logic_core import LogicGate, Connection, Netlist, CompiledNetlist, clear_code_cache
+from exhaustive import exhaustive_words
+from netlist_io import auto_layout
+
+RESULTS_VERSION = 1
+TABLE_MAX_INPUTS = 20      # Таблица истинности замеряется только для схем с не большим числом входов
+DELETE_COUNT = 50          # Сколько вентилей удаляется в замере удаления
+DRAG_FRAMES = 50           # Кадров перетаскивания в замере перерисовки проводов
+REGRESSION_RATIO = 1.3     # Во сколько раз медленнее прошлого прогона — уже регрессия
+MIN_COMPARED_SECONDS = 1e-3  # Более быстрые замеры не сравниваются: слишком шумные
+
+
+# --- ГЕНЕРАТОРЫ СХЕМ ---
+
+class CircuitMaker:
+    """Построение схемы вызовами вида maker.gate('AND', a, b)"""
+    def __init__(self):
+        self.netlist = Netlist()
+        self.uid = 0
+
+    def add(self, g_type, name=None):
+        self.uid += 1
+        gate = LogicGate(g_type, 0, 0, self.uid, name)
+        self.netlist.add_gate(gate)
+        return gate
+
+    def gate(self, g_type, *drivers):
+        gate = self.add(g_type)
+        for idx, driver in enumerate(drivers):
+            self.netlist.connect(Connection(driver, gate, idx))
+        return gate
+
+    def inputs(self, prefix, count):
+        # Номер с ведущими нулями: входы по имени идут в порядке разрядов
+        width = len(str(count - 1))
+        return [self.add('INPUT', f"{prefix}{i:0{width}d}") for i in range(count)]
+
+    def outputs(self, prefix, nets):
+        width = len(str(len(nets) - 1))
+        for i, net in enumerate(nets):
+            self.netlist.connect(Connection(net, self.add('OUTPUT', f"{prefix}{i:0{width}d}"), 0))
+
+    def tree(self, g_type, nets):
+        """Сбалансированное дерево двухвходовых вентилей"""
+        nets = list(nets)
+        while len(nets) > 1:
+            nets = [self.gate(g_type, nets[i], nets[i + 1]) if i + 1 < len(nets) else nets[i]
+                    for i in range(0, len(nets), 2)]
+        return nets[0]
+
+    def full_adder(self, a, b, c):
+        """(сумма, перенос); c = None — полусумматор"""
+        x = self.gate('XOR', a, b)
+        if c is None:
+            return x, self.gate('AND', a, b)
+        return self.gate('XOR', x, c), self.gate('OR', self.gate('AND', a, b), self.gate('AND', x, c))
+
+    def finish(self):
+        auto_layout(self.netlist)
+        return self.netlist
+
+
+def ripple_carry_adder(bits):
+    m = CircuitMaker()
+    a, b = m.inputs("A", bits), m.inputs("B", bits)
+    carry, sums = None, []
+    for i in range(bits):
+        s, carry = m.full_adder(a[i], b[i], carry)
+        sums.append(s)
+    m.outputs("S", sums + [carry])
+    return m.finish()
+
+
+def carry_lookahead_adder(bits, group=4):
+    """Ускоренный перенос внутри групп по group разрядов, между группами — последовательный"""
+    m = CircuitMaker()
+    a, b = m.inputs("A", bits), m.inputs("B", bits)
+    g = [m.gate('AND', a[i], b[i]) for i in range(bits)]
+    p = [m.gate('XOR', a[i], b[i]) for i in range(bits)]
+    carries = [None]
+    for base in range(0, bits, group):
+        c0 = carries[-1]
+        for i in range(base, min(base + group, bits)):
+            # c[i+1] = g[i] | p[i]g[i-1] | ... | p[i]..p[base] c0
+            terms = [g[i]]
+            for j in range(i - 1, base - 1, -1):
+                terms.append(m.tree('AND', p[j + 1:i + 1] + [g[j]]))
+            if c0 is not None:
+                terms.append(m.tree('AND', p[base:i + 1] + [c0]))
+            carries.append(m.tree('OR', terms))
+    sums = [p[0]] + [m.gate('XOR', p[i], carries[i]) for i in range(1, bits)]
+    m.outputs("S", sums + [carries[bits]])
+    return m.finish()
+
+
+def array_multiplier(bits):
+    m = CircuitMaker()
+    a, b = m.inputs("A", bits), m.inputs("B", bits)
+    product = [None] * (2 * bits)   # Разряды накопленной суммы (None — ноль)
+    for j in range(bits):
+        carry = None
+        for i in range(bits + 1):
+            k = i + j
+            pp = m.gate('AND', a[i], b[j]) if i < bits else None
+            operands = [x for x in (product[k], pp, carry) if x is not None]
+            if len(operands) == 3:
+                product[k], carry = m.full_adder(*operands)
+            elif len(operands) == 2:
+                product[k], carry = m.full_adder(operands[0], operands[1], None)
+            else:
+                product[k], carry = (operands[0] if operands else None), None
+    m.outputs("P", [x if x is not None else m.gate('XOR', a[0], a[0]) for x in product])
+    return m.finish()
+
+
+def parity_tree(inputs):
+    m = CircuitMaker()
+    m.outputs("P", [m.tree('XOR', m.inputs("X", inputs))])
+    return m.finish()
+
+
+def random_dag(gates, inputs=16, fanin=2, depth=20, outputs=8, seed=1):
+    """Случайная схема: gates узлов по depth уровням, узел — дерево из fanin входов.
+
+    Один вход узла берется с предыдущего уровня (глубина ровно depth),
+    остальные — с любого более раннего.
+    """
+    rnd = random.Random(seed)
+    m = CircuitMaker()
+    levels = [m.inputs("X", inputs)]
+    nodes = max(1, gates // max(1, fanin - 1))
+    per_level = max(1, nodes // depth)
+    types = ('AND', 'OR', 'NAND', 'NOR', 'XOR', 'XNOR')
+    for _ in range(depth):
+        earlier = [net for level in levels for net in level]
+        level = []
+        for _ in range(per_level):
+            operands = [rnd.choice(levels[-1])] + [rnd.choice(earlier) for _ in range(fanin - 1)]
+            node = m.tree(rnd.choice(types), operands) if fanin > 1 else m.gate('NOT', operands[0])
+            level.append(node)
+        levels.append(level)
+    m.outputs("O", levels[-1][:outputs])
+    return m.finish()
+
+
+def latch_chain(latches):
+    """Цепочка RS-защелок на ИЛИ-НЕ, каждая управляется предыдущей: latches контуров"""
+    m = CircuitMaker()
+    d, enable = m.inputs("D", 1)[0], m.inputs("E", 1)[0]
+    q, outs = d, []
+    for _ in range(latches):
+        s = m.gate('AND', q, enable)
+        r = m.gate('AND', m.gate('NOT', q), enable)
+        top, bottom = m.add('NOR'), m.add('NOR')
+        for conn in (Connection(r, top, 0), Connection(bottom, top, 1),
+                     Connection(s, bottom, 0), Connection(top, bottom, 1)):
+            m.netlist.connect(conn)
+        q = top
+        outs.append(q)
+    m.outputs("Q", outs[-3:])
+    return m.finish()
+
+
+# Имя -> (генератор, размеры по умолчанию, размеры для --quick)
+GENERATORS = {
+    'ripple_adder': (ripple_carry_adder, (8, 16, 32, 64), (8, 16)),
+    'lookahead_adder': (carry_lookahead_adder, (8, 16, 32, 64), (8, 16)),
+    'multiplier': (array_multiplier, (4, 6, 8, 12), (4, 6)),
+    'parity': (parity_tree, (8, 12, 16, 20), (8, 12)),
+    'random_dag': (random_dag, (1000, 4000, 16000), (1000,)),
+    'latches': (latch_chain, (16, 64, 256), (16,)),
+}
+
+
+# --- ЗАМЕРЫ ---
+
+def measure(func, setup=None, repeat=3):
+    """Лучшее и медианное время func(состояние) по repeat прогонам; setup() готовит состояние заново"""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        func(state)
+        times.append(time.perf_counter() - started)
+    return min(times), statistics.median(times)
+
+
+def bench_simulate(netlist):
+    """Как пересчет схемы в GUI после правки: левелизация, генерация кода и прогон"""
+    clear_code_cache()  # Холодный старт: без кэша сгенерированного кода
+    CompiledNetlist(netlist, netlist.connections).evaluate()
+
+
+def bench_propagate(compiled, source):
+    """Как щелчок по входу: событийное распространение, туда и обратно"""
+    for _ in range(2):
+        source.value = not source.value
+        compiled.propagate(source)
+
+
+def bench_table(netlist):
+    """Как пересчет таблицы истинности в GUI (фоновое задание start_recompute)"""
+    inputs, outputs = netlist.ports()
+    exhaustive_words(CompiledNetlist(netlist, netlist.connections), inputs, outputs)
+
+
+def delete_gates(netlist, gates):
+    """Как delete_gate без холста: удаление вентилей вместе с соединениями"""
+    for gate in gates:
+        netlist.remove_gate(gate)
+
+
+def pick_gates(netlist, count, seed=1):
+    gates = [g for g in netlist if g.g_type not in ('INPUT', 'OUTPUT')]
+    return random.Random(seed).sample(gates, min(count, len(gates)))
+
+
+def open_gui():
+    """(tk, CircuitApp) на скрытом окне или (None, причина), если дисплея нет"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:   # Нет tkinter или дисплея (TclError)
+        return None, str(e) or type(e).__name__
+    root.withdraw()
+    import logic_simulator
+    return logic_simulator.CircuitApp(root), None
+
+
+def bench_drag(app, gate):
+    """Кадры перетаскивания вентиля: как flush_frame при движении мыши"""
+    app.drag_data.update(type="gate", item=gate)
+    for _ in range(DRAG_FRAMES):
+        app.drag_data["dx"] = app.drag_data["dy"] = 1
+        app.flush_frame()
+    app.drag_data.update(type=None, item=None)
+
+
+def run_suite(names=None, quick=False, repeat=3, gui=True, log=None):
+    """Прогоняет замеры; возвращает словарь результатов для JSON"""
+    results = []
+    app, gui_error = open_gui() if gui else (None, "отключено")
+
+    def record(benchmark, circuit, size, netlist, timing, **extra):
+        inputs = netlist.count('INPUT')
+        entry = {"benchmark": benchmark, "circuit": circuit, "size": size,
+                 "gates": len(netlist), "inputs": inputs, "best": timing[0], "median": timing[1], **extra}
+        results.append(entry)
+        if log: log(f"{circuit}[{size}] {benchmark}: {timing[0] * 1000:.2f} мс")
+
+    for circuit in names or GENERATORS:
+        generate, sizes, quick_sizes = GENERATORS[circuit]
+        for size in quick_sizes if quick else sizes:
+            built = []
+            timing = measure(lambda _: built.append(generate(size)), repeat=repeat)
+            netlist = built[-1]
+            record("build", circuit, size, netlist, timing)
+
+            record("simulate", circuit, size, netlist, measure(lambda _: bench_simulate(netlist), repeat=repeat))
+            compiled = CompiledNetlist(netlist, netlist.connections)
+            compiled.evaluate()
+            source = netlist.ports()[0][0]
+            record("propagate", circuit, size, netlist,
+                   measure(lambda _: bench_propagate(compiled, source), repeat=repeat))
+            if netlist.count('INPUT') <= TABLE_MAX_INPUTS:
+                record("table", circuit, size, netlist, measure(lambda _: bench_table(netlist), repeat=repeat))
+
+            def fresh():
+                fresh_netlist = generate(size)
+                return fresh_netlist, pick_gates(fresh_netlist, DELETE_COUNT)
+            record("delete", circuit, size, netlist,
+                   measure(lambda state: delete_gates(*state), fresh, repeat=repeat), count=DELETE_COUNT)
+
+            if app is None:
+                results.append({"benchmark": "gui", "circuit": circuit, "size": size, "skipped": gui_error})
+                continue
+            app.set_netlist(netlist)
+            # Перетаскивается вентиль с наибольшим числом проводов
+            gate = max(pick_gates(netlist, len(netlist)), key=lambda g: len(netlist.connections_of(g)))
+            record("drag", circuit, size, netlist, measure(lambda _: bench_drag(app, gate), repeat=repeat),
+                   frames=DRAG_FRAMES)
+
+            def fresh_gui():
+                app.set_netlist(generate(size))
+                return pick_gates(app.netlist, DELETE_COUNT)
+            record("gui_delete", circuit, size, netlist,
+                   measure(lambda gates: [app.delete_gate(g) for g in gates], fresh_gui, repeat=repeat),
+                   count=DELETE_COUNT)
+
+    if app is not None:
+        app.root.destroy()
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current, baseline, ratio=REGRESSION_RATIO):
+    """Строки сравнения с прошлым прогоном и число регрессий"""
+    key = lambda r: (r["benchmark"], r["circuit"], r["size"])
+    old = {key(r): r for r in baseline["results"] if "best" in r}
+    lines, regressions = [], 0
+    for entry in current["results"]:
+        before = old.get(key(entry))
+        if before is None or "best" not in entry: continue
+        if max(entry["best"], before["best"]) < MIN_COMPARED_SECONDS: continue
+        change = entry["best"] / before["best"] if before["best"] else float("inf")
+        mark = ""
+        if change > ratio:
+            mark = "  РЕГРЕССИЯ"
+            regressions += 1
+        lines.append(f"{entry['circuit']}[{entry['size']}] {entry['benchmark']}: "
+                     f"{before['best'] * 1000:.2f} -> {entry['best'] * 1000:.2f} мс (x{change:.2f}){mark}")
+    return lines, regressions
+
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != RESULTS_VERSION:
+        raise ValueError(f"Неподдерживаемая версия файла замеров: {data.get('version')}")
+    return data
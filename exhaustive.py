@@ -0,0 +1,132 @@
+"""Параллельный полный перебор входов (таблицы истинности больших схем).
+
+Пространство 2^n строк делится на непрерывные блоки по 2^BLOCK_INPUTS строк,
+блоки раздаются процессам ProcessPoolExecutor. Исходник сгенерированной
+функции схемы передается рабочим процессам один раз (через initializer),
+результаты возвращаются упакованными байтами: бит i — строка base + i.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from logic_core import CompiledNetlist, TruthTable, input_pattern
+
+PARALLEL_MIN_INPUTS = 18  # Меньше входов — один проход в текущем процессе быстрее
+BLOCK_INPUTS = 16         # Строк в блоке: 2^BLOCK_INPUTS
+LOCAL_BLOCK_INPUTS = 14   # Блок перебора в текущем процессе, если его нужно уметь прервать
+
+_worker = {}  # Состояние рабочего процесса: функция схемы и раскладка входов/выходов
+
+
+def _init_worker(source, positions, out_index, block_inputs):
+    namespace = {}
+    exec(compile(source, "<circuit>", "exec"), namespace)
+    _worker.update(
+        function=namespace["circuit"], positions=positions,
+        out_index=out_index, block_inputs=block_inputs,
+    )
+
+
+def block_words(positions, block, k):
+    """Слова входов для блока строк [block * 2^k, (block + 1) * 2^k)"""
+    rows = 1 << k
+    mask = (1 << rows) - 1
+    base = block << k
+    words = []
+    for position in positions:
+        if position is None:
+            words.append(0)               # Вход не участвует в таблице
+        elif position < k:
+            words.append(input_pattern(position, rows))
+        else:
+            words.append(mask if (base >> position) & 1 else 0)
+    return words, mask
+
+
+def _eval_block(block):
+    """Вычисляет блок строк [block * B, (block + 1) * B) и возвращает их в байтах"""
+    k = _worker["block_inputs"]
+    rows = 1 << k
+    words, mask = block_words(_worker["positions"], block, k)
+    values, bad = _worker["function"](words, mask)
+    size = rows // 8
+    out = [values[i].to_bytes(size, "little") for i in _worker["out_index"]]
+    unstable = [bad[i].to_bytes(size, "little") for i in _worker["out_index"]]
+    return block, out, unstable
+
+
+def exhaustive_words(compiled, inputs, outputs, workers=None, progress=None, block_inputs=BLOCK_INPUTS):
+    """Полный перебор: (число строк, слова выходов, маски колебаний), как CompiledNetlist.truth_table.
+
+    progress(готово_блоков, всего_блоков) вызывается по мере завершения блоков;
+    исключение из progress прерывает перебор.
+    """
+    n = len(inputs)
+    local = n < max(PARALLEL_MIN_INPUTS, block_inputs + 1) or workers == 1
+    if local and (progress is None or n <= LOCAL_BLOCK_INPUTS):
+        result = compiled.truth_table(inputs, outputs)
+        if progress: progress(1, 1)
+        return result
+
+    position = {g: n - 1 - j for j, g in enumerate(inputs)}
+    positions = [position.get(g) for g in compiled.input_order]
+    index = {g: k for k, g in enumerate(compiled.order)}
+    out_index = [index[g] for g in outputs]
+
+    num_rows = 1 << n
+    if local:
+        # Тот же перебор в текущем процессе, но блоками: progress между ними может его прервать
+        block_inputs = LOCAL_BLOCK_INPUTS
+    blocks = num_rows >> block_inputs
+    size = (1 << block_inputs) // 8
+    out_bytes = [bytearray(num_rows // 8) for _ in outputs]
+    bad_bytes = [bytearray(num_rows // 8) for _ in outputs]
+
+    if local:
+        for block in range(blocks):
+            values, bad = compiled.run(*block_words(positions, block, block_inputs))
+            offset = block * size
+            for buf, buf_bad, i in zip(out_bytes, bad_bytes, out_index):
+                buf[offset:offset + size] = values[i].to_bytes(size, "little")
+                buf_bad[offset:offset + size] = bad[i].to_bytes(size, "little")
+            progress(block + 1, blocks)
+        return (num_rows, [int.from_bytes(buf, "little") for buf in out_bytes],
+                [int.from_bytes(buf, "little") for buf in bad_bytes])
+
+    # spawn: рабочие процессы не наследуют состояние GUI (fork после Tk небезопасен)
+    context = multiprocessing.get_context("spawn")
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker,
+        initargs=(compiled.generate_source(), positions, out_index, block_inputs),
+    )
+    try:
+        futures = [pool.submit(_eval_block, b) for b in range(blocks)]
+        for done, future in enumerate(as_completed(futures), 1):
+            block, out, unstable = future.result()
+            offset = block * size
+            for buf, chunk in zip(out_bytes, out):
+                buf[offset:offset + size] = chunk
+            for buf, chunk in zip(bad_bytes, unstable):
+                buf[offset:offset + size] = chunk
+            # progress может прервать перебор исключением — оставшиеся блоки отменяются
+            if progress: progress(done, blocks)
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+    words = [int.from_bytes(buf, "little") for buf in out_bytes]
+    unstable = [int.from_bytes(buf, "little") for buf in bad_bytes]
+    return num_rows, words, unstable
+
+
+def exhaustive_truth_table(netlist, compiled=None, workers=None, progress=None):
+    """Таблица истинности схемы с параллельным перебором для широких схем"""
+    compiled = compiled or CompiledNetlist(netlist, netlist.connections)
+    inputs, outputs = netlist.ports()
+    out_names = [f"O{i+1}" for i in range(len(outputs))]
+    if not inputs:
+        return TruthTable([], out_names, 0, [], [])
+    num_rows, words, unstable = exhaustive_words(compiled, inputs, outputs, workers, progress)
+    return TruthTable([g.name for g in inputs], out_names, num_rows, words, unstable)
@@ -0,0 +1,238 @@
+"""Моделирование неисправностей «константа 0/1» (stuck-at).
+
+Неисправность — выход вентиля или один из его входов, залипший в 0 или 1.
+Моделирование параллельное по векторам (PPSFP): векторы упакованы в слова,
+бит i слова — значение сети на i-м векторе пачки. Исправная схема считается
+сгенерированным кодом один раз на пачку, а каждая еще не обнаруженная
+неисправность распространяется только по своему конусу нагрузки и только
+пока значение отличается от исправного. Обнаруженные неисправности больше
+не моделируются (fault dropping).
+
+Затем строится сжатый тест — жадное покрытие всех обнаруженных
+неисправностей векторами (при небольшом наборе — из всех векторов, иначе —
+из первых обнаруживших), обычно близкое к минимальному.
+"""
+import random
+from heapq import heappush, heappop
+
+from logic_core import SOURCE_TYPES, OP_EXPR, CompiledNetlist
+
+FAULT_WORD_BITS = 1024        # Векторов в одном слове (пачке): шире слово — меньше обходов конусов
+EXHAUSTIVE_FAULT_INPUTS = 16  # До стольких входов по умолчанию перебираются все векторы
+RANDOM_VECTORS = 4096         # Иначе — столько случайных векторов
+COMPACT_CANDIDATES = 4096     # До стольких векторов тест выбирается из всех, иначе — из первых обнаруживших
+
+# Побитовые операции вентилей над словами — из тех же выражений, что и генератор кода
+WORD_OPS = {t: eval(f"lambda a, b, m: {expr.format(a='a', b='b')}") for t, expr in OP_EXPR.items()}
+
+
+class Fault:
+    """Неисправность: выход вентиля (port = -1) или его вход port залипает в value"""
+    __slots__ = ('gate', 'port', 'value')
+
+    def __init__(self, gate, port, value):
+        self.gate = gate
+        self.port = port
+        self.value = value
+
+    def __str__(self):
+        gate = self.gate
+        name = gate.name if gate.g_type in SOURCE_TYPES + ('OUTPUT',) else f"{gate.name or gate.g_type}#{gate.uid}"
+        site = name if self.port < 0 else f"{name}.in{self.port}"
+        return f"{site} s-a-{self.value}"
+
+
+def enumerate_faults(compiled):
+    """Обе неисправности на выходе каждого вентиля и на каждом его входе.
+
+    У OUTPUT выход совпадает со входом, у BLOCK выходы — его вентили PIN,
+    а вход PIN — внутренняя связь блока, поэтому они пропускаются.
+    """
+    faults = []
+    for gate in compiled.order:
+        g_type = gate.g_type
+        if g_type not in ('OUTPUT', 'BLOCK'):
+            faults += (Fault(gate, -1, 0), Fault(gate, -1, 1))
+        if g_type != 'PIN':
+            for idx in range(gate.arity):
+                faults += (Fault(gate, idx, 0), Fault(gate, idx, 1))
+    return faults
+
+
+class FaultReport:
+    """Итог моделирования: неисправности, первый обнаруживающий вектор каждой и сжатый тест"""
+    def __init__(self, faults, detected, tests, num_vectors):
+        self.faults = faults
+        self.detected = detected        # Fault -> номер вектора
+        self.tests = tests              # Сжатый тест: номера векторов
+        self.num_vectors = num_vectors  # Сколько векторов было промоделировано
+
+    @property
+    def coverage(self):
+        return len(self.detected) / len(self.faults) if self.faults else 1.0
+
+    @property
+    def undetected(self):
+        return [f for f in self.faults if f not in self.detected]
+
+
+class FaultSimulator:
+    """Параллельное по векторам моделирование неисправностей схемы без контуров.
+
+    Вектор — номер строки таблицы истинности: первый (по имени) вход —
+    старший бит. Тактовые генераторы, как и в таблице, держатся в нуле.
+    """
+    def __init__(self, netlist):
+        compiled = CompiledNetlist(netlist, netlist.connections, optimize=False)
+        if any(is_loop for _, is_loop in compiled.components):
+            raise ValueError("Моделирование неисправностей поддерживается только для схем без контуров")
+        self.compiled = compiled
+        self.inputs, self.outputs = netlist.ports()
+        self.faults = enumerate_faults(compiled)
+
+        order = compiled.order
+        position = compiled.position
+        index = {g: j for j, g in enumerate(self.inputs)}
+        self.input_slots = [index.get(g) for g in compiled.input_order]  # None — тактовый генератор
+        self.drivers = [[position[d] if d is not None else -1 for d in compiled.drivers[g]] for g in order]
+        self.sinks = [sorted({position[s] for s in compiled.fanout[g]}) for g in order]
+        self.is_output = [g.g_type == 'OUTPUT' for g in order]
+        # Обычные вентили: операция и пара позиций драйверов (-1 — ноль); у BLOCK и PIN op = None
+        self.ops = [WORD_OPS.get(g.g_type) for g in order]
+        self.pairs = [tuple((d + [-1, -1])[:2]) for d in self.drivers]
+
+        # Функции блоков (со вложенными) — из того же самодостаточного исходника
+        namespace = {}
+        for source in compiled.block_sources().values():
+            exec(source, namespace)
+        self.blocks = {p: namespace[g.extra.fname] for p, g in enumerate(order) if g.g_type == 'BLOCK'}
+        self.pins = {p: g.extra for p, g in enumerate(order) if g.g_type == 'PIN'}
+
+    def pack(self, vectors):
+        """Слова входов в порядке input_order: бит i — значение входа в векторе vectors[i]"""
+        n = len(self.inputs)
+        words = [0] * n
+        for i, vector in enumerate(vectors):
+            bit = 1 << i
+            for j in range(n):
+                if (vector >> (n - 1 - j)) & 1: words[j] |= bit
+        return [words[j] if j is not None else 0 for j in self.input_slots]
+
+    def good_values(self, vectors, mask):
+        """Слова исправной схемы по позициям; в конце — ноль для неподключенных входов (-1)"""
+        values, _ = self.compiled.run(self.pack(vectors), mask)
+        values = list(values) + [0]
+        for p, fn in self.blocks.items():
+            values[p] = fn(tuple(values[d] for d in self.drivers[p]), mask)
+        return values
+
+    def evaluate(self, p, values, mask, port=-1, stuck=0):
+        """Слово вентиля p по словам драйверов values; вход port заменяется на stuck"""
+        words = [values[d] for d in self.drivers[p]]
+        if port >= 0: words[port] = stuck
+        if p in self.blocks: return self.blocks[p](tuple(words), mask)
+        if p in self.pins: return words[0][self.pins[p]] if words[0] else 0
+        words += (0, 0)
+        return self.ops[p](words[0], words[1], mask)
+
+    def detect(self, fault, values, mask):
+        """Маска векторов, на которых неисправность видна хотя бы на одном выходе.
+
+        values — слова исправной схемы (good_values); на время вызова в них
+        пишутся значения неисправной схемы, а затем восстанавливаются.
+        """
+        start = self.compiled.position[fault.gate]
+        stuck = mask if fault.value else 0
+        value = stuck if fault.port < 0 else self.evaluate(start, values, mask, fault.port, stuck)
+        old = values[start]
+        if value == old: return 0
+
+        ops, pairs, sinks, is_output = self.ops, self.pairs, self.sinks, self.is_output
+        saved = [(start, old)]
+        values[start] = value
+        detected = value ^ old if is_output[start] else 0
+        queue = list(sinks[start])
+        seen = set(queue)
+        # Позиции — топологический порядок: все драйверы вентиля готовы раньше него
+        while queue:
+            p = heappop(queue)
+            op = ops[p]
+            if op is not None:
+                a, b = pairs[p]
+                value = op(values[a], values[b], mask)
+            else:
+                value = self.evaluate(p, values, mask)
+            old = values[p]
+            if value == old: continue
+            saved.append((p, old))
+            values[p] = value
+            if is_output[p]: detected |= value ^ old
+            for q in sinks[p]:
+                if q not in seen:
+                    seen.add(q)
+                    heappush(queue, q)
+
+        for p, old in saved:
+            values[p] = old
+        return detected
+
+    def run(self, vectors, width=FAULT_WORD_BITS, progress=None):
+        """Моделирует vectors пачками по width; progress(готово, всего) — после каждой пачки"""
+        vectors = list(vectors)
+        remaining = self.faults
+        detected = {}
+        for base in range(0, len(vectors), width):
+            chunk = vectors[base:base + width]
+            mask = (1 << len(chunk)) - 1
+            good = self.good_values(chunk, mask)
+            still = []
+            for fault in remaining:
+                hits = self.detect(fault, good, mask)
+                if hits: detected[fault] = chunk[(hits & -hits).bit_length() - 1]
+                else: still.append(fault)
+            remaining = still
+            if progress: progress(min(base + width, len(vectors)), len(vectors))
+            if not remaining: break
+        candidates = vectors if len(vectors) <= COMPACT_CANDIDATES else detected.values()
+        tests = self.compact(sorted(set(candidates)), list(detected), width)
+        return FaultReport(self.faults, detected, tests, len(vectors))
+
+    def compact(self, candidates, faults, width=FAULT_WORD_BITS):
+        """Жадно выбирает из candidates векторы, покрывающие все faults"""
+        hits = dict.fromkeys(faults, 0)   # Неисправность -> биты обнаруживающих ее кандидатов
+        for base in range(0, len(candidates), width):
+            chunk = candidates[base:base + width]
+            mask = (1 << len(chunk)) - 1
+            good = self.good_values(chunk, mask)
+            for fault in faults:
+                hits[fault] |= self.detect(fault, good, mask) << base
+
+        tests, uncovered = [], set(faults)
+        while uncovered:
+            counts = [0] * len(candidates)
+            for fault in uncovered:
+                word = hits[fault]
+                while word:
+                    low = word & -word
+                    counts[low.bit_length() - 1] += 1
+                    word ^= low
+            best = max(range(len(candidates)), key=counts.__getitem__)
+            tests.append(candidates[best])
+            uncovered = {f for f in uncovered if not (hits[f] >> best) & 1}
+        return sorted(tests)
+
+
+def default_vectors(num_inputs, count=None, seed=None):
+    """Все векторы при малом числе входов, иначе count случайных"""
+    if count is None and num_inputs <= EXHAUSTIVE_FAULT_INPUTS:
+        return range(1 << num_inputs)
+    rnd = random.Random(seed)
+    return [rnd.getrandbits(num_inputs) if num_inputs else 0 for _ in range(count or RANDOM_VECTORS)]
+
+
+def fault_simulate(netlist, vectors=None, count=None, seed=None, progress=None):
+    """Моделирование неисправностей схемы на vectors (по умолчанию — default_vectors)"""
+    simulator = FaultSimulator(netlist)
+    if vectors is None:
+        vectors = default_vectors(len(simulator.inputs), count, seed)
+    return simulator.run(vectors, progress=progress)
@@ -0,0 +1,355 @@
+"""Командная строка симулятора: работа со схемами без графического интерфейса.
+
+    python logic_cli.py table схема.json               # таблица истинности
+    python logic_cli.py table c17.bench                # .bench и .blif тоже читаются
+    python logic_cli.py eval схема.json 101 011        # прогон входных векторов
+    python logic_cli.py eval схема.json -f векторы.txt
+    python logic_cli.py check схема.json тест.txt      # сверка с ожидаемыми выходами (строки «входы | выходы»)
+    python logic_cli.py equiv схема.json -e "A & ~B"    # O1 эквивалентен выражению?
+    python logic_cli.py equiv схема.json эталон.json   # сравнение с эталонной схемой
+    python logic_cli.py bdd c17.bench --cubes          # BDD: размер, число наборов, кубы
+    python logic_cli.py timed схема.json -t 200 -d AND=3 -s A=50:1,120:0  # диаграммы с задержками
+    python logic_cli.py faults c17.bench               # покрытие неисправностей и сжатый тест
+    python logic_cli.py bench -o замеры.json --compare прошлые.json  # замеры на синтетических схемах
+    python logic_cli.py gui                            # запуск окна симулятора
+    python logic_cli.py gui --profile сеанс.prof       # то же, с профилем cProfile в файл
+
+Вектор — строка из 0/1 по входам в алфавитном порядке имен.
+tkinter импортируется только для команды gui.
+"""
+import argparse
+import json
+import sys
+
+from batch import BATCH_VECTORS, BatchEvaluator, parse_vectors, read_vector_file
+from bdd import build_bdd, check_expression, compare_circuits
+from exhaustive import exhaustive_truth_table
+from faults import FaultSimulator, default_vectors
+from netlist_io import read_any
+from timing import TimedSimulator
+
+
+def format_header(inputs, outputs):
+    return " ".join(inputs) + " | " + " ".join(outputs)
+
+
+def load(path):
+    """Схема из файла; None, если ее не удалось прочитать (сообщение уже выведено)"""
+    try:
+        return read_any(path)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+    except KeyError as e:
+        print(f"{path}: нет поля {e}", file=sys.stderr)
+    return None
+
+
+def print_progress(done, total):
+    print(f"\rблоков: {done}/{total}", end="" if done < total else "\n", file=sys.stderr)
+
+
+def cmd_table(args):
+    netlist = load(args.circuit)
+    if netlist is None: return 2
+    table = exhaustive_truth_table(netlist, workers=args.jobs, progress=print_progress if args.progress else None)
+    print(format_header(table.inputs, table.outputs))
+    for i in range(table.num_rows):
+        print(" ".join(table.row(i)))
+    return 0
+
+
+def read_vectors(args):
+    yield from args.vectors
+    if args.file:
+        f = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line: yield line
+
+
+def cmd_eval(args):
+    netlist = load(args.circuit)
+    if netlist is None: return 2
+    evaluator = BatchEvaluator(netlist)
+    inputs, outputs = evaluator.inputs, evaluator.outputs
+    print(format_header([g.name for g in inputs], [f"O{i+1}" for i in range(len(outputs))]))
+
+    # Векторы идут пачками; после '|' в строке могут стоять ожидаемые выходы — здесь они не нужны
+    try:
+        for _, bits, values in evaluator.evaluate(parse_vectors(read_vectors(args))):
+            print(" ".join(bits) + " | " + " ".join(values))
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+
+def cmd_check(args):
+    netlist = load(args.circuit)
+    if netlist is None: return 2
+    records = parse_vectors(sys.stdin) if args.vectors == "-" else read_vector_file(args.vectors)
+    try:
+        evaluator = BatchEvaluator(netlist, chunk=args.chunk)
+        for mismatch in evaluator.check(records):
+            if args.limit is None or evaluator.mismatches <= args.limit:
+                print(mismatch)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(f"проверено векторов: {evaluator.checked}, расхождений: {evaluator.mismatches}", file=sys.stderr)
+    return 1 if evaluator.mismatches else 0
+
+
+def format_assignment(assignment):
+    return " ".join(f"{name}={bit}" for name, bit in assignment.items())
+
+
+def cmd_equiv(args):
+    netlist = load(args.circuit)
+    if netlist is None: return 2
+    if args.expr is None and args.reference is None:
+        print("Нужно выражение (-e) или эталонная схема", file=sys.stderr)
+        return 2
+    try:
+        if args.expr is not None:
+            results = [check_expression(netlist, args.output - 1, args.expr)]
+            names = [f"O{args.output}"]
+        else:
+            reference = load(args.reference)
+            if reference is None: return 2
+            results = compare_circuits(netlist, reference)
+            names = [f"O{i+1}" for i in range(len(results))]
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    for name, counterexample in zip(names, results):
+        if counterexample is None:
+            print(f"{name}: эквивалентно")
+        else:
+            print(f"{name}: отличается, например при {format_assignment(counterexample)}")
+    return 0 if all(r is None for r in results) else 1
+
+
+def cmd_bdd(args):
+    netlist = load(args.circuit)
+    if netlist is None: return 2
+    try:
+        bdd, roots = build_bdd(netlist, reorder_vars=args.reorder)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print("порядок: " + " ".join(bdd.names))
+    for i, root in enumerate(roots):
+        print(f"O{i+1}: узлов {bdd.size([root])}, наборов {bdd.count(root)} из {1 << len(bdd.names)}")
+        if args.cubes:
+            for cube in bdd.cubes(root):
+                print("  " + cube)
+    return 0
+
+
+def parse_pairs(items, what):
+    """Список "ИМЯ=значение" в словарь; ValueError при неверной записи"""
+    result = {}
+    for item in items:
+        name, sep, value = item.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Некорректная запись {what}: {item!r}")
+        result[name] = value
+    return result
+
+
+def parse_int(text, what):
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"Некорректное число ({what}): {text!r}") from None
+
+
+def cmd_timed(args):
+    netlist = load(args.circuit)
+    if netlist is None: return 2
+    try:
+        delays = {t: parse_int(v, "задержка") for t, v in parse_pairs(args.delay, "задержки").items()}
+        by_name = {g.name: g for g in netlist if g.g_type == 'INPUT'}
+        stimuli = {}
+        for name, spec in parse_pairs(args.set, "изменений входа").items():
+            if name not in by_name:
+                raise ValueError(f"Нет входа {name}")
+            changes = [part.partition(":") for part in spec.split(",")]
+            stimuli[by_name[name]] = [(parse_int(t, "момент"), parse_int(v, "значение") & 1) for t, _, v in changes]
+        simulator = TimedSimulator(netlist, delays)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    inputs, outputs = netlist.ports()
+    clocks = sorted((g for g in netlist if g.g_type == 'CLOCK'), key=lambda g: g.name)
+    watch = inputs + clocks + outputs
+    result = simulator.run(args.time, watch=watch, stimuli=stimuli)
+    # Диаграмма в виде списка изменений: начальное значение | момент:значение ...
+    for i, gate in enumerate(watch):
+        wave = result.waves[gate]
+        name = gate.name if gate.g_type != 'OUTPUT' else f"O{i - len(inputs) - len(clocks) + 1}"
+        line = f"{name}: {wave.initial}"
+        if len(wave):
+            line += " | " + " ".join(f"{t}:{v}" for t, v in wave.changes())
+        print(line)
+    rate = result.events / result.elapsed if result.elapsed else 0
+    print(f"событий: {result.events}, пересчетов: {result.evaluations}, "
+          f"{result.elapsed:.3f} с ({rate:.0f} событий/с)", file=sys.stderr)
+    return 0
+
+
+def cmd_faults(args):
+    netlist = load(args.circuit)
+    if netlist is None: return 2
+    try:
+        simulator = FaultSimulator(netlist)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    n = len(simulator.inputs)
+    if args.vectors or args.file:
+        vectors = []
+        try:
+            for vector in read_vectors(args):
+                bits = vector.replace(" ", "")
+                if len(bits) != n or set(bits) - {"0", "1"}:
+                    raise ValueError(f"Некорректный вектор: {vector!r} (нужно {n} бит)")
+                vectors.append(int(bits, 2) if bits else 0)
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 2
+    else:
+        vectors = default_vectors(n, args.random, args.seed)
+
+    report = simulator.run(vectors)
+    fmt = lambda v: format(v, f"0{n}b") if n else ""
+    print(f"неисправностей: {len(report.faults)}, обнаружено: {len(report.detected)} "
+          f"({report.coverage:.1%}) на {report.num_vectors} векторах")
+    print(f"сжатый тест ({len(report.tests)} векторов): " + " ".join(g.name for g in simulator.inputs))
+    for vector in report.tests:
+        print("  " + fmt(vector))
+    if args.list:
+        for fault in report.faults:
+            vector = report.detected.get(fault)
+            print(f"  {fault}: " + (fmt(vector) if vector is not None else "не обнаружена"))
+    elif report.undetected:
+        print("не обнаружены: " + ", ".join(map(str, report.undetected)))
+    return 0 if not report.undetected else 1
+
+
+def cmd_bench(args):
+    import benchmarks  # Генераторы и замеры нужны только этой команде
+    names = args.circuit or None
+    unknown = set(names or ()) - set(benchmarks.GENERATORS)
+    if unknown:
+        print(f"Неизвестные схемы: {', '.join(sorted(unknown))} "
+              f"(есть: {', '.join(benchmarks.GENERATORS)})", file=sys.stderr)
+        return 2
+    try:
+        baseline = benchmarks.load_results(args.compare) if args.compare else None
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    log = (lambda line: print(line, file=sys.stderr)) if not args.silent else None
+    results = benchmarks.run_suite(names, quick=args.quick, repeat=args.repeat, gui=not args.no_gui, log=log)
+    if args.output:
+        benchmarks.save_results(results, args.output)
+    else:
+        print(json.dumps(results, ensure_ascii=False, indent=1))
+    if baseline is None:
+        return 0
+    lines, regressions = benchmarks.compare(results, baseline, args.threshold or benchmarks.REGRESSION_RATIO)
+    for line in lines:
+        print(line, file=sys.stderr)
+    print(f"регрессий: {regressions}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def cmd_gui(args):
+    import logic_simulator  # tkinter подгружается только здесь
+    logic_simulator.main(profile=getattr(args, "profile", None))  # Без команды — gui по умолчанию
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Симулятор логических схем")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("table", help="вывести таблицу истинности схемы")
+    p.add_argument("circuit", help="файл схемы (.json, .bench, .blif)")
+    p.add_argument("-j", "--jobs", type=int, help="число процессов для перебора (по умолчанию — все ядра)")
+    p.add_argument("--progress", action="store_true", help="показывать ход перебора в stderr")
+    p.set_defaults(func=cmd_table)
+
+    p = sub.add_parser("eval", help="вычислить схему на входных векторах")
+    p.add_argument("circuit", help="файл схемы (.json, .bench, .blif)")
+    p.add_argument("vectors", nargs="*", help="векторы из 0/1 по входам в порядке имен")
+    p.add_argument("-f", "--file", help="файл с векторами, по одному в строке ('-' — stdin)")
+    p.set_defaults(func=cmd_eval)
+
+    p = sub.add_parser("check", help="проверить схему на файле векторов с ожидаемыми выходами")
+    p.add_argument("circuit", help="файл схемы (.json, .bench, .blif)")
+    p.add_argument("vectors", help="файл строк «входы | выходы», x — безразлично ('-' — stdin)")
+    p.add_argument("-c", "--chunk", type=int, default=BATCH_VECTORS,
+                   help=f"векторов в пачке (по умолчанию {BATCH_VECTORS})")
+    p.add_argument("-l", "--limit", type=int, help="выводить не больше стольких расхождений")
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("equiv", help="проверить эквивалентность выражению или другой схеме (через BDD)")
+    p.add_argument("circuit", help="файл схемы (.json, .bench, .blif)")
+    p.add_argument("reference", nargs="?", help="эталонная схема: выходы сравниваются попарно")
+    p.add_argument("-e", "--expr", help="выражение над входами, например \"A & ~B | C\"")
+    p.add_argument("-o", "--output", type=int, default=1, help="номер выхода для -e (по умолчанию 1)")
+    p.set_defaults(func=cmd_equiv)
+
+    p = sub.add_parser("bdd", help="сводка BDD выходов: размер и число выполняющих наборов")
+    p.add_argument("circuit", help="файл схемы (.json, .bench, .blif)")
+    p.add_argument("--cubes", action="store_true", help="вывести компактную таблицу истинности (кубы)")
+    p.add_argument("--reorder", action="store_true", help="улучшить порядок переменных просеиванием")
+    p.set_defaults(func=cmd_bdd)
+
+    p = sub.add_parser("timed", help="моделирование с задержками: диаграммы входов и выходов")
+    p.add_argument("circuit", help="файл схемы (.json, .bench, .blif)")
+    p.add_argument("-t", "--time", type=int, default=100, help="длительность прогона (по умолчанию 100)")
+    p.add_argument("-d", "--delay", action="append", default=[], help="задержка типа вентиля, например AND=3")
+    p.add_argument("-s", "--set", action="append", default=[],
+                   help="изменения входа: ИМЯ=момент:значение,... (например A=50:1,120:0)")
+    p.set_defaults(func=cmd_timed)
+
+    p = sub.add_parser("faults", help="моделирование неисправностей «константа 0/1»: покрытие и тест")
+    p.add_argument("circuit", help="файл схемы (.json, .bench, .blif)")
+    p.add_argument("vectors", nargs="*", help="векторы из 0/1 (по умолчанию — все или случайные)")
+    p.add_argument("-f", "--file", help="файл с векторами, по одному в строке ('-' — stdin)")
+    p.add_argument("-n", "--random", type=int, help="число случайных векторов")
+    p.add_argument("--seed", type=int, help="зерно генератора случайных векторов")
+    p.add_argument("--list", action="store_true", help="вывести все неисправности с обнаруживающими векторами")
+    p.set_defaults(func=cmd_faults)
+
+    p = sub.add_parser("bench", help="замеры производительности на синтетических схемах (JSON)")
+    p.add_argument("circuit", nargs="*", help="генераторы схем (по умолчанию — все)")
+    p.add_argument("-o", "--output", help="файл для результатов (по умолчанию — stdout)")
+    p.add_argument("--compare", help="прошлые результаты: отметить регрессии (код возврата 1)")
+    p.add_argument("--threshold", type=float, help="во сколько раз медленнее — регрессия (по умолчанию 1.3)")
+    p.add_argument("-r", "--repeat", type=int, default=3, help="повторов каждого замера (3)")
+    p.add_argument("--quick", action="store_true", help="только малые размеры схем")
+    p.add_argument("--no-gui", action="store_true", help="без замеров на холсте")
+    p.add_argument("--silent", action="store_true", help="не выводить ход замеров в stderr")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("gui", help="открыть графический интерфейс")
+    p.add_argument("--profile", help="записать профиль cProfile всего сеанса в файл (для pstats)")
+    p.set_defaults(func=cmd_gui)
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        return cmd_gui(args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1143 @@
+"""Ядро симулятора логических схем без графического интерфейса.
+
+Модель (вентили, соединения, индексированная схема), левелизованное и
+побитово-параллельное вычисление и таблицы истинности.
+Модуль не импортирует tkinter и может использоваться на машинах без дисплея.
+"""
+import heapq
+import threading
+import weakref
+from array import array
+from collections import Counter, OrderedDict
+
+# --- КОНФИГУРАЦИЯ И КОНСТАНТЫ ---
+GATE_WIDTH = 70
+GATE_HEIGHT = 50
+
+MAX_LOOP_ITERATIONS = 32  # Предел итераций для контуров обратной связи
+CODE_CACHE_SIZE = 64      # Сколько скомпилированных схем хранить в LRU-кэше
+LUT_MAX_INPUTS = 12       # Блоки с не более чем столькими входами получают таблицу (LUT)
+BLOCK_MAX_OUTPUTS = 8     # Выходы блока упакованы в один байт значения
+BLOCK_PORT_STEP = 16      # Шаг портов по высоте у блока
+CLOCK_HALF_PERIOD = 10    # Полупериод тактового генератора по умолчанию (единиц времени)
+UID_INDEX_SLACK = 4096    # На сколько uid может обгонять плотный индекс схемы; дальше — словарь
+
+LOGIC_TYPES_2_INPUT = ('AND', 'NAND', 'NOR', 'OR', 'XNOR', 'XOR')
+LOGIC_TYPES_1_INPUT = ('NOT',)
+BLOCK_TYPES = ('BLOCK', 'PIN')  # Экземпляр пользовательского блока и его выход
+SOURCE_TYPES = ('INPUT', 'CLOCK')  # Источники: значение задается извне, а не вычисляется
+GATE_TYPES = ('INPUT', 'OUTPUT') + LOGIC_TYPES_2_INPUT + LOGIC_TYPES_1_INPUT + BLOCK_TYPES + ('CLOCK',)
+
+# --- КОМПАКТНОЕ ХРАНИЛИЩЕ ---
+
+TYPE_CODE = {t: i for i, t in enumerate(GATE_TYPES)}
+INPUT_CODE = TYPE_CODE['INPUT']
+CLOCK_CODE = TYPE_CODE['CLOCK']
+BLOCK_CODE = TYPE_CODE['BLOCK']
+PIN_CODE = TYPE_CODE['PIN']
+# Число входов по типу; у BLOCK оно берется из описания блока
+ARITY = tuple(2 if t in LOGIC_TYPES_2_INPUT else (1 if t in LOGIC_TYPES_1_INPUT or t in ('OUTPUT', 'PIN') else 0)
+              for t in GATE_TYPES)
+# Таблица истинности типа: бит (a << 1 | b) — выход при входах a, b (для одного входа b = 0)
+TRUTH = tuple({
+    'INPUT': 0b0000, 'OUTPUT': 0b1100, 'NOT': 0b0011,
+    'AND': 0b1000, 'OR': 0b1110, 'NAND': 0b0111, 'NOR': 0b0001, 'XOR': 0b0110, 'XNOR': 0b1001,
+    'BLOCK': 0b0000, 'PIN': 0b0000,  # Вычисляются по таблице блока
+    'CLOCK': 0b0000,
+}[t] for t in GATE_TYPES)
+
+
+class GateStore:
+    """Вентили в виде структуры массивов: одна строка на вентиль.
+
+    Тип, значение, координаты и uid лежат в типизированных массивах array;
+    LogicGate — лишь ссылка (хранилище, строка) на них, создаваемая по
+    требованию (view) и живущая, пока на нее ссылаются. Входы — слоты:
+    у строки они занимают first[row] .. first[row] + arity - 1 (не меньше
+    двух), в слоте — строка драйвера. Нагрузки строки — односвязный список
+    слотов от head[row] по next. Освободившиеся строки и слоты переиспользуются.
+    """
+    def __init__(self):
+        self.kind = array('b')       # Код типа (индекс в GATE_TYPES)
+        self.value = array('B')      # 0/1; у BLOCK — упакованные выходы
+        self.x = array('d')
+        self.y = array('d')
+        self.uid = array('q')
+        self.first = array('i')      # Строка -> первый слот входов
+        self.head = array('i')       # Строка -> первый слот-нагрузка или -1
+        self.fanin = array('i')      # Слот -> строка драйвера или -1
+        self.next = array('i')       # Слот -> следующий слот в списке нагрузок драйвера или -1
+        self.owner = array('i')      # Слот -> строка, чей это вход
+        self.names = []
+        self.views = weakref.WeakValueDictionary()  # Строка -> живой LogicGate
+        self.views_peak = 0          # Наибольшее число живых представлений с прошлого сжатия
+        self.views_added = 0
+        self.extra = {}              # Строка -> Component у BLOCK, номер выхода у PIN, полупериод у CLOCK
+        self.free = []
+        self.spare = {}              # Число слотов -> начала свободных групп слотов
+
+    def arity(self, row):
+        kind = self.kind[row]
+        return len(self.extra[row].inputs) if kind == BLOCK_CODE else ARITY[kind]
+
+    def view(self, row):
+        """LogicGate строки: тот же объект, пока на него есть ссылки"""
+        gate = self.views.get(row)
+        if gate is None:
+            gate = LogicGate.__new__(LogicGate)
+            gate.at = (self, row)
+            self.remember(row, gate)
+        return gate
+
+    def remember(self, row, gate):
+        # Таблица словаря не сжимается при удалении: после массового создания
+        # представлений (импорт, построение схемы) переносим живые в новый словарь
+        views = self.views
+        self.views_added += 1
+        if not self.views_added & 0x3FF:
+            live = len(views)
+            if live > self.views_peak: self.views_peak = live
+            elif live < self.views_peak >> 3:
+                self.views = views = weakref.WeakValueDictionary(views)
+                self.views_peak = live
+        views[row] = gate
+
+    def get_driver(self, row, idx):
+        return self.fanin[self.first[row] + idx]
+
+    def set_driver(self, row, idx, drv):
+        """Подключает вход idx строки row к драйверу drv (-1 — отключает)"""
+        slot = self.first[row] + idx
+        old = self.fanin[slot]
+        if old >= 0:
+            prev, cur = -1, self.head[old]
+            while cur != slot:
+                prev, cur = cur, self.next[cur]
+            if prev < 0: self.head[old] = self.next[slot]
+            else: self.next[prev] = self.next[slot]
+        self.fanin[slot] = drv
+        if drv >= 0:
+            self.next[slot] = self.head[drv]
+            self.head[drv] = slot
+
+    def sinks(self, row):
+        """(строка, вход) всех нагрузок строки"""
+        slot = self.head[row]
+        while slot >= 0:
+            owner = self.owner[slot]
+            yield owner, slot - self.first[owner]
+            slot = self.next[slot]
+
+    def alloc(self, kind, x, y, uid, name, value=0, extra=None):
+        row = self.place(kind, x, y, uid, name, value)
+        if extra is not None: self.extra[row] = extra
+        self.first[row] = self.take_slots(row, max(2, self.arity(row)))
+        return row
+
+    def take_slots(self, row, count):
+        spare = self.spare.get(count)
+        if spare:
+            base = spare.pop()
+            for slot in range(base, base + count):
+                self.fanin[slot] = self.next[slot] = -1
+                self.owner[slot] = row
+        else:
+            base = len(self.fanin)
+            self.fanin.extend(array('i', [-1]) * count)
+            self.next.extend(array('i', [-1]) * count)
+            self.owner.extend(array('i', [row]) * count)
+        return base
+
+    def place(self, kind, x, y, uid, name, value):
+        if self.free:
+            row = self.free.pop()
+            self.kind[row] = kind
+            self.value[row] = value
+            self.x[row] = x
+            self.y[row] = y
+            self.uid[row] = uid
+            self.head[row] = -1
+            self.names[row] = name
+            return row
+        self.kind.append(kind)
+        self.value.append(value)
+        self.x.append(x)
+        self.y.append(y)
+        self.uid.append(uid)
+        self.first.append(-1)
+        self.head.append(-1)
+        self.names.append(name)
+        return len(self.kind) - 1
+
+    def release(self, row):
+        """Освобождает строку; ее соединения должны быть уже разорваны"""
+        self.spare.setdefault(max(2, self.arity(row)), []).append(self.first[row])
+        self.views.pop(row, None)
+        self.names[row] = None
+        self.extra.pop(row, None)
+        self.free.append(row)
+
+
+ONE = object()  # Драйвер-константа 1 в сокращенной схеме (None — константа 0)
+
+
+# --- КЛАССЫ ЛОГИКИ ---
+
+class LogicGate:
+    """Класс, описывающий логический блок (представление строки GateStore).
+
+    Вентиль вне схемы (новый или удаленный) живет в собственном маленьком
+    хранилище и уходит вместе с ним; схема освобождает строки сама.
+    """
+    __slots__ = ('at', '__weakref__')  # at — (хранилище, строка): меняются одним присваиванием
+
+    def __init__(self, g_type, x, y, uid, name=None, extra=None):
+        store = GateStore()
+        self.at = (store, store.alloc(TYPE_CODE[g_type], x, y, uid, name, extra=extra))
+
+    @property
+    def store(self):
+        return self.at[0]
+
+    @property
+    def row(self):
+        return self.at[1]
+
+    def adopt(self, store):
+        """Переносит строку вентиля в другое хранилище и освобождает старую"""
+        old, row = self.at
+        new = store.alloc(old.kind[row], old.x[row], old.y[row], old.uid[row], old.names[row],
+                          old.value[row], old.extra.get(row))
+        store.remember(new, self)
+        self.at = (store, new)
+        old.release(row)
+
+    @property
+    def g_type(self):
+        store, row = self.at
+        return GATE_TYPES[store.kind[row]]
+
+    @property
+    def arity(self):
+        store, row = self.at
+        return store.arity(row)
+
+    @property
+    def extra(self):
+        """Описание блока (Component) у BLOCK, номер выхода у PIN"""
+        store, row = self.at
+        return store.extra.get(row)
+
+    @property
+    def width(self):
+        return 0 if self.g_type == 'PIN' else GATE_WIDTH
+
+    @property
+    def height(self):
+        g_type = self.g_type
+        if g_type == 'PIN': return 0
+        if g_type == 'BLOCK':
+            ports = max(self.arity, len(self.extra.outputs))
+            return max(GATE_HEIGHT, (ports + 1) * BLOCK_PORT_STEP)
+        return GATE_HEIGHT
+
+    @property
+    def uid(self):
+        store, row = self.at
+        return store.uid[row]
+
+    @property
+    def name(self):
+        store, row = self.at
+        return store.names[row]
+
+    @name.setter
+    def name(self, name):
+        store, row = self.at
+        store.names[row] = name
+
+    @property
+    def value(self):
+        store, row = self.at
+        return bool(store.value[row])
+
+    @value.setter
+    def value(self, value):
+        store, row = self.at
+        store.value[row] = 1 if value else 0
+
+    @property
+    def x(self):
+        store, row = self.at
+        return store.x[row]
+
+    @x.setter
+    def x(self, x):
+        store, row = self.at
+        store.x[row] = x
+
+    @property
+    def y(self):
+        store, row = self.at
+        return store.y[row]
+
+    @y.setter
+    def y(self, y):
+        store, row = self.at
+        store.y[row] = y
+
+    def get_input_pos(self, index):
+        total_inputs = self.arity
+        if total_inputs == 0 or self.g_type == 'PIN': return None
+        step = self.height / (total_inputs + 1)
+        py = self.y + step * (index + 1)
+        return (self.x, py)
+
+    def get_output_pos(self):
+        g_type = self.g_type
+        if g_type in ('OUTPUT', 'BLOCK'): return None
+        if g_type == 'PIN': return (self.x, self.y)  # PIN стоит прямо на правой стороне блока
+        return (self.x + GATE_WIDTH, self.y + GATE_HEIGHT / 2)
+
+
+class Connection:
+    """Класс, описывающий соединение.
+
+    Схема хранит только слот драйвера в массиве fanin; объекты соединений
+    создаются по запросу и сравниваются по значению.
+    """
+    __slots__ = ('from_gate', 'to_gate', 'to_idx')
+
+    def __init__(self, from_gate, to_gate, to_idx):
+        self.from_gate = from_gate
+        self.to_gate = to_gate
+        self.to_idx = to_idx
+
+    def __eq__(self, other):
+        return (isinstance(other, Connection) and self.from_gate is other.from_gate
+                and self.to_gate is other.to_gate and self.to_idx == other.to_idx)
+
+    def __hash__(self):
+        return hash((id(self.from_gate), id(self.to_gate), self.to_idx))
+
+
+class Netlist:
+    """Индексированная схема: вентили по uid, входные слоты и нагрузки каждого вентиля.
+
+    Все вентили схемы лежат в одном GateStore; соединения — это слоты входов
+    (строка драйвера) и списки нагрузок в том же хранилище.
+    """
+    def __init__(self):
+        self.store = GateStore()
+        self.index = array('i')     # uid -> строка или -1 (плотная часть)
+        self.sparse = {}            # uid -> строка для uid вне плотной части
+        self.size = 0
+        self.type_count = Counter()
+        self.library = {}           # Имя -> Component: блоки, доступные в этой схеме
+
+    def __iter__(self):
+        """Вентили в порядке uid (для схем, собираемых по порядку, — в порядке создания)"""
+        view = self.store.view
+        sparse = sorted(self.sparse.items())
+        for uid, row in sparse:
+            if uid < 0: yield view(row)
+        for row in self.index:
+            if row >= 0: yield view(row)
+        for uid, row in sparse:
+            if uid >= 0: yield view(row)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, gate):
+        return gate.store is self.store
+
+    def gate(self, uid):
+        index = self.index
+        row = index[uid] if 0 <= uid < len(index) else self.sparse.get(uid, -1)
+        return self.store.view(row) if row >= 0 else None
+
+    def set_row(self, uid, row):
+        """Запись индекса uid -> строка (-1 — удалить)"""
+        index = self.index
+        if 0 <= uid < len(index):
+            index[uid] = row
+        elif 0 <= uid < len(index) + UID_INDEX_SLACK:
+            index.extend(array('i', [-1]) * (uid + 1 - len(index)))
+            for u in [u for u in self.sparse if 0 <= u < len(index)]:
+                index[u] = self.sparse.pop(u)
+            index[uid] = row
+        elif row >= 0:
+            self.sparse[uid] = row
+        else:
+            self.sparse.pop(uid, None)
+
+    def count(self, g_type):
+        return self.type_count[g_type]
+
+    def add_gate(self, gate):
+        gate.adopt(self.store)
+        self.set_row(gate.uid, gate.row)
+        self.size += 1
+        self.type_count[gate.g_type] += 1
+
+    def remove_gate(self, gate):
+        """Удаляет вентиль вместе с его соединениями; возвращает удаленные соединения"""
+        removed = self.connections_of(gate)
+        for conn in removed:
+            self.disconnect(conn)
+        self.set_row(gate.uid, -1)
+        self.size -= 1
+        self.type_count[gate.g_type] -= 1
+        gate.adopt(GateStore())
+        return removed
+
+    def driver(self, gate, idx):
+        """Соединение, подключенное ко входу idx вентиля gate (или None)"""
+        drv = self.store.get_driver(gate.row, idx)
+        return Connection(self.store.view(drv), gate, idx) if drv >= 0 else None
+
+    def connect(self, conn):
+        self.store.set_driver(conn.to_gate.row, conn.to_idx, conn.from_gate.row)
+
+    def disconnect(self, conn):
+        if conn.to_gate not in self or conn.from_gate not in self: return False
+        store = self.store
+        row, idx = conn.to_gate.row, conn.to_idx
+        if store.get_driver(row, idx) != conn.from_gate.row: return False
+        store.set_driver(row, idx, -1)
+        return True
+
+    def connections_of(self, gate):
+        """Все соединения вентиля: O(степень), без просмотра всей схемы"""
+        store, row = self.store, gate.row
+        view = store.view
+        conns = [c for c in (self.driver(gate, i) for i in range(gate.arity)) if c is not None]
+        for sink, idx in store.sinks(row):
+            conns.append(Connection(gate, view(sink), idx))
+        return conns
+
+    @property
+    def connections(self):
+        store = self.store
+        view, first, fanin = store.view, store.first, store.fanin
+        conns = []
+        for gate in self:
+            base = first[gate.row]
+            for idx in range(gate.arity):
+                drv = fanin[base + idx]
+                if drv >= 0: conns.append(Connection(view(drv), gate, idx))
+        return conns
+
+    def pins(self, block):
+        """Вентили-выходы PIN экземпляра блока в порядке номеров выходов"""
+        return sorted((c.to_gate for c in self.connections_of(block)
+                       if c.from_gate is block and c.to_gate.g_type == 'PIN'), key=lambda g: g.extra)
+
+    def ports(self):
+        """Входы (по имени) и выходы (по порядку создания) — столбцы таблицы истинности"""
+        inputs = sorted([g for g in self if g.g_type == 'INPUT'], key=lambda g: g.name)
+        outputs = sorted([g for g in self if g.g_type == 'OUTPUT'], key=lambda g: g.uid)
+        return inputs, outputs
+
+
+class CompiledNetlist:
+    """Левелизованная схема: топологический порядок вентилей и контуры обратной связи.
+
+    Строится один раз на каждое структурное изменение схемы. Вентили вне контуров
+    вычисляются ровно один раз за проход, контуры (сильно связные компоненты)
+    итерируются до неподвижной точки с ограничением MAX_LOOP_ITERATIONS.
+
+    С optimize=True вычисляется сокращенная схема (см. optimize()): значения
+    получают только входы и вентили, от которых зависят выходы.
+    """
+    def __init__(self, gates, connections, optimize=True):
+        self.gates = list(gates)
+        self.drivers = {g: [None] * g.arity for g in self.gates}
+        self.fanout = {g: [] for g in self.gates}
+        for conn in connections:
+            self.drivers[conn.to_gate][conn.to_idx] = conn.from_gate
+            self.fanout[conn.from_gate].append(conn.to_gate)
+
+        # Список компонент в топологическом порядке: (вентили, это_контур)
+        self.components = self.levelize(self.gates)
+        if optimize:
+            self.components = self.levelize(self.optimize())
+        self.unstable = set()
+        self.evaluated = False
+        self.gate_hash = None
+        self.function = None
+        # Счетчики работы (для панели метрик): проходы по схеме или контуру и пересчеты вентилей
+        self.sweeps = 0
+        self.evaluations = 0
+
+        # Порядок вычисления для сгенерированного кода
+        self.order = [g for members, _ in self.components for g in members]
+        self.input_order = [g for g in self.order if g.g_type in SOURCE_TYPES]
+        self.position = {g: k for k, g in enumerate(self.order)}
+
+        # Плоские массивы для событийного прохода; индекс — позиция в order.
+        # Значения читаются и пишутся прямо в массив value хранилища схемы.
+        n = len(self.order)
+        self.store = self.order[0].store if self.order else GateStore()
+        if any(g.store is not self.store for g in self.order):
+            raise ValueError("Вентили должны принадлежать одной схеме (Netlist)")
+        self.rows = array('q', (g.row for g in self.order))
+        self.kinds = array('b', (self.store.kind[r] for r in self.rows))
+        # Позиции драйверов (-1 — константа 0, -2 — константа 1): у вентиля
+        # с позицией p они лежат в in_pos[in_start[p]:in_start[p+1]]; у всех,
+        # кроме BLOCK (там ровно по входу блока), не меньше двух
+        self.in_start = array('q', [0])
+        self.in_pos = array('q')
+        for g in self.order:
+            drivers = self.drivers[g]
+            if g.g_type != 'BLOCK': drivers = drivers + [None] * (2 - len(drivers))
+            self.in_pos.extend(self.position[d] if d is not None and d is not ONE else (-2 if d is ONE else -1)
+                               for d in drivers)
+            self.in_start.append(len(self.in_pos))
+        # Описания блоков (BLOCK) и номера выходов (PIN) по позициям
+        self.extra = {p: g.extra for p, g in enumerate(self.order) if g.g_type in BLOCK_TYPES}
+        self.sink_start = array('q', [0])
+        self.sinks = array('q')
+        for g in self.order:
+            self.sinks.extend(self.position[s] for s in self.fanout[g])
+            self.sink_start.append(len(self.sinks))
+        # Компонента k занимает позиции comp_start[k] .. comp_start[k+1]-1
+        self.comp_start = array('q', [0])
+        self.comp_loop = bytearray()
+        self.comp_of = array('q')
+        for k, (members, is_loop) in enumerate(self.components):
+            self.comp_start.append(self.comp_start[-1] + len(members))
+            self.comp_loop.append(is_loop)
+            self.comp_of.extend([k] * len(members))
+        self.bad = bytearray(n)   # Маска колебаний по позициям
+
+    def levelize(self, gates):
+        """Алгоритм Тарьяна (без рекурсии): компоненты в топологическом порядке"""
+        order = {g: i for i, g in enumerate(gates)}
+        index, low = {}, {}
+        stack, on_stack = [], set()
+        components = []
+        counter = 0
+
+        for root in gates:
+            if root in index: continue
+            work = [(root, 0)]
+            while work:
+                gate, child = work.pop()
+                if child == 0:
+                    index[gate] = low[gate] = counter
+                    counter += 1
+                    stack.append(gate)
+                    on_stack.add(gate)
+
+                succ = self.fanout[gate]
+                if child < len(succ):
+                    work.append((gate, child + 1))
+                    nxt = succ[child]
+                    if nxt not in index:
+                        work.append((nxt, 0))
+                    elif nxt in on_stack:
+                        low[gate] = min(low[gate], index[nxt])
+                    continue
+
+                if low[gate] == index[gate]:
+                    members = []
+                    while True:
+                        g = stack.pop()
+                        on_stack.discard(g)
+                        members.append(g)
+                        if g is gate: break
+                    members.sort(key=order.get)
+                    is_loop = len(members) > 1 or gate in self.fanout[gate]
+                    components.append((members, is_loop))
+
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[gate])
+
+        components.reverse()
+        return components
+
+    def optimize(self):
+        """Сокращает схему для вычисления, не трогая сами вентили и соединения.
+
+        Переписывает drivers в топологическом порядке: неподключенные входы (0)
+        и константы сворачиваются (драйвер None — 0, ONE — 1), двойное
+        отрицание и вентили-повторители заменяются своим входом, одинаковые
+        вентили с одинаковыми драйверами сливаются (hash-consing). Контуры
+        не упрощаются. Возвращает вентили, от которых зависят выходы, и все входы.
+        """
+        drivers = self.drivers
+        replace = {}   # Вентиль -> заменяющий драйвер (вентиль, None или ONE)
+        consed = {}    # (тип, драйверы) -> первый такой вентиль
+
+        def const(d):
+            return 0 if d is None else (1 if d is ONE else None)
+
+        def bit(kind, va, vb):
+            return (TRUTH[kind] >> (va << 1 | vb)) & 1
+
+        for members, is_loop in self.components:
+            for gate in members:
+                drivers[gate] = [replace.get(d, d) for d in drivers[gate]]
+            gate = members[0]
+            if is_loop or gate.g_type in SOURCE_TYPES + ('OUTPUT',) + BLOCK_TYPES: continue
+
+            kind = TYPE_CODE[gate.g_type]
+            a, b = (drivers[gate] + [None])[:2]
+            if gate.g_type == 'NOT': b = None
+            ca, cb = const(a), const(b)
+            if ca is not None and cb is not None:
+                replace[gate] = ONE if bit(kind, ca, cb) else None
+                continue
+            # Выход зависит от одной сети x: смотрим f(0) и f(1)
+            x = None
+            if ca is None and cb is not None:
+                x, f0, f1 = a, bit(kind, 0, cb), bit(kind, 1, cb)
+            elif ca is not None and cb is None:
+                x, f0, f1 = b, bit(kind, ca, 0), bit(kind, ca, 1)
+            elif a is b:
+                x, f0, f1 = a, bit(kind, 0, 0), bit(kind, 1, 1)
+            if x is not None:
+                if f0 == f1:
+                    replace[gate] = ONE if f0 else None
+                    continue
+                if f0 == 0:
+                    replace[gate] = x          # Повторитель
+                    continue
+                if x.g_type == 'NOT':
+                    replace[gate] = drivers[x][0]  # Двойное отрицание
+                    continue
+
+            ops = sorted((a, b), key=id) if gate.g_type != 'NOT' else [a]
+            key = (gate.g_type, *map(id, ops))
+            if key in consed:
+                replace[gate] = consed[key]
+            else:
+                consed[key] = gate
+
+        # Мертвые вентили: нет пути ни к одному выходу
+        live = set()
+        stack = [g for g in self.gates if g.g_type == 'OUTPUT']
+        while stack:
+            gate = stack.pop()
+            if gate in live: continue
+            live.add(gate)
+            stack.extend(d for d in drivers[gate] if d is not None and d is not ONE)
+        gates = [g for g in self.gates if g in live or g.g_type in SOURCE_TYPES]
+
+        self.drivers = {g: drivers[g] for g in gates}
+        self.fanout = {g: [] for g in gates}
+        for gate in gates:
+            for d in self.drivers[gate]:
+                if d is not None and d is not ONE: self.fanout[d].append(gate)
+        return gates
+
+    def evaluate(self):
+        """Вычисляет схему за один проход. Возвращает False, если есть колебания"""
+        values = self.store.value
+        return self.apply(*self.run([values[g.row] for g in self.input_order], 1))
+
+    def apply(self, values, bad):
+        """Записывает в вентили результат одиночного прогона run(..., 1)"""
+        store_values = self.store.value
+        for row, value in zip(self.rows, values):
+            store_values[row] = value
+        self.bad = bytearray(1 if b else 0 for b in bad)
+        # Сгенерированный код не отдает упакованные значения блоков — собираем их по драйверам
+        for p in self.extra:
+            if self.kinds[p] == BLOCK_CODE:
+                self.evaluate_block(p, BLOCK_CODE, self.in_start[p], self.in_start[p + 1])
+        self.unstable = {g for g, b in zip(self.order, self.bad) if b}
+        self.evaluated = True
+        # Итерации контуров внутри сгенерированного кода не видны — считается один проход
+        self.sweeps += 1
+        self.evaluations += len(self.order)
+        return not self.unstable
+
+    def run(self, input_words, mask):
+        """Вызывает скомпилированную функцию схемы.
+
+        input_words — слова входов в порядке input_order, mask — маска строк.
+        Возвращает (слова всех вентилей, маски колебаний) в порядке order.
+        """
+        if self.function is None:
+            self.function = compile_circuit(self)
+        return self.function(input_words, mask)
+
+    def propagate(self, source):
+        """Событийное распространение изменения сети source по ее конусу нагрузки.
+
+        Компоненты обрабатываются в порядке уровней, каждая не более одного раза;
+        распространение останавливается там, где выход вентиля не изменился.
+        Проход идет по целочисленным массивам позиций, без обхода объектов.
+        Возвращает список вентилей, чье значение или стабильность изменились.
+        """
+        if not self.evaluated:
+            self.evaluate()
+            return list(self.gates)
+
+        values, rows, bad = self.store.value, self.rows, self.bad
+        sinks, sink_start, comp_of = self.sinks, self.sink_start, self.comp_of
+        comp_start, comp_loop = self.comp_start, self.comp_loop
+        start = self.position[source]
+        changed = [start]
+        queue, scheduled = [], set()
+
+        def schedule(p):
+            for q in sinks[sink_start[p]:sink_start[p + 1]]:
+                k = comp_of[q]
+                if k not in scheduled:
+                    scheduled.add(k)
+                    heapq.heappush(queue, k)
+
+        schedule(start)
+        while queue:
+            k = heapq.heappop(queue)
+            lo, hi = comp_start[k], comp_start[k + 1]
+            before = [(values[rows[p]], bad[p]) for p in range(lo, hi)]
+            bad[lo:hi] = bytes(hi - lo)
+            if comp_loop[k]:
+                self.settle(lo, hi)
+            else:
+                self.evaluate_at(lo)
+                self.evaluations += 1
+            for p, old in zip(range(lo, hi), before):
+                if (values[rows[p]], bad[p]) != old:
+                    changed.append(p)
+                    schedule(p)
+
+        order, unstable = self.order, self.unstable
+        for p in changed:
+            if bad[p]: unstable.add(order[p])
+            else: unstable.discard(order[p])
+        return [order[p] for p in changed]
+
+    def evaluate_at(self, p):
+        """Вычисляет вентиль на позиции p по значениям его драйверов"""
+        kind = self.kinds[p]
+        values, rows, bad = self.store.value, self.rows, self.bad
+        if kind == INPUT_CODE or kind == CLOCK_CODE: return values[rows[p]]
+        start = self.in_start[p]
+        if kind == BLOCK_CODE or kind == PIN_CODE:
+            return self.evaluate_block(p, kind, start, self.in_start[p + 1])
+        a, b = self.in_pos[start], self.in_pos[start + 1]
+        va, vb = int(a == -2), int(b == -2)
+        if a >= 0:
+            va = values[rows[a]]
+            if bad[a]: bad[p] = 1
+        if b >= 0:
+            vb = values[rows[b]]
+            if bad[b]: bad[p] = 1
+        v = (TRUTH[kind] >> (va << 1 | vb)) & 1
+        values[rows[p]] = v
+        return v
+
+    def evaluate_block(self, p, kind, start, end):
+        """BLOCK — один индекс в таблице блока; PIN — бит упакованного значения блока"""
+        values, rows, bad = self.store.value, self.rows, self.bad
+        if kind == PIN_CODE:
+            q = self.in_pos[start]
+            v = 0
+            if q >= 0:
+                v = (values[rows[q]] >> self.extra[p]) & 1
+                if bad[q]: bad[p] = 1
+            values[rows[p]] = v
+            return v
+
+        index = 0
+        for q in self.in_pos[start:end]:
+            if q >= 0:
+                index = index << 1 | values[rows[q]]
+                if bad[q]: bad[p] = 1
+            else:
+                index = index << 1 | (q == -2)
+        v = self.extra[p].row_value(index)
+        values[rows[p]] = v
+        return v
+
+    def settle(self, lo, hi):
+        """Итерирует контур (позиции lo..hi-1) до неподвижной точки; при колебаниях помечает его нестабильным"""
+        values, rows, kinds, bad = self.store.value, self.rows, self.kinds, self.bad
+        # Исходное состояние контура — все входы в нуле, как при первом проходе
+        for p in range(lo, hi):
+            values[rows[p]] = self.extra[p].row_value(0) if kinds[p] == BLOCK_CODE else TRUTH[kinds[p]] & 1
+
+        # После MAX_LOOP_ITERATIONS проходов — еще один контрольный, как в сгенерированном
+        # коде: контур колеблется, только если этот проход что-то изменил
+        for _ in range(MAX_LOOP_ITERATIONS + 1):
+            changed = False
+            for p in range(lo, hi):
+                old = values[rows[p]]
+                if self.evaluate_at(p) != old: changed = True
+            self.sweeps += 1
+            self.evaluations += hi - lo
+            if not changed: break
+
+        if changed or any(bad[lo:hi]):
+            bad[lo:hi] = b"\x01" * (hi - lo)
+        return not changed
+
+    def truth_table(self, inputs, outputs):
+        """Таблица истинности за один проход: (число строк, слова выходов, маски колебаний)"""
+        n = len(inputs)
+        num_rows = 1 << n
+        mask = (1 << num_rows) - 1
+        position = {g: n - 1 - j for j, g in enumerate(inputs)}
+        # Источники вне таблицы (тактовые генераторы) держатся в нуле
+        input_words = [input_pattern(position[g], num_rows) if g in position else 0 for g in self.input_order]
+        words, unstable = self.run(input_words, mask)
+        index = self.position
+        return num_rows, [words[index[g]] for g in outputs], [unstable[index[g]] for g in outputs]
+
+    def structural_hash(self):
+        """Канонический хэш каждого вентиля: тип, имя входа и хэши его драйверов.
+
+        Не зависит от координат, uid и текущих значений входов, поэтому
+        одинаковые по структуре схемы получают одинаковые хэши.
+        """
+        if self.gate_hash is not None: return self.gate_hash
+        gate_hash = {}
+
+        def ref(drv):
+            if drv is None or drv is ONE: return int(drv is ONE)
+            return gate_hash.get(drv, 0)
+
+        def sig(gate):
+            g_type = gate.g_type
+            if g_type == 'BLOCK': return (g_type, gate.extra.key)
+            if g_type == 'PIN': return (g_type, gate.extra)
+            return g_type
+
+        for members, is_loop in self.components:
+            if not is_loop:
+                gate = members[0]
+                name = gate.name if gate.g_type in SOURCE_TYPES else None
+                gate_hash[gate] = hash((sig(gate), name, tuple(ref(d) for d in self.drivers[gate])))
+                continue
+            local = {g: i for i, g in enumerate(members)}
+            body = tuple(
+                (sig(g), tuple(('loop', local[d]) if d in local else ref(d) for d in self.drivers[g]))
+                for g in members
+            )
+            loop_hash = hash(body)
+            for g, i in local.items():
+                gate_hash[g] = hash((loop_hash, i))
+
+        self.gate_hash = gate_hash
+        return gate_hash
+
+    def code_key(self):
+        """Ключ сгенерированного кода: структурные хэши вентилей в порядке вычисления"""
+        gate_hash = self.structural_hash()
+        return tuple(gate_hash[g] for g in self.order)
+
+    def block_sources(self):
+        """Исходники функций блоков, которые использует схема (с вложенными), без повторов"""
+        sources = {}
+        for gate in self.order:
+            if gate.g_type == 'BLOCK':
+                sources.update(gate.extra.sources())
+        return sources
+
+    def generate_source(self, name="circuit"):
+        """Прямолинейный Python-код схемы: по локальной переменной на сеть.
+
+        Все операции побитовые, поэтому одна функция считает и одиночный
+        вектор (mask = 1), и все строки таблицы истинности сразу.
+        Функции блоков вставляются в тот же исходник перед функцией схемы,
+        так что код самодостаточен (годится для кэша и рабочих процессов).
+        """
+        index = self.position
+        blocks = self.block_sources()
+        lines = list(blocks.values())
+        if blocks:
+            lines.append("def _diff(a, b):\n    c = 0\n    for x, y in zip(a, b): c |= x ^ y\n    return c\n")
+        lines.append(f"def {name}(ins, m):")
+        emit = lines.append
+
+        # Маски колебаний нужны только ниже контуров — остальные статически 0
+        tainted = set()
+        for members, is_loop in self.components:
+            if is_loop or any(d in tainted for g in members for d in self.drivers[g]):
+                tainted.update(members)
+
+        def net(drv):
+            if drv is None or drv is ONE: return "m" if drv is ONE else "0"
+            return f"n{index[drv]}"
+
+        def expr(gate, zero=False):
+            drivers = self.drivers[gate]
+            if gate.g_type == 'BLOCK':
+                args = ", ".join("0" if zero else net(d) for d in drivers)
+                return f"{gate.extra.fname}(({args},), m)"
+            if gate.g_type == 'PIN':
+                drv = drivers[0]
+                return "0" if zero or drv is None or drv is ONE else f"{net(drv)}[{gate.extra}]"
+            if zero: return OP_EXPR[gate.g_type].format(a="0", b="0")
+            drivers = drivers + [None, None]
+            return OP_EXPR[gate.g_type].format(a=net(drivers[0]), b=net(drivers[1]))
+
+        def bad_of(gates, skip=()):
+            refs = {f"u{index[d]}" for g in gates for d in self.drivers[g]
+                    if d in tainted and d not in skip}
+            return " | ".join(sorted(refs)) or "0"
+
+        for j, gate in enumerate(self.input_order):
+            emit(f"    n{index[gate]} = ins[{j}]")
+
+        for members, is_loop in self.components:
+            if not is_loop:
+                gate = members[0]
+                if gate.g_type in SOURCE_TYPES: continue
+                k = index[gate]
+                emit(f"    n{k} = {expr(gate)}")
+                if gate in tainted:
+                    emit(f"    u{k} = {bad_of(members)}")
+                continue
+
+            # Контур: Гаусс-Зейдель от нулевого состояния, как в settle()
+            emit(f"    # контур из {len(members)} вентилей")
+            for gate in members:
+                emit(f"    n{index[gate]} = {expr(gate, zero=True)}")
+            sweep = []
+            for gate in members:
+                k = index[gate]
+                diff = f"_diff(t, n{k})" if gate.g_type == 'BLOCK' else f"t ^ n{k}"
+                sweep.append(f"t = {expr(gate)}; c |= {diff}; n{k} = t")
+            emit(f"    for _ in range({MAX_LOOP_ITERATIONS}):")
+            emit("        c = 0")
+            lines.extend("        " + line for line in sweep)
+            emit("        if not c: break")
+            emit("    else:")
+            emit("        c = 0")
+            lines.extend("        " + line for line in sweep)
+            emit(f"    u = c | {bad_of(members, skip=members)}")
+            for gate in members:
+                emit(f"    u{index[gate]} = u")
+
+        # Значение BLOCK — кортеж слов выходов; наружу отдаются только сети
+        values = ", ".join("0" if g.g_type == 'BLOCK' else f"n{index[g]}" for g in self.order)
+        bad = ", ".join(f"u{index[g]}" if g in tainted else "0" for g in self.order)
+        emit(f"    return ({values}{',' if self.order else ''}), ({bad}{',' if self.order else ''})")
+        return "\n".join(lines) + "\n"
+
+    def table_key(self, inputs, outputs):
+        """Ключ таблицы истинности: имена входов и структурные хэши выходов"""
+        gate_hash = self.structural_hash()
+        return (tuple(g.name for g in inputs), tuple(gate_hash[g] for g in outputs))
+
+
+# --- ТАБЛИЦЫ ИСТИННОСТИ ---
+
+# Побитовые операции над словами: бит i слова — значение сети в строке i
+OP_EXPR = {
+    'AND':  "{a} & {b}",
+    'OR':   "{a} | {b}",
+    'NAND': "~({a} & {b}) & m",
+    'NOR':  "~({a} | {b}) & m",
+    'XOR':  "{a} ^ {b}",
+    'XNOR': "~({a} ^ {b}) & m",
+    'NOT':  "~{a} & m",
+    'OUTPUT': "{a}",
+}
+
+_code_cache = OrderedDict()  # code_key() -> объект кода (LRU)
+_code_lock = threading.Lock()  # Кэш используется и из фонового потока GUI
+
+
+def clear_code_cache():
+    """Очищает кэш сгенерированного кода (например, для замеров холодного старта)"""
+    with _code_lock:
+        _code_cache.clear()
+
+
+def compile_circuit(compiled):
+    """Функция схемы из LRU-кэша кода; при промахе генерирует и компилирует исходник"""
+    key = compiled.code_key()
+    with _code_lock:
+        code = _code_cache.get(key)
+        if code is not None:
+            _code_cache.move_to_end(key)
+    if code is None:
+        code = compile(compiled.generate_source(), "<circuit>", "exec")
+        with _code_lock:
+            _code_cache[key] = code
+            if len(_code_cache) > CODE_CACHE_SIZE:
+                _code_cache.popitem(last=False)
+    namespace = {}
+    exec(code, namespace)
+    return namespace["circuit"]
+
+
+def input_pattern(position, num_rows):
+    """Слово для входа: бит i равен биту position номера строки i"""
+    half = 1 << position
+    period = half << 1
+    block = ((1 << half) - 1) << half
+    if period >= num_rows:
+        return block & ((1 << num_rows) - 1)
+    repunit = ((1 << num_rows) - 1) // ((1 << period) - 1)
+    return block * repunit
+
+
+class TruthTable:
+    """Таблица истинности в упакованном виде: по одному слову на выход"""
+    def __init__(self, inputs, outputs, num_rows, words, unstable):
+        self.inputs = inputs        # Имена входов (старший бит номера строки — первый вход)
+        self.outputs = outputs      # Заголовки столбцов выходов
+        self.num_rows = num_rows
+        self.words = words          # Бит i слова — значение выхода в строке i
+        self.unstable = unstable    # Бит i — выход колеблется в строке i
+
+    def __eq__(self, other):
+        return (isinstance(other, TruthTable) and self.inputs == other.inputs
+                and self.outputs == other.outputs and self.words == other.words
+                and self.unstable == other.unstable)
+
+    def row(self, i):
+        """Значения строки i в виде списка строк для Treeview"""
+        n = len(self.inputs)
+        vals = ["1" if (i >> (n - 1 - j)) & 1 else "0" for j in range(n)]
+        vals.append("|")
+        for word, bad in zip(self.words, self.unstable):
+            if (bad >> i) & 1: vals.append("~")
+            else: vals.append("1" if (word >> i) & 1 else "0")
+        return vals
+
+    def diff(self, other):
+        """Маска строк, в которых выходы отличаются от таблицы other"""
+        changed = 0
+        for a, b in zip(self.words, other.words): changed |= a ^ b
+        for a, b in zip(self.unstable, other.unstable): changed |= a ^ b
+        return changed
+
+
+def build_truth_table(netlist, compiled=None):
+    """Таблица истинности схемы (входы — по имени, выходы — O1, O2, ...)"""
+    compiled = compiled or CompiledNetlist(netlist, netlist.connections)
+    inputs, outputs = netlist.ports()
+    out_names = [f"O{i+1}" for i in range(len(outputs))]
+    if inputs:
+        num_rows, words, unstable = compiled.truth_table(inputs, outputs)
+    else:
+        num_rows, words, unstable = 0, [], []
+    return TruthTable([g.name for g in inputs], out_names, num_rows, words, unstable)
+
+
+# --- ПОЛЬЗОВАТЕЛЬСКИЕ БЛОКИ ---
+
+class Component:
+    """Пользовательский блок: схема со своими INPUT/OUTPUT и предвычисленная таблица.
+
+    Порты — входы и выходы схемы в порядке ports(). Для блоков с не более чем
+    LUT_MAX_INPUTS входами таблица считается один раз: байт lut[i] — упакованные
+    выходы (бит j — выход j) в строке i, первый вход — старший бит номера строки.
+    Экземпляр блока в схеме — вентиль BLOCK и по вентилю PIN на каждый выход.
+    """
+    def __init__(self, name, netlist):
+        inputs, outputs = netlist.ports()
+        if not inputs or not outputs:
+            raise ValueError("В блоке должны быть хотя бы один вход и один выход")
+        if len(outputs) > BLOCK_MAX_OUTPUTS:
+            raise ValueError(f"У блока не может быть больше {BLOCK_MAX_OUTPUTS} выходов")
+        if netlist.count('CLOCK'):
+            raise ValueError("Тактовый генератор нельзя поместить в блок")
+        self.name = name
+        self.netlist = netlist
+        self.inputs = [g.name for g in inputs]
+        self.outputs = [g.name for g in outputs]
+
+        self.compiled = CompiledNetlist(netlist, netlist.connections)
+        compiled = self.compiled
+        self.in_map = [inputs.index(g) for g in compiled.input_order]
+        self.out_pos = [compiled.position[g] for g in outputs]
+        self.key = hash((compiled.code_key(), tuple(self.in_map), tuple(self.out_pos)))
+        self.fname = f"blk_{self.key & 0xFFFFFFFFFFFF:012x}"
+
+        self.lut = None
+        if len(inputs) <= LUT_MAX_INPUTS:
+            num_rows, words, unstable = compiled.truth_table(inputs, outputs)
+            if any(unstable):
+                raise ValueError(f"Блок «{name}» колеблется — его нельзя заменить таблицей")
+            self.lut = bytes(sum(((w >> i) & 1) << j for j, w in enumerate(words)) for i in range(num_rows))
+
+    def row_value(self, index):
+        """Упакованные выходы для номера строки index"""
+        if self.lut is not None: return self.lut[index]
+        n = len(self.inputs)
+        bits = [(index >> (n - 1 - j)) & 1 for j in range(n)]
+        values, _ = self.compiled.run([bits[j] for j in self.in_map], 1)
+        return sum(values[k] << j for j, k in enumerate(self.out_pos))
+
+    def sources(self):
+        """{имя функции: исходник} для блока и вложенных в него блоков"""
+        sources = self.compiled.block_sources()
+        args = ", ".join(f"ins[{j}]" for j in self.in_map)
+        outs = ", ".join(f"n[{k}]" for k in self.out_pos)
+        lines = [self.compiled.generate_source(f"{self.fname}_body"), f"def {self.fname}(ins, m):"]
+        if self.lut is not None:
+            # Одиночный вектор — один индекс в таблице вместо вычисления блока
+            unpack = ", ".join(f"(v >> {j}) & 1" for j in range(len(self.outputs)))
+            lines = [f"{self.fname}_lut = {self.lut!r}"] + lines + [
+                "    if m == 1:",
+                "        i = 0",
+                "        for x in ins: i = i << 1 | x",
+                f"        v = {self.fname}_lut[i]",
+                f"        return ({unpack},)",
+            ]
+        lines.append(f"    n, _ = {self.fname}_body(({args},), m)")
+        lines.append(f"    return ({outs},)")
+        sources[self.fname] = "\n".join(lines) + "\n"
+        return sources
+
+
+def extract_component(name, netlist, gates):
+    """Блок из выделенных вентилей: их копии и соединения внутри выделения.
+
+    Входы и выходы выделения (INPUT/OUTPUT) становятся портами блока.
+    """
+    gates = list(gates)
+    for gate in list(gates):
+        if gate.g_type == 'BLOCK':
+            gates.extend(p for p in netlist.pins(gate) if p not in gates)
+    x0 = min((g.x for g in gates), default=0)
+    y0 = min((g.y for g in gates), default=0)
+
+    sub = Netlist()
+    copies = {}
+    for gate in gates:
+        copy = LogicGate(gate.g_type, gate.x - x0, gate.y - y0, gate.uid, gate.name, gate.extra)
+        sub.add_gate(copy)
+        copies[gate] = copy
+        if gate.g_type == 'BLOCK':
+            sub.library[gate.extra.name] = gate.extra
+    for gate in gates:
+        for idx in range(gate.arity):
+            conn = netlist.driver(gate, idx)
+            if conn is not None and conn.from_gate in copies:
+                sub.connect(Connection(copies[conn.from_gate], copies[gate], idx))
+    return Component(name, sub)
+
+
+def place_pins(netlist, block):
+    """Ставит вентили PIN блока на его правую сторону"""
+    pins = netlist.pins(block)
+    step = block.height / (len(block.extra.outputs) + 1)
+    for pin in pins:
+        pin.x = block.x + GATE_WIDTH
+        pin.y = block.y + step * (pin.extra + 1)
+    return pins
+
+
+def instantiate(netlist, component, x, y, uid):
+    """Добавляет экземпляр блока (uid, uid+1, ... — BLOCK и его PIN); возвращает (block, pins)"""
+    block = LogicGate('BLOCK', x, y, uid, component.name, component)
+    netlist.add_gate(block)
+    netlist.library.setdefault(component.name, component)
+    for j, out in enumerate(component.outputs):
+        pin = LogicGate('PIN', x, y, uid + 1 + j, out, j)
+        netlist.add_gate(pin)
+        netlist.connect(Connection(block, pin, 0))
+    return block, place_pins(netlist, block)
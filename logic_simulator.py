@@ -1,9 +1,21 @@
+import queue
+import string
+import threading
+from collections import OrderedDict
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog, simpledialog
+
+from logic_core import (
+    GATE_WIDTH, GATE_HEIGHT, CLOCK_HALF_PERIOD, SOURCE_TYPES,
+    LogicGate, Connection, Netlist, CompiledNetlist, TruthTable,
+    extract_component, instantiate, place_pins,
+)
+from exhaustive import exhaustive_words
+from netlist_io import read_any, save_circuit
+from profiling import Metrics, Profiler
+from timing import TimedSimulator
 
 # --- КОНФИГУРАЦИЯ И КОНСТАНТЫ ---
-GATE_WIDTH = 70
-GATE_HEIGHT = 50
 PORT_RADIUS = 6
 TRASH_HEIGHT = 60
 
@@ -20,12 +32,30 @@ COLOR_WIRE = "#00BFFF"   # Цвет проводов (Cyan)
 COLOR_HOVER = "#FF0000"  # Цвет при наведении на провод
 COLOR_BTN = "#555555"    # Цвет кнопок
 COLOR_BTN_ACTIVE = "#6E6E6E" # Цвет нажатой кнопки
+COLOR_UNSTABLE = "#FFAA00" # Оранжевый (Колебания в контуре)
+COLOR_BLOCK = "#3A4A6A"    # Тело пользовательского блока
+COLOR_SELECT = "#FFD700"   # Рамка выделения и выделенные вентили
 
-MAX_INPUTS = 8 
+MAX_INPUTS = 24
 MAX_OUTPUTS = 3
-
-LOGIC_TYPES_2_INPUT = ('AND', 'NAND', 'NOR', 'OR', 'XNOR', 'XOR')
-LOGIC_TYPES_1_INPUT = ('NOT',)
+INPUT_NAMES = tuple(string.ascii_uppercase[:MAX_INPUTS])
+TRUTH_CACHE_SIZE = 16     # Сколько таблиц истинности хранить в LRU-кэше
+TABLE_ROW_HEIGHT = 24     # Высота строки Treeview (пикселей)
+TABLE_MARGIN = 20         # Запас строк сверху и снизу видимого окна таблицы
+RECOMPUTE_DELAY_MS = 30   # Окно слияния быстрых правок в один пересчет
+POLL_MS = 20              # Период опроса очереди результатов фонового потока
+ZOOM_STEP = 1.15          # Множитель масштаба на один шаг колеса мыши
+MIN_SCALE = 0.1
+MAX_SCALE = 3.0
+LOD_SCALE = 0.5           # Ниже этого масштаба вентили рисуются простыми прямоугольниками
+VIEW_MARGIN = 100         # Запас (пикселей) вокруг видимой области, который тоже рисуется
+GRID_CELL = 200           # Размер ячейки пространственной сетки (мировые координаты)
+WAVE_WIDTH = 320          # Ширина панели временных диаграмм
+WAVE_ROW_HEIGHT = 30      # Высота строки диаграммы (пикселей), меньше — если строки не влезают
+WAVE_LABEL_WIDTH = 50     # Поле под имя сети слева от диаграммы
+TIMED_DURATION = 200      # Длительность прогона с задержками по умолчанию
+MAX_TIMED_DURATION = 10**7  # Верхняя граница длительности в диалоге
+METRICS_REFRESH_MS = 500  # Период обновления панели метрик
 
 # --- ШРИФТЫ ---
 # Verdana красивый, читаемый и хорошо смотрится в интерфейсах
@@ -33,8 +63,34 @@ BTN_FONT = ('Verdana', 11, 'bold')   # Крупный, жирный для кн
 HEADER_FONT = ('Verdana', 11, 'bold') # Заголовки
 TEXT_FONT = ('Verdana', 10)          # Обычный текст
 GATE_FONT = ('Verdana', 10, 'bold')  # Текст внутри блоков
+METRICS_FONT = ('Courier', 8)        # Панель метрик: мелкий моноширинный
 
 # --- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ---
+def wave_points(wave, duration, x0, k, y_low, y_high):
+    """Ломаная диаграммы сети: x = x0 + t * k.
+
+    В одном столбце пикселей остается не больше трех точек, поэтому длинная
+    диаграмма с частыми переключениями рисуется за время, пропорциональное ширине.
+    """
+    level = (y_low, y_high)
+    value = wave.initial
+    points = [x0, level[value]]
+    column, count = None, 0
+    for t in wave.times:
+        x = int(x0 + t * k)
+        value ^= 1
+        if x != column:
+            column, count = x, 0
+            points += (x, points[-1])
+        if count < 2:
+            points += (x, level[value])
+            count += 1
+        else:
+            points[-1] = level[value]
+    points += (x0 + duration * k, points[-1])
+    return points
+
+
 def create_rounded_rectangle(canvas, x1, y1, x2, y2, radius=15, **kwargs):
     """Рисует скругленный прямоугольник"""
     points = [
@@ -50,69 +106,223 @@ def create_rounded_rectangle(canvas, x1, y1, x2, y2, radius=15, **kwargs):
     ]
     return canvas.create_polygon(points, **kwargs, smooth=True)
 
-# --- КЛАССЫ ЛОГИКИ ---
-
-class LogicGate:
-    """Класс, описывающий логический блок"""
-    def __init__(self, g_type, x, y, uid, name=None):
-        self.g_type = g_type
-        self.x = x
-        self.y = y
-        self.uid = uid
-        self.name = name
-        self.value = False 
-        
-        self.rect_id = None
-        self.text_id = None
-        self.port_ids = [] 
-        
-        if g_type in LOGIC_TYPES_1_INPUT or g_type == 'OUTPUT':
-            self.inputs = [False]
-        elif g_type in LOGIC_TYPES_2_INPUT:
-            self.inputs = [False, False]
+# --- ПРОСТРАНСТВЕННЫЙ ИНДЕКС ---
+
+class SpatialGrid:
+    """Сетка корзин по мировым координатам вентилей.
+
+    Позволяет найти вентили в видимой области, не перебирая всю схему.
+    """
+    def __init__(self, cell=GRID_CELL):
+        self.cell = cell
+        self.cells = {}   # (cx, cy) -> set(LogicGate)
+        self.where = {}   # LogicGate -> (cx, cy)
+        self.max_height = GATE_HEIGHT  # Самый высокий вентиль — запас при поиске
+
+    def key(self, gate):
+        return (int(gate.x // self.cell), int(gate.y // self.cell))
+
+    def add(self, gate):
+        if gate.g_type == 'PIN': return  # Выходы блока рисуются и выбираются вместе с ним
+        self.max_height = max(self.max_height, gate.height)
+        key = self.key(gate)
+        self.cells.setdefault(key, set()).add(gate)
+        self.where[gate] = key
+
+    def remove(self, gate):
+        key = self.where.pop(gate, None)
+        if key is None: return
+        bucket = self.cells[key]
+        bucket.discard(gate)
+        if not bucket: del self.cells[key]
+
+    def move(self, gate):
+        if gate in self.where and self.where[gate] != self.key(gate):
+            self.remove(gate)
+            self.add(gate)
+
+    def query(self, x1, y1, x2, y2):
+        """Вентили, чей прямоугольник пересекает область (x1, y1)-(x2, y2)"""
+        cx1, cy1 = int((x1 - GATE_WIDTH) // self.cell), int((y1 - self.max_height) // self.cell)
+        cx2, cy2 = int(x2 // self.cell), int(y2 // self.cell)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            candidates = self.where
         else:
-            self.inputs = []
-
-    def evaluate(self):
-        v = self.inputs
-        
-        if self.g_type == 'INPUT': return self.value
-        if self.g_type == 'OUTPUT':
-            self.value = v[0]
-            return self.value
-
-        if self.g_type == 'NOT': return not v[0]
-        
-        A, B = v[0], v[1]
-        
-        if self.g_type == 'AND': return A and B
-        elif self.g_type == 'OR': return A or B
-        elif self.g_type == 'NAND': return not (A and B)
-        elif self.g_type == 'NOR': return not (A or B)
-        elif self.g_type == 'XOR': return A != B
-        elif self.g_type == 'XNOR': return A == B
+            candidates = [g for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1)
+                          for g in self.cells.get((cx, cy), ())]
+        return {g for g in candidates
+                if g.x <= x2 and g.x + g.width >= x1 and g.y <= y2 and g.y + g.height >= y1}
+
+
+# --- ТАБЛИЦА ИСТИННОСТИ ---
+
+class VirtualTable:
+    """Виртуальная таблица истинности поверх Treeview.
+
+    Строки берутся из упакованной TruthTable по требованию: в виджете живут
+    только видимое окно и запас TABLE_MARGIN строк, прокрутка управляется вручную.
+    """
+    def __init__(self, tree, scrollbar, metrics):
+        self.tree = tree
+        self.vsb = scrollbar
+        self.metrics = metrics
+        self.table = None
+        self.top = 0        # Первая видимая строка
+        self.rows = {}      # Номер строки -> iid в Treeview
+        self.start = 0      # Первая материализованная строка
+
+        self.vsb.config(command=self.on_scrollbar)
+        self.tree.bind("<Configure>", lambda e: self.render())
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_by(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+
+    def visible_rows(self):
+        # Первая строка виджета занята заголовком
+        return max(1, self.tree.winfo_height() // TABLE_ROW_HEIGHT - 1)
+
+    def set_table(self, table):
+        """Показывает таблицу; при той же форме обновляет только изменившиеся строки"""
+        old = self.table
+        if table == old: return
+        self.table = table
+
+        if old is not None and old.inputs == table.inputs and old.outputs == table.outputs:
+            changed = table.diff(old)
+            updated = 0
+            for i, iid in self.rows.items():
+                if (changed >> i) & 1:
+                    self.tree.item(iid, values=table.row(i))
+                    updated += 1
+            self.metrics.count("Treeview: обновлений", updated)
+            return
+
+        self.clear()
+        self.top = 0
+        col_names = table.inputs + [" | "] + table.outputs
+        self.tree["columns"] = col_names
         
-        return False
-
-    def get_input_pos(self, index):
-        total_inputs = len(self.inputs)
-        if total_inputs == 0: return None
-        step = GATE_HEIGHT / (total_inputs + 1)
-        py = self.y + step * (index + 1)
-        return (self.x, py)
-
-    def get_output_pos(self):
-        if self.g_type == 'OUTPUT': return None
-        return (self.x + GATE_WIDTH, self.y + GATE_HEIGHT / 2)
-
-
-class Connection:
-    """Класс, описывающий соединение"""
-    def __init__(self, from_gate, to_gate, to_idx, line_id):
-        self.from_gate = from_gate
-        self.to_gate = to_gate
-        self.to_idx = to_idx
-        self.line_id = line_id
+        for col in col_names:
+            self.tree.heading(col, text=col)
+            width = 20 if col != " | " else 10
+            self.tree.column(col, width=width, anchor="center", stretch=False)
+        self.render()
+
+    def clear(self):
+        if self.rows:
+            self.tree.delete(*self.rows.values())
+        self.rows = {}
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if self.table is None: return "break"
+        if action == "moveto":
+            self.top = int(float(amount) * self.table.num_rows)
+            self.render()
+        elif action == "scroll":
+            step = self.visible_rows() if unit == "pages" else 1
+            self.scroll_by(int(amount) * step)
+        return "break"
+
+    def scroll_by(self, delta):
+        self.top += delta
+        self.render()
+        return "break"
+
+    def render(self):
+        """Материализует окно [top - запас, top + видимые + запас) и сдвигает вид"""
+        if self.table is None: return
+        total = self.table.num_rows
+        visible = self.visible_rows()
+        self.top = max(0, min(self.top, total - visible))
+        start = max(0, self.top - TABLE_MARGIN)
+        end = min(total, self.top + visible + TABLE_MARGIN)
+
+        # Окно двигается только при выходе за запас — мелкая прокрутка ничего не создает
+        if not self.rows or self.top < self.start or min(total, self.top + visible) > self.start + len(self.rows):
+            stale = [iid for i, iid in self.rows.items() if not start <= i < end]
+            if stale: self.tree.delete(*stale)
+            self.rows = {i: iid for i, iid in self.rows.items() if start <= i < end}
+            inserted = 0
+            for i in range(start, end):
+                if i not in self.rows:
+                    self.rows[i] = self.tree.insert("", i - start, values=self.table.row(i))
+                    inserted += 1
+            self.start = start
+            self.metrics.count("Treeview: вставок", inserted)
+
+        count = len(self.rows)
+        if count:
+            self.tree.yview_moveto((self.top - self.start) / count)
+        if total:
+            self.vsb.set(self.top / total, min(1.0, (self.top + visible) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+
+# --- ФОНОВЫЕ ВЫЧИСЛЕНИЯ ---
+
+class JobCancelled(Exception):
+    """Задание устарело: схема изменилась, пока оно выполнялось"""
+
+
+class Job:
+    """Задание фонового потока: знает свое поколение и умеет сообщать о ходе работы"""
+    def __init__(self, worker, generation):
+        self.worker = worker
+        self.generation = generation
+
+    def check(self):
+        if self.generation != self.worker.generation:
+            raise JobCancelled()
+
+    def progress(self, done, total):
+        self.check()
+        self.worker.results.put((self.generation, 'progress', (done, total)))
+
+
+class SimulationWorker:
+    """Фоновый поток для вычисления схемы и таблицы истинности.
+
+    Каждое новое задание делает предыдущие устаревшими: невыполненные
+    пропускаются, выполняющиеся прерываются на ближайшей проверке.
+    Результаты складываются в очередь, которую GUI опрашивает через after().
+    """
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.generation = 0
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, func):
+        """Ставит func(job) в очередь и возвращает номер поколения"""
+        self.generation += 1
+        self.jobs.put((self.generation, func))
+        return self.generation
+
+    def loop(self):
+        while True:
+            generation, func = self.jobs.get()
+            if generation != self.generation: continue
+            job = Job(self, generation)
+            try:
+                result = func(job)
+            except JobCancelled:
+                continue
+            except Exception as e:
+                self.results.put((generation, 'error', e))
+                continue
+            self.results.put((generation, 'done', result))
+
+    def drain(self):
+        """Забирает накопившиеся результаты текущего поколения (вызывается из GUI)"""
+        while True:
+            try:
+                generation, kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if generation == self.generation:
+                yield kind, payload
 
 
 # --- ГЛАВНЫЙ КЛАСС ПРИЛОЖЕНИЯ ---
@@ -130,7 +340,7 @@ class CircuitApp:
                              foreground="white", 
                              background="#333333", 
                              font=TEXT_FONT, 
-                             rowheight=24,
+                             rowheight=TABLE_ROW_HEIGHT,
                              fieldbackground="#333333",
                              borderwidth=0)
         self.style.configure("Treeview.Heading", 
@@ -140,14 +350,38 @@ class CircuitApp:
                              borderwidth=0)
         self.style.map("Treeview", background=[('selected', '#005577')])
 
-        self.gates = []
-        self.connections = []
+        self.netlist = Netlist()
+        self.gate_items = {}      # LogicGate -> {'rect', 'text', 'ports'} на холсте
+        self.wire_items = {}      # Connection -> id линии на холсте
+        self.wire_by_item = {}    # id линии на холсте -> Connection
         self.gate_counter = 0
+        self.compiled = None      # Кэш левелизованной схемы
+        self.structure_version = 0  # Растет при каждом структурном изменении
+        self.oscillating = False
+        self.truth_cache = OrderedDict()  # Структурный ключ -> TruthTable (LRU)
+        self.input_version = 0            # Растет при каждом переключении входа
+        self.recompute_id = None          # Отложенный пересчет (id after)
+        self.worker = SimulationWorker()
+        self.timed_worker = SimulationWorker()  # Прогоны с задержками не отменяют пересчет таблицы
+        self.timed_duration = TIMED_DURATION
+        self.waveforms = None     # (подписи, TimedResult) последнего прогона с задержками
+        self.metrics = Metrics()  # Счетчики и таймеры горячих путей (копятся, пока видна панель)
+        self.metrics_id = None    # Обновление панели метрик (id after)
+        self.profiler = Profiler()
         
-        self.available_input_names = sorted(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H'])
+        self.available_input_names = list(INPUT_NAMES)
         self.used_input_names = []
-        self.drag_data = {"item": None, "x": 0, "y": 0, "type": None, "start_gate": None}
+        self.drag_data = {"item": None, "x": 0, "y": 0, "dx": 0, "dy": 0, "type": None, "start_gate": None}
         self.temp_line = None
+        self.selection = set()    # Вентили, выделенные рамкой (Shift + перетаскивание)
+
+        # Окно просмотра: экран = (мир - view) * scale
+        self.scale = 1.0
+        self.view_x = 0.0
+        self.view_y = 0.0
+        self.grid = SpatialGrid()
+        self.frame_id = None      # Отложенная перерисовка кадра (id after_idle)
+        self.full_redraw = False  # Кадр должен перерисовать сцену целиком (смена масштаба)
 
         self.setup_ui()
 
@@ -163,6 +397,7 @@ class CircuitApp:
         # Кнопки (крупные, прямоугольные)
         self.create_btn(btns_frame, "ВХОД (INPUT)", lambda: self.create_gate("INPUT"))
         self.create_btn(btns_frame, "ВЫХОД (OUTPUT)", lambda: self.create_gate("OUTPUT"))
+        self.create_btn(btns_frame, "ТАКТ (CLOCK)", lambda: self.create_gate("CLOCK"))
         
         # ЗАГОЛОВОК: Логические вентили
         tk.Label(btns_frame, text="Логические вентили", bg=COLOR_PANEL, fg="white", font=HEADER_FONT).pack(pady=(15, 8))
@@ -177,13 +412,35 @@ class CircuitApp:
 
         # ЗАГОЛОВОК: Действия
         tk.Label(btns_frame, text="Действия", bg=COLOR_PANEL, fg="white", font=HEADER_FONT).pack(pady=(15, 8))
+        self.create_btn(btns_frame, "ВРЕМЕННАЯ ДИАГРАММА", self.run_timed)
+        self.create_btn(btns_frame, "СОХРАНИТЬ БЛОК", self.save_block)
+        self.create_btn(btns_frame, "СОХРАНИТЬ СХЕМУ", self.save_scheme)
+        self.create_btn(btns_frame, "ЗАГРУЗИТЬ СХЕМУ", self.load_scheme)
         self.create_btn(btns_frame, "УДАЛИТЬ ВСЮ СХЕМУ", self.clear_all_scheme, color="#AA4444")
 
+        # ЗАГОЛОВОК: Пользовательские блоки (кнопки строит rebuild_block_buttons)
+        tk.Label(btns_frame, text="Блоки", bg=COLOR_PANEL, fg="white", font=HEADER_FONT).pack(pady=(15, 8))
+        self.blocks_frame = tk.Frame(btns_frame, bg=COLOR_PANEL)
+        self.blocks_frame.pack(fill="x")
+
         # Счетчики
         self.lbl_counters = tk.Label(self.sidebar_frame, text="", bg=COLOR_PANEL, fg="white", justify="left", font=TEXT_FONT)
         self.lbl_counters.pack(pady=15)
         self.update_counters()
 
+        # Метрики и профиль (F12 — показать/спрятать метрики)
+        metrics_row = tk.Frame(self.sidebar_frame, bg=COLOR_PANEL)
+        metrics_row.pack(fill="x")
+        self.btn_metrics = tk.Button(metrics_row, text="МЕТРИКИ", command=self.toggle_metrics,
+                                     bg=COLOR_BTN, fg="white", activebackground=COLOR_BTN_ACTIVE, relief="flat", bd=0, font=TEXT_FONT)
+        self.btn_metrics.pack(side="left", fill="x", expand=True, padx=(0, 2))
+        self.btn_profile = tk.Button(metrics_row, text="ПРОФИЛЬ", command=self.toggle_profile,
+                                     bg=COLOR_BTN, fg="white", activebackground=COLOR_BTN_ACTIVE, relief="flat", bd=0, font=TEXT_FONT)
+        self.btn_profile.pack(side="left", fill="x", expand=True, padx=(2, 0))
+        self.lbl_metrics = tk.Label(self.sidebar_frame, text="", bg=COLOR_PANEL, fg="white", justify="left",
+                                    anchor="nw", font=METRICS_FONT, wraplength=SIDEBAR_WIDTH - 10)
+        self.root.bind("<F12>", lambda e: self.toggle_metrics())
+
         # --- ПРАВАЯ ЧАСТЬ (Холст + Таблица) ---
         self.right_container = tk.Frame(self.root, bg=COLOR_PANEL)
         self.right_container.pack(side="right", fill="both", expand=True)
@@ -200,21 +457,47 @@ class CircuitApp:
         self.table_panel.pack_propagate(False)
 
         tk.Label(self.table_panel, text="Таблица\nИстинности", bg=COLOR_PANEL, fg="white", font=HEADER_FONT, justify="center").pack(pady=(0, 5))
+        self.lbl_table_status = tk.Label(self.table_panel, text="", bg=COLOR_PANEL, fg="white", font=TEXT_FONT)
+        self.lbl_table_status.pack()
         
         tt_container = tk.Frame(self.table_panel, bg="white", bd=1, relief="solid")
         tt_container.pack(fill="both", expand=True)
         
         vsb = ttk.Scrollbar(tt_container, orient="vertical")
-        self.tree = ttk.Treeview(tt_container, columns=[], show="headings", yscrollcommand=vsb.set, selectmode="none")
-        vsb.config(command=self.tree.yview)
+        self.tree = ttk.Treeview(tt_container, columns=[], show="headings", selectmode="none")
+        self.table_view = VirtualTable(self.tree, vsb, self.metrics)
         
         vsb.pack(side="right", fill="y")
         self.tree.pack(side="left", fill="both", expand=True)
 
+        # 3. Панель временных диаграмм (левее таблицы, появляется после первого прогона)
+        self.wave_panel = tk.Frame(self.right_container, width=WAVE_WIDTH, bg=COLOR_PANEL, padx=5, pady=5)
+        self.wave_panel.pack_propagate(False)
+        tk.Label(self.wave_panel, text="Временная\nдиаграмма", bg=COLOR_PANEL, fg="white", font=HEADER_FONT, justify="center").pack(pady=(0, 5))
+        self.lbl_wave_status = tk.Label(self.wave_panel, text="", bg=COLOR_PANEL, fg="white", font=TEXT_FONT)
+        self.lbl_wave_status.pack()
+        self.wave_canvas = tk.Canvas(self.wave_panel, bg=COLOR_BG, highlightthickness=0)
+        self.wave_canvas.pack(fill="both", expand=True)
+        self.wave_canvas.bind("<Configure>", lambda e: self.draw_waveforms())
+
         # Привязки событий
         self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Shift-Button-1>", self.on_select_start)
         self.canvas.bind("<B1-Motion>", self.on_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_release)
+        # Панорама — правой или средней кнопкой, масштаб — колесом
+        for button in (2, 3):
+            self.canvas.bind(f"<ButtonPress-{button}>", self.on_pan_start)
+            self.canvas.bind(f"<B{button}-Motion>", self.on_pan)
+            self.canvas.bind(f"<ButtonRelease-{button}>", self.on_pan_end)
+        self.canvas.bind("<MouseWheel>", lambda e: self.on_zoom(e, ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP))
+        self.canvas.bind("<Button-4>", lambda e: self.on_zoom(e, ZOOM_STEP))
+        self.canvas.bind("<Button-5>", lambda e: self.on_zoom(e, 1 / ZOOM_STEP))
+        # Одна привязка на тег вместо пары привязок на каждый провод
+        self.canvas.tag_bind("wire", "<Enter>", lambda e: self.canvas.itemconfig("current", fill=COLOR_HOVER))
+        self.canvas.tag_bind("wire", "<Leave>", lambda e: self.canvas.itemconfig("current", fill=COLOR_WIRE))
+
+        self.root.after(POLL_MS, self.poll_worker)
 
     def create_btn(self, parent, text, command, color=None):
         """Создает крупную прямоугольную кнопку"""
@@ -237,27 +520,63 @@ class CircuitApp:
     def resize_trash(self, event):
         self.canvas.coords(self.trash_rect, 0, event.height - TRASH_HEIGHT, event.width, event.height)
         self.canvas.coords(self.trash_text, event.width/2, event.height - TRASH_HEIGHT/2)
+        self.request_frame()
 
     def clear_all_scheme(self):
-        temp_gates = self.gates[:] 
-        for gate in reversed(temp_gates):
-            self.delete_gate(gate)
+        self.set_netlist(Netlist())
+
+    def set_netlist(self, netlist):
+        """Заменяет схему целиком: рисуется только видимая часть, одна симуляция в конце"""
+        # Удаляем всё разом по тегу — линейно, без пересчета после каждого вентиля
+        self.canvas.delete("scene")
         
-        self.gates = []
-        self.connections = []
-        self.gate_counter = 0
-        self.used_input_names = []
-        self.available_input_names = sorted(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H'])
+        # Сохраненные блоки остаются доступны и в новой схеме
+        for name, component in self.netlist.library.items():
+            netlist.library.setdefault(name, component)
+        self.netlist = netlist
+        self.selection = set()
+        self.gate_items = {}
+        self.wire_items = {}
+        self.wire_by_item = {}
+        self.gate_counter = max((g.uid for g in netlist), default=0)
+        self.invalidate_netlist()
+        self.used_input_names = sorted(g.name for g in netlist if g.g_type == 'INPUT')
+        self.available_input_names = [n for n in INPUT_NAMES if n not in self.used_input_names]
         
-        self.update_counters()
-        self.update_truth_table()
+        self.scale = 1.0
+        self.view_x = self.view_y = 0.0
+        self.grid = SpatialGrid()
+        for gate in netlist:
+            self.grid.add(gate)
+        self.render_viewport()
+        self.rebuild_block_buttons()
         
-    def create_gate(self, g_type):
-        inputs = [g for g in self.gates if g.g_type == 'INPUT']
-        outputs = [g for g in self.gates if g.g_type == 'OUTPUT']
+        self.run_simulation()
 
+    def save_scheme(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Схема", "*.json")])
+        if not path: return
+        try:
+            save_circuit(self.netlist, path)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить схему:\n{e}")
+
+    def load_scheme(self):
+        path = filedialog.askopenfilename(filetypes=[
+            ("Схемы", "*.json *.bench *.blif"), ("Схема", "*.json"),
+            ("ISCAS bench", "*.bench"), ("BLIF", "*.blif"),
+        ])
+        if not path: return
+        try:
+            netlist = read_any(path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить схему:\n{e}")
+            return
+        self.set_netlist(netlist)
+        
+    def create_gate(self, g_type):
         if g_type == 'INPUT':
-            if len(inputs) >= MAX_INPUTS:
+            if self.netlist.count('INPUT') >= MAX_INPUTS:
                 messagebox.showwarning("Лимит", f"Максимум {MAX_INPUTS} входов!")
                 return
             name = self.available_input_names.pop(0)
@@ -265,10 +584,12 @@ class CircuitApp:
             self.used_input_names.sort()
         
         elif g_type == 'OUTPUT':
-            if len(outputs) >= MAX_OUTPUTS:
+            if self.netlist.count('OUTPUT') >= MAX_OUTPUTS:
                 messagebox.showwarning("Лимит", f"Максимум {MAX_OUTPUTS} выходов!")
                 return
-            name = f"Out{len(outputs)+1}"
+            name = f"Out{self.netlist.count('OUTPUT')+1}"
+        elif g_type == 'CLOCK':
+            name = f"CLK{self.netlist.count('CLOCK')+1}"
         else:
             name = g_type
 
@@ -277,62 +598,236 @@ class CircuitApp:
         offset_x = random.randint(0, 50)
         offset_y = random.randint(0, 50)
         
-        gate = LogicGate(g_type, 100 + offset_x, 100 + offset_y, self.gate_counter, name)
-        self.gates.append(gate)
+        # Новый вентиль появляется в левом верхнем углу текущего окна просмотра
+        x, y = self.to_world(100 + offset_x, 100 + offset_y)
+        gate = LogicGate(g_type, x, y, self.gate_counter, name, CLOCK_HALF_PERIOD if g_type == 'CLOCK' else None)
+        self.netlist.add_gate(gate)
+        self.grid.add(gate)
+        self.invalidate_netlist()
         
         self.draw_gate(gate)
         self.update_counters()
         self.run_simulation()
 
-    def draw_gate(self, gate):
-        # Начальный цвет
-        color = COLOR_LOW
-        if gate.g_type not in ['INPUT', 'OUTPUT']:
-            color = COLOR_GATE
+    # --- ПОЛЬЗОВАТЕЛЬСКИЕ БЛОКИ ---
+
+    def save_block(self):
+        """Сохраняет выделенные вентили как блок библиотеки"""
+        if not self.selection:
+            messagebox.showwarning("Блок", "Выделите вентили рамкой (Shift + перетаскивание)")
+            return
+        name = simpledialog.askstring("Блок", "Имя блока:", parent=self.root)
+        if not name: return
+        if name in self.netlist.library:
+            messagebox.showwarning("Блок", f"Блок «{name}» уже есть")
+            return
+        try:
+            component = extract_component(name, self.netlist, self.selection)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", f"Не удалось создать блок:\n{e}")
+            return
+        self.netlist.library[name] = component
+        self.set_selection(set())
+        self.rebuild_block_buttons()
+
+    def rebuild_block_buttons(self):
+        for child in self.blocks_frame.winfo_children():
+            child.destroy()
+        for name, component in sorted(self.netlist.library.items()):
+            self.create_btn(self.blocks_frame, name, lambda c=component: self.create_block(c), color=COLOR_BLOCK)
+
+    def create_block(self, component):
+        """Ставит экземпляр блока: вентиль BLOCK и по PIN на каждый выход"""
+        x, y = self.to_world(100, 100)
+        block, pins = instantiate(self.netlist, component, x, y, self.gate_counter + 1)
+        self.gate_counter += 1 + len(pins)
+        self.grid.add(block)
+        self.invalidate_netlist()
+
+        self.draw_gate(block)
+        self.update_counters()
+        self.run_simulation()
+
+    def owner(self, gate):
+        """Вентиль, который рисуется на холсте: для PIN — его блок"""
+        if gate.g_type == 'PIN':
+            conn = self.netlist.driver(gate, 0)
+            return conn.from_gate if conn else gate
+        return gate
+
+    def wires_of(self, gate):
+        """Видимые провода вентиля; у блока — и провода от его выходов"""
+        conns = self.netlist.connections_of(gate)
+        if gate.g_type == 'BLOCK':
+            conns = [c for pin in self.netlist.pins(gate) for c in self.netlist.connections_of(pin)
+                     if c.from_gate is pin] + [c for c in conns if c.from_gate is not gate]
+        return conns
+
+    def set_selection(self, gates):
+        """Меняет выделение и подсвечивает рамки выделенных вентилей"""
+        old, self.selection = self.selection, gates
+        for gate in old ^ gates:
+            items = self.gate_items.get(gate)
+            if items and items['text'] is not None:
+                self.canvas.itemconfig(items['rect'], outline=COLOR_SELECT if gate in gates else "white")
+
+    # --- ОКНО ПРОСМОТРА ---
+
+    def to_screen(self, x, y):
+        return (x - self.view_x) * self.scale, (y - self.view_y) * self.scale
+
+    def to_world(self, x, y):
+        return x / self.scale + self.view_x, y / self.scale + self.view_y
+
+    def request_frame(self):
+        """Планирует перерисовку; все события до нее сливаются в один кадр"""
+        if self.frame_id is None:
+            self.frame_id = self.root.after_idle(self.flush_frame)
+
+    def flush_frame(self):
+        """Применяет накопленные перемещения, панораму и масштаб одной перерисовкой"""
+        if self.frame_id is not None:
+            self.root.after_cancel(self.frame_id)
+            self.frame_id = None
+
+        with self.metrics.timer("кадр"):
+            self.draw_frame()
+
+    def draw_frame(self):
+        """Тело кадра flush_frame (замеряется таймером «кадр»)"""
+        dx, dy = self.drag_data["dx"], self.drag_data["dy"]
+        self.drag_data["dx"] = self.drag_data["dy"] = 0
+        if self.drag_data["type"] == "gate" and (dx or dy):
+            gate = self.drag_data["item"]
+            gate.x += dx / self.scale
+            gate.y += dy / self.scale
+            if gate.g_type == 'BLOCK': place_pins(self.netlist, gate)
+            self.grid.move(gate)
+            self.canvas.move(f"gate_{gate.uid}", dx, dy)
+            self.redraw_wires_for_gate(gate)
+        elif self.drag_data["type"] in ("wire", "select"):
+            coords = self.canvas.coords(self.temp_line)
+            self.canvas.coords(self.temp_line, coords[0], coords[1], self.drag_data["x"], self.drag_data["y"])
+            self.metrics.count("canvas.coords", 2)
+        elif self.drag_data["type"] == "pan" and (dx or dy):
+            self.view_x -= dx / self.scale
+            self.view_y -= dy / self.scale
+            self.canvas.move("scene", dx, dy)
+
+        if self.full_redraw:
+            self.full_redraw = False
+            self.canvas.delete("scene")
+            self.gate_items = {}
+            self.wire_items = {}
+            self.wire_by_item = {}
+        self.render_viewport()
+
+    def render_viewport(self):
+        """Держит на холсте только вентили в видимой области (с запасом VIEW_MARGIN)"""
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        x1, y1 = self.to_world(-VIEW_MARGIN, -VIEW_MARGIN)
+        x2, y2 = self.to_world(width + VIEW_MARGIN, height + VIEW_MARGIN)
+        wanted = self.grid.query(x1, y1, x2, y2)
+        if self.drag_data["type"] == "gate":
+            wanted.add(self.drag_data["item"])
+
+        for gate in [g for g in self.gate_items if g not in wanted]:
+            self.hide_gate(gate)
+        shown = False
+        for gate in wanted:
+            if gate not in self.gate_items:
+                self.show_gate(gate)
+                shown = True
+        # Провода поверх вентилей, как при обычном рисовании
+        if shown: self.canvas.tag_raise("wire")
+
+    def show_gate(self, gate):
+        self.draw_gate(gate)
+        for conn in self.wires_of(gate):
+            if conn not in self.wire_items:
+                self.draw_wire(conn)
+
+    def hide_gate(self, gate):
+        """Убирает вентиль с холста; провод остается, пока виден хотя бы один его конец"""
+        self.canvas.delete(f"gate_{gate.uid}")
+        del self.gate_items[gate]
+        for conn in self.wires_of(gate):
+            other = conn.to_gate if self.owner(conn.from_gate) is gate else conn.from_gate
+            if self.owner(other) not in self.gate_items:
+                self.erase_wire(conn)
 
+    def draw_gate(self, gate):
+        color = self.gate_color(gate)
+        s = self.scale
         main_tag = f"gate_{gate.uid}"
-        x1, y1 = gate.x, gate.y
-        x2, y2 = gate.x + GATE_WIDTH, gate.y + GATE_HEIGHT
+        x1, y1 = self.to_screen(gate.x, gate.y)
+        x2, y2 = x1 + GATE_WIDTH * s, y1 + gate.height * s
+
+        # При сильном отдалении — простой прямоугольник без портов и подписи
+        if s < LOD_SCALE:
+            rect_id = self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="", tags=("gate", "scene", main_tag))
+            self.gate_items[gate] = {'rect': rect_id, 'text': None, 'ports': []}
+            return
 
         # СКРУГЛЕННЫЙ ПРЯМОУГОЛЬНИК
-        gate.rect_id = create_rounded_rectangle(
+        rect_id = create_rounded_rectangle(
             self.canvas, x1, y1, x2, y2,
-            radius=15, 
+            radius=15 * s, 
             fill=color, 
-            outline="white", 
+            outline=COLOR_SELECT if gate in self.selection else "white", 
             width=2, 
-            tags=("gate", main_tag)
+            tags=("gate", "scene", main_tag)
         )
         
-        label = gate.name if gate.g_type == 'INPUT' else ("OUT" if gate.g_type == 'OUTPUT' else gate.g_type)
+        label = gate.name if gate.g_type in ('INPUT', 'CLOCK', 'BLOCK') else ("OUT" if gate.g_type == 'OUTPUT' else gate.g_type)
+        font = (GATE_FONT[0], max(6, round(GATE_FONT[1] * s)), GATE_FONT[2])
         
-        gate.text_id = self.canvas.create_text(
+        text_id = self.canvas.create_text(
             (x1+x2)/2, (y1+y2)/2, text=label, fill="white",
-            font=GATE_FONT, tags=("gate", main_tag)
+            font=font, tags=("gate", "scene", main_tag)
         )
 
-        gate.port_ids = []
-        for i in range(len(gate.inputs)):
-            px, py = gate.get_input_pos(i)
+        r = PORT_RADIUS * s
+        port_ids = []
+        for i in range(gate.arity):
+            px, py = self.to_screen(*gate.get_input_pos(i))
             pid = self.canvas.create_oval(
-                px-PORT_RADIUS, py-PORT_RADIUS, px+PORT_RADIUS, py+PORT_RADIUS,
-                fill="white", outline="black", tags=("port", f"in_{gate.uid}_{i}", main_tag)
+                px-r, py-r, px+r, py+r,
+                fill="white", outline="black", tags=("port", "scene", f"in_{gate.uid}_{i}", main_tag)
             )
-            gate.port_ids.append({'id': pid, 'type': 'in', 'index': i})
+            port_ids.append({'id': pid, 'type': 'in', 'index': i})
 
         out_pos = gate.get_output_pos()
         if out_pos:
-            px, py = out_pos
+            px, py = self.to_screen(*out_pos)
             pid = self.canvas.create_oval(
-                px-PORT_RADIUS, py-PORT_RADIUS, px+PORT_RADIUS, py+PORT_RADIUS,
-                fill="black", outline="white", tags=("port", f"out_{gate.uid}", main_tag)
+                px-r, py-r, px+r, py+r,
+                fill="black", outline="white", tags=("port", "scene", f"out_{gate.uid}", main_tag)
             )
-            gate.port_ids.append({'id': pid, 'type': 'out', 'index': 0})
+            port_ids.append({'id': pid, 'type': 'out', 'index': 0})
+
+        # Выходы блока — его вентили PIN; порт несет тег PIN, чтобы тянуть от него провод
+        if gate.g_type == 'BLOCK':
+            for pin in self.netlist.pins(gate):
+                px, py = self.to_screen(*pin.get_output_pos())
+                pid = self.canvas.create_oval(
+                    px-r, py-r, px+r, py+r,
+                    fill="black", outline="white", tags=("port", "scene", f"out_{pin.uid}", main_tag)
+                )
+                port_ids.append({'id': pid, 'type': 'out', 'index': pin.extra})
+
+        self.gate_items[gate] = {'rect': rect_id, 'text': text_id, 'ports': port_ids}
 
     def delete_gate(self, gate):
-        to_remove = [c for c in self.connections if c.from_gate == gate or c.to_gate == gate]
-        for conn in to_remove:
-            self.delete_connection(conn)
+        if gate.g_type == 'BLOCK':
+            # Выходы блока удаляются вместе с ним
+            for pin in self.netlist.pins(gate):
+                for conn in self.netlist.connections_of(pin):
+                    self.remove_connection(conn)
+                self.netlist.remove_gate(pin)
+        self.selection.discard(gate)
+        for conn in self.netlist.connections_of(gate):
+            self.remove_connection(conn)
 
         if gate.g_type == 'INPUT':
             if gate.name in self.used_input_names:
@@ -341,34 +836,46 @@ class CircuitApp:
                 self.available_input_names.sort()
 
         self.canvas.delete(f"gate_{gate.uid}") 
+        self.gate_items.pop(gate, None)
+        self.grid.remove(gate)
         
-        if gate in self.gates:
-            self.gates.remove(gate)
+        if gate in self.netlist:
+            self.netlist.remove_gate(gate)
+            self.invalidate_netlist()
             
         self.update_counters()
         self.run_simulation()
 
     def delete_connection(self, conn):
-        self.canvas.delete(conn.line_id)
-        if conn in self.connections:
-            self.connections.remove(conn)
+        self.remove_connection(conn)
         self.run_simulation()
 
+    def remove_connection(self, conn):
+        """Удаляет соединение без пересчета схемы"""
+        self.erase_wire(conn)
+        if self.netlist.disconnect(conn):
+            self.invalidate_netlist()
+
     def update_counters(self):
-        cnt_in = len([g for g in self.gates if g.g_type == 'INPUT'])
-        cnt_out = len([g for g in self.gates if g.g_type == 'OUTPUT'])
-        self.lbl_counters.config(text=f"Входы: {cnt_in}/{MAX_INPUTS}\nВыходы: {cnt_out}/{MAX_OUTPUTS}")
+        cnt_in = self.netlist.count('INPUT')
+        cnt_out = self.netlist.count('OUTPUT')
+        text = f"Входы: {cnt_in}/{MAX_INPUTS}\nВыходы: {cnt_out}/{MAX_OUTPUTS}"
+        if self.oscillating:
+            text += "\nКолебания в контуре!"
+        self.lbl_counters.config(text=text)
 
     # --- ИНТЕРАКТИВНОСТЬ (Мышь) ---
 
     def on_click(self, event):
+        if self.selection: self.set_selection(set())
+
         # Удаление провода по клику
         clicked_line = self.canvas.find_withtag("current")
         if clicked_line and "wire" in self.canvas.gettags(clicked_line[0]):
-            for conn in self.connections:
-                if conn.line_id == clicked_line[0]:
-                    self.delete_connection(conn)
-                    return
+            conn = self.wire_by_item.get(clicked_line[0])
+            if conn:
+                self.delete_connection(conn)
+                return
 
         closest = self.canvas.find_closest(event.x, event.y, halo=5)
         if closest:
@@ -378,53 +885,59 @@ class CircuitApp:
             if port_tag:
                 parts = port_tag.split("_")
                 uid = int(parts[1])
-                gate = next((g for g in self.gates if g.uid == uid), None)
+                gate = self.netlist.gate(uid)
                 
                 self.drag_data["type"] = "wire"
                 self.drag_data["start_gate"] = gate
-                pos = gate.get_output_pos()
+                pos = self.to_screen(*gate.get_output_pos())
                 self.temp_line = self.canvas.create_line(pos[0], pos[1], event.x, event.y, fill=COLOR_WIRE, width=2, dash=(2,2))
                 return
 
-        for gate in self.gates:
-            if (gate.x <= event.x <= gate.x + GATE_WIDTH and
-                gate.y <= event.y <= gate.y + GATE_HEIGHT):
-                
-                if gate.g_type == 'INPUT':
-                    gate.value = not gate.value
-                    self.run_simulation()
-                
-                self.drag_data["item"] = gate
-                self.drag_data["x"] = event.x
-                self.drag_data["y"] = event.y
-                self.drag_data["type"] = "gate"
-                return
+        x, y = self.to_world(event.x, event.y)
+        for gate in self.grid.query(x, y, x, y):
+            if gate.g_type in ('INPUT', 'CLOCK'):
+                self.toggle_input(gate)
+            
+            self.drag_data["item"] = gate
+            self.drag_data["x"] = event.x
+            self.drag_data["y"] = event.y
+            self.drag_data["type"] = "gate"
+            return
 
     def on_drag(self, event):
+        # Только копим смещение: canvas.move и провода — один раз за кадр
+        self.metrics.count("on_drag")
         if self.drag_data["type"] == "gate":
-            gate = self.drag_data["item"]
-            dx = event.x - self.drag_data["x"]
-            dy = event.y - self.drag_data["y"]
-            gate.x += dx
-            gate.y += dy
-            
-            self.canvas.move(f"gate_{gate.uid}", dx, dy) 
-            
-            self.redraw_wires_for_gate(gate)
+            self.drag_data["dx"] += event.x - self.drag_data["x"]
+            self.drag_data["dy"] += event.y - self.drag_data["y"]
+        if self.drag_data["type"] in ("gate", "wire", "select"):
             self.drag_data["x"] = event.x
             self.drag_data["y"] = event.y
-
-        elif self.drag_data["type"] == "wire":
-            coords = self.canvas.coords(self.temp_line)
-            self.canvas.coords(self.temp_line, coords[0], coords[1], event.x, event.y)
+            self.request_frame()
 
     def on_release(self, event):
+        if self.drag_data["type"] in ("gate", "wire", "select"):
+            self.flush_frame()
+
+        if self.drag_data["type"] == "select":
+            x1, y1, x2, y2 = self.canvas.coords(self.temp_line)
+            self.canvas.delete(self.temp_line)
+            self.temp_line = None
+            self.drag_data["type"] = None
+            (x1, y1), (x2, y2) = self.to_world(min(x1, x2), min(y1, y2)), self.to_world(max(x1, x2), max(y1, y2))
+            # Выделяются вентили, целиком попавшие в рамку
+            self.set_selection({g for g in self.grid.query(x1, y1, x2, y2)
+                                if g.x >= x1 and g.y >= y1 and g.x + g.width <= x2 and g.y + g.height <= y2})
+            return
+
         if self.drag_data["type"] == "gate":
             gate = self.drag_data["item"]
-            if event.y > self.canvas.winfo_height() - TRASH_HEIGHT:
-                self.delete_gate(gate)
             self.drag_data["item"] = None
             self.drag_data["type"] = None
+            if event.y > self.canvas.winfo_height() - TRASH_HEIGHT:
+                self.delete_gate(gate)
+            else:
+                self.render_viewport()
 
         elif self.drag_data["type"] == "wire":
             self.canvas.delete(self.temp_line)
@@ -437,96 +950,352 @@ class CircuitApp:
                 if port_tag:
                     parts = port_tag.split("_")
                     uid, idx = int(parts[1]), int(parts[2])
-                    target = next((g for g in self.gates if g.uid == uid), None)
+                    target = self.netlist.gate(uid)
                     source = self.drag_data["start_gate"]
                     
                     if target and source and target != source:
-                        existing = next((c for c in self.connections if c.to_gate == target and c.to_idx == idx), None)
-                        if existing: self.delete_connection(existing)
+                        existing = self.netlist.driver(target, idx)
+                        if existing: self.remove_connection(existing)
                         
-                        start = source.get_output_pos()
-                        end = target.get_input_pos(idx)
-                        lid = self.canvas.create_line(start[0], start[1], end[0], end[1], fill=COLOR_WIRE, width=3, tags="wire")
-                        
-                        self.canvas.tag_bind(lid, "<Enter>", lambda e, l=lid: self.canvas.itemconfig(l, fill=COLOR_HOVER))
-                        self.canvas.tag_bind(lid, "<Leave>", lambda e, l=lid: self.canvas.itemconfig(l, fill=COLOR_WIRE))
-                        
-                        self.connections.append(Connection(source, target, idx, lid))
+                        conn = Connection(source, target, idx)
+                        self.netlist.connect(conn)
+                        self.draw_wire(conn)
+                        self.invalidate_netlist()
                         self.run_simulation()
             self.drag_data["type"] = None
 
+    def on_select_start(self, event):
+        """Shift + перетаскивание — рамка выделения вентилей для блока"""
+        if self.drag_data["type"] is not None: return
+        self.set_selection(set())
+        self.drag_data["type"] = "select"
+        self.drag_data["x"] = event.x
+        self.drag_data["y"] = event.y
+        self.temp_line = self.canvas.create_rectangle(event.x, event.y, event.x, event.y, outline=COLOR_SELECT, dash=(4, 2))
+
+    def on_pan_start(self, event):
+        if self.drag_data["type"] is not None: return
+        self.drag_data["type"] = "pan"
+        self.drag_data["x"] = event.x
+        self.drag_data["y"] = event.y
+
+    def on_pan(self, event):
+        if self.drag_data["type"] != "pan": return
+        self.drag_data["dx"] += event.x - self.drag_data["x"]
+        self.drag_data["dy"] += event.y - self.drag_data["y"]
+        self.drag_data["x"] = event.x
+        self.drag_data["y"] = event.y
+        self.request_frame()
+
+    def on_pan_end(self, event):
+        if self.drag_data["type"] != "pan": return
+        self.flush_frame()
+        self.drag_data["type"] = None
+
+    def on_zoom(self, event, factor):
+        """Масштаб относительно курсора: точка под мышью остается на месте"""
+        scale = min(MAX_SCALE, max(MIN_SCALE, self.scale * factor))
+        if scale == self.scale: return
+        x, y = self.to_world(event.x, event.y)
+        self.scale = scale
+        self.view_x = x - event.x / scale
+        self.view_y = y - event.y / scale
+        self.full_redraw = True
+        self.request_frame()
+
+    def wire_coords(self, conn):
+        sx, sy = self.to_screen(*conn.from_gate.get_output_pos())
+        ex, ey = self.to_screen(*conn.to_gate.get_input_pos(conn.to_idx))
+        return sx, sy, ex, ey
+
+    def draw_wire(self, conn):
+        width = 1 if self.scale < LOD_SCALE else max(1, 3 * self.scale)
+        lid = self.canvas.create_line(*self.wire_coords(conn), fill=COLOR_WIRE, width=width, tags=("wire", "scene"))
+        self.wire_items[conn] = lid
+        self.wire_by_item[lid] = conn
+
+    def erase_wire(self, conn):
+        line_id = self.wire_items.pop(conn, None)
+        if line_id is None: return
+        self.canvas.delete(line_id)
+        self.wire_by_item.pop(line_id, None)
+
     def redraw_wires_for_gate(self, gate):
-        for conn in self.connections:
-            if conn.from_gate == gate or conn.to_gate == gate:
-                s = conn.from_gate.get_output_pos()
-                e = conn.to_gate.get_input_pos(conn.to_idx)
-                if s and e: self.canvas.coords(conn.line_id, s[0], s[1], e[0], e[1])
+        moved = 0
+        for conn in self.wires_of(gate):
+            if conn in self.wire_items:
+                self.canvas.coords(self.wire_items[conn], *self.wire_coords(conn))
+                moved += 1
+            else:
+                self.draw_wire(conn)
+        self.metrics.count("canvas.coords", moved)
 
     # --- СИМУЛЯЦИЯ И ТАБЛИЦА ---
 
     def run_simulation(self):
-        self.simulate_logic()
-        
-        for gate in self.gates:
-            if gate.g_type in ['INPUT', 'OUTPUT']:
-                color = COLOR_HIGH if gate.value else COLOR_LOW
-                self.canvas.itemconfig(gate.rect_id, fill=color)
-        
-        self.update_truth_table()
-
-    def simulate_logic(self):
-        for gate in self.gates:
-            if gate.g_type != 'INPUT':
-                cnt = 2 if gate.g_type in LOGIC_TYPES_2_INPUT else 1
-                gate.inputs = [False] * cnt
-
-        for _ in range(len(self.gates) + 2):
-            for conn in self.connections:
-                conn.to_gate.inputs[conn.to_idx] = conn.from_gate.evaluate()
-            for gate in self.gates:
-                gate.evaluate()
-
-    def update_truth_table(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        
-        inputs_sorted = sorted([g for g in self.gates if g.g_type == 'INPUT'], key=lambda g: g.name)
-        outputs_sorted = sorted([g for g in self.gates if g.g_type == 'OUTPUT'], key=lambda g: g.uid)
-        
-        col_names = [g.name for g in inputs_sorted] + [" | "] + [f"O{i+1}" for i, g in enumerate(outputs_sorted)]
-        self.tree["columns"] = col_names
-        
-        for col in col_names:
-            self.tree.heading(col, text=col)
-            width = 20 if col != " | " else 10
-            self.tree.column(col, width=width, anchor="center", stretch=False)
-
-        if not inputs_sorted: return
+        """Планирует пересчет схемы; серия быстрых правок сливается в один пересчет"""
+        self.metrics.count("run_simulation")
+        if self.recompute_id is not None:
+            self.root.after_cancel(self.recompute_id)
+            self.metrics.count("run_simulation: слито")
+        self.recompute_id = self.root.after(RECOMPUTE_DELAY_MS, self.start_recompute)
+
+    def start_recompute(self):
+        """Отправляет левелизацию, вычисление схемы и таблицу истинности в фоновый поток.
+
+        В главном потоке снимается только снимок: вентили, соединения и
+        значения источников. CompiledNetlist строится и хэшируется в потоке.
+        """
+        self.recompute_id = None
+        metrics = self.metrics
+        version = self.structure_version
+        compiled = self.compiled
+        with metrics.timer("снимок схемы"):
+            gates = list(self.netlist)
+            connections = self.netlist.connections if compiled is None else None
+            sources = {g: int(g.value) for g in gates if g.g_type in SOURCE_TYPES}
+            inputs, outputs = self.netlist.ports()
+        input_version = self.input_version
+        cached_tables = dict(self.truth_cache)
+
+        names = [g.name for g in inputs]
+        out_names = [f"O{i+1}" for i in range(len(outputs))]
+
+        # Поток не трогает ни холст, ни вентили — только снимок схемы
+        def job(job):
+            c = compiled
+            if c is None:
+                try:
+                    with metrics.timer("левелизация"):
+                        c = CompiledNetlist(gates, connections)
+                except Exception:
+                    # Вентили удалили, пока строилась схема, — результат все равно устарел
+                    if self.structure_version != version: raise JobCancelled()
+                    raise
+                job.check()
+            with metrics.timer("прогон схемы"):
+                result = c.run([sources[g] for g in c.input_order], 1)
+            # Сгенерированный код — один проход по всем вентилям (итерации контуров не видны)
+            metrics.count("проходов")
+            metrics.count("пересчетов вентилей", len(c.order))
+            job.check()
+
+            key, t = None, None
+            if len(inputs) > MAX_INPUTS:
+                # Импортированная схема шире лимита — полную таблицу не строим
+                t = TruthTable([], [], 0, [], [])
+            else:
+                key = c.table_key(inputs, outputs)
+                t = cached_tables.get(key)
+                if t is not None: metrics.count("таблица из кэша")
+            if t is None:
+                if inputs:
+                    with metrics.timer("таблица: перебор"):
+                        num_rows, words, unstable = exhaustive_words(c, inputs, outputs, progress=job.progress)
+                else:
+                    num_rows, words, unstable = 0, [], []
+                metrics.count("строк таблицы", num_rows)
+                t = TruthTable(names, out_names, num_rows, words, unstable)
+            return version, c, input_version, result, key, t
+
+        self.worker.submit(job)
+
+    def poll_worker(self):
+        for kind, payload in self.worker.drain():
+            if kind == 'progress':
+                done, total = payload
+                self.lbl_table_status.config(text=f"Вычисление: {done}/{total}")
+            elif kind == 'error':
+                self.lbl_table_status.config(text="Ошибка вычисления")
+                messagebox.showerror("Ошибка", f"Не удалось вычислить схему:\n{payload}")
+            else:
+                self.apply_result(*payload)
+        for kind, payload in self.timed_worker.drain():
+            if kind == 'progress':
+                done, total = payload
+                self.lbl_wave_status.config(text=f"Время: {done}/{total}")
+            elif kind == 'error':
+                self.lbl_wave_status.config(text="Ошибка моделирования")
+                messagebox.showerror("Ошибка", f"Не удалось промоделировать схему:\n{payload}")
+            else:
+                self.waveforms = payload
+                labels, result = payload
+                self.lbl_wave_status.config(text=f"Событий: {result.events}, {result.elapsed:.2f} с")
+                self.draw_waveforms()
+        self.root.after(POLL_MS, self.poll_worker)
+
+    def apply_result(self, version, compiled, input_version, result, key, table):
+        if version != self.structure_version: return
+        # Пока схема строилась в потоке, переключение входа могло собрать свою —
+        # тогда входы уже сменились и значения задания не применяются
+        if self.compiled is None: self.compiled = compiled
+        with self.metrics.timer("применение результата"):
+            self.show_result(compiled, input_version, result, key, table)
+
+    def show_result(self, compiled, input_version, result, key, table):
+        # Если входы успели переключить, значения уже посчитаны событийно
+        if input_version == self.input_version:
+            self.oscillating = not compiled.apply(*result)
+            for gate in self.netlist:
+                self.paint_gate(gate)
+
+        if key is not None:
+            self.truth_cache[key] = table
+            self.truth_cache.move_to_end(key)
+            if len(self.truth_cache) > TRUTH_CACHE_SIZE:
+                self.truth_cache.popitem(last=False)
+        with self.metrics.timer("таблица: показ"):
+            self.table_view.set_table(table)
+        self.lbl_table_status.config(text="")
+        self.update_counters()
 
-        real_states = {g: g.value for g in inputs_sorted}
+    # --- ВРЕМЕННАЯ ДИАГРАММА ---
+
+    def run_timed(self):
+        """Моделирование с задержками в фоне: диаграммы входов, тактов и выходов"""
+        duration = simpledialog.askinteger(
+            "Временная диаграмма", "Длительность (единиц времени):", parent=self.root,
+            initialvalue=self.timed_duration, minvalue=1, maxvalue=MAX_TIMED_DURATION)
+        if duration is None: return
+        self.timed_duration = duration
+
+        # Схема и начальное состояние снимаются здесь; поток работает только с массивами
+        simulator = TimedSimulator(self.netlist)
+        inputs, outputs = self.netlist.ports()
+        clocks = sorted((g for g in self.netlist if g.g_type == 'CLOCK'), key=lambda g: g.name)
+        watch = inputs + clocks + outputs
+        labels = [g.name for g in inputs + clocks] + [f"O{i+1}" for i in range(len(outputs))]
+
+        def job(job):
+            return labels, simulator.run(duration, watch=watch, progress=job.progress)
+
+        self.timed_worker.submit(job)
+        if not self.wave_panel.winfo_ismapped():
+            self.wave_panel.pack(side="right", fill="y")
+        self.lbl_wave_status.config(text="Моделирование...")
+
+    def draw_waveforms(self):
+        """Рисует диаграммы последнего прогона по ширине панели"""
+        canvas = self.wave_canvas
+        canvas.delete("all")
+        if self.waveforms is None: return
+        labels, result = self.waveforms
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        row = max(12, min(WAVE_ROW_HEIGHT, (height - 20) / max(1, len(labels))))
+        x0 = WAVE_LABEL_WIDTH
+        k = (width - x0 - 10) / max(1, result.duration)
+
+        for i, (label, wave) in enumerate(zip(labels, result.waves.values())):
+            top = i * row
+            canvas.create_text(4, top + row / 2, text=label, anchor="w", fill="white", font=TEXT_FONT)
+            points = wave_points(wave, result.duration, x0, k, top + row - 4, top + 4)
+            canvas.create_line(*points, fill=COLOR_WIRE, width=1)
+
+        # Ось времени
+        axis = len(labels) * row + 4
+        canvas.create_line(x0, axis, x0 + result.duration * k, axis, fill="#888888")
+        canvas.create_text(x0, axis + 2, text="0", anchor="n", fill="white", font=TEXT_FONT)
+        canvas.create_text(x0 + result.duration * k, axis + 2, text=str(result.duration), anchor="ne", fill="white", font=TEXT_FONT)
+
+    def toggle_input(self, gate):
+        """Переключает вход и перекрашивает только вентили, чье значение изменилось"""
+        gate.value = not gate.value
+        self.input_version += 1
+        with self.metrics.timer("переключение входа"):
+            compiled = self.get_compiled()
+            work = self.work_of(compiled)
+            for changed in compiled.propagate(gate):
+                self.paint_gate(changed)
+            self.count_work(compiled, work)
+        self.oscillating = bool(compiled.unstable)
         
-        num_inputs = len(inputs_sorted)
-        for i in range(2 ** num_inputs):
-            row_vals = []
-            
-            for j in range(num_inputs):
-                val = bool((i >> (num_inputs - 1 - j)) & 1)
-                inputs_sorted[j].value = val
-                row_vals.append("1" if val else "0")
-            
-            self.simulate_logic()
-            row_vals.append("|")
-            
-            for out in outputs_sorted:
-                row_vals.append("1" if out.value else "0")
-            
-            self.tree.insert("", "end", values=row_vals)
+        # Таблица истинности зависит только от структуры — не пересчитываем
+        self.update_counters()
+
+    def gate_color(self, gate):
+        if gate.g_type == 'BLOCK':
+            return COLOR_BLOCK
+        if gate.g_type not in ['INPUT', 'OUTPUT', 'CLOCK']:
+            return COLOR_GATE
+        if self.compiled is not None and gate in self.compiled.unstable:
+            return COLOR_UNSTABLE
+        return COLOR_HIGH if gate.value else COLOR_LOW
+
+    def paint_gate(self, gate):
+        # Вентили вне окна просмотра не нарисованы — цвет возьмется при появлении
+        items = self.gate_items.get(gate)
+        if items and gate.g_type in ['INPUT', 'OUTPUT', 'CLOCK']:
+            self.canvas.itemconfig(items['rect'], fill=self.gate_color(gate))
+
+    def invalidate_netlist(self):
+        """Сбрасывает левелизованную схему после структурного изменения"""
+        self.compiled = None
+        self.structure_version += 1
+
+    def get_compiled(self):
+        if self.compiled is None:
+            self.compiled = CompiledNetlist(self.netlist, self.netlist.connections)
+        return self.compiled
+
+    # --- МЕТРИКИ И ПРОФИЛЬ ---
+
+    def work_of(self, compiled):
+        return compiled.sweeps, compiled.evaluations
+
+    def count_work(self, compiled, before):
+        """Переносит в метрики проходы и пересчеты вентилей, сделанные с момента work_of"""
+        sweeps, evaluations = before
+        self.metrics.count("проходов", compiled.sweeps - sweeps)
+        self.metrics.count("пересчетов вентилей", compiled.evaluations - evaluations)
+
+    def toggle_metrics(self):
+        """Показывает или прячет панель метрик; метрики копятся, только пока она видна"""
+        metrics = self.metrics
+        if metrics.enabled:
+            metrics.enabled = False
+            if self.metrics_id is not None:
+                self.root.after_cancel(self.metrics_id)
+                self.metrics_id = None
+            self.lbl_metrics.pack_forget()
+            self.btn_metrics.config(bg=COLOR_BTN)
+            return
+        metrics.reset()
+        metrics.enabled = True
+        self.lbl_metrics.pack(fill="x", pady=(5, 0))
+        self.btn_metrics.config(bg=COLOR_BTN_ACTIVE)
+        self.refresh_metrics()
+
+    def refresh_metrics(self):
+        self.lbl_metrics.config(text=self.metrics.report() or "Событий пока нет")
+        self.metrics_id = self.root.after(METRICS_REFRESH_MS, self.refresh_metrics)
+
+    def toggle_profile(self):
+        """Первое нажатие запускает cProfile, второе — останавливает и сохраняет в файл"""
+        if not self.profiler.running:
+            self.profiler.start()
+            self.btn_profile.config(text="СТОП", bg="#AA4444")
+            return
+        profile = self.profiler.stop()
+        self.btn_profile.config(text="ПРОФИЛЬ", bg=COLOR_BTN)
+        path = filedialog.asksaveasfilename(defaultextension=".prof", filetypes=[("Профиль cProfile", "*.prof")])
+        if not path: return
+        try:
+            profile.dump_stats(path)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить профиль:\n{e}")
+
+
+def main(profile=None):
+    """Запускает окно; profile — файл, в который пишется профиль cProfile всего сеанса"""
+    root = tk.Tk()
+    CircuitApp(root)
+    profiler = Profiler()
+    if profile: profiler.start()
+    try:
+        root.mainloop()
+    finally:
+        if profiler.running: profiler.stop(profile)
 
-        for g, val in real_states.items():
-            g.value = val
-        self.simulate_logic()
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = CircuitApp(root)
-    root.mainloop()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,379 @@
+"""Чтение и запись схем.
+
+Собственный компактный формат (.json) хранит вентили, их координаты,
+соединения и пользовательские блоки. Импорт внешних списков соединений —
+ISCAS .bench и BLIF — потоковый: файл читается построчно, схема достраивается
+по мере чтения, ссылки на еще не определенные сети откладываются до их появления.
+"""
+import json
+import re
+
+from logic_core import (
+    GATE_WIDTH, GATE_HEIGHT, GATE_TYPES, CLOCK_HALF_PERIOD,
+    LogicGate, Connection, Netlist, CompiledNetlist, Component,
+)
+
+FORMAT_VERSION = 1
+LAYOUT_STEP_X = GATE_WIDTH + 50   # Шаг по горизонтали между уровнями при авторазмещении
+LAYOUT_STEP_Y = GATE_HEIGHT + 20  # Шаг по вертикали внутри уровня
+
+
+# --- СОБСТВЕННЫЙ ФОРМАТ ---
+
+def netlist_data(netlist):
+    """Вентили [uid, тип, имя, x, y, значение(, номер выхода у PIN или полупериод у CLOCK)] и соединения [от, к, вход]"""
+    return {
+        "gates": [[g.uid, g.g_type, g.name, g.x, g.y, int(g.value)] + ([g.extra] if g.g_type in ('PIN', 'CLOCK') else [])
+                  for g in netlist],
+        "connections": [[c.from_gate.uid, c.to_gate.uid, c.to_idx] for c in netlist.connections],
+    }
+
+
+def used_components(netlist):
+    """Блоки схемы и ее библиотеки с вложенными, вложенные — раньше использующих"""
+    order, seen = [], set()
+
+    def visit(component):
+        if component.name in seen: return
+        seen.add(component.name)
+        for gate in component.netlist:
+            if gate.g_type == 'BLOCK': visit(gate.extra)
+        order.append(component)
+
+    for component in netlist.library.values():
+        visit(component)
+    for gate in netlist:
+        if gate.g_type == 'BLOCK': visit(gate.extra)
+    return order
+
+
+def save_circuit(netlist, path):
+    """Записывает схему: {"version", "gates", "connections", "components": [{"name", "gates", "connections"}]}"""
+    data = {"version": FORMAT_VERSION, **netlist_data(netlist)}
+    components = used_components(netlist)
+    if components:
+        data["components"] = [{"name": c.name, **netlist_data(c.netlist)} for c in components]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_netlist(data, library):
+    """Схема из записи netlist_data; блоки берутся из library по имени"""
+    netlist = Netlist()
+    for uid, g_type, name, x, y, value, *extra in data["gates"]:
+        if g_type not in GATE_TYPES:
+            raise ValueError(f"Неизвестный тип вентиля: {g_type}")
+        if g_type == 'BLOCK':
+            if name not in library:
+                raise ValueError(f"Неизвестный блок: {name}")
+            extra = library[name]
+            netlist.library[name] = extra
+        elif g_type == 'PIN':
+            extra = extra[0] if extra else 0
+        elif g_type == 'CLOCK':
+            extra = extra[0] if extra else CLOCK_HALF_PERIOD
+        else:
+            extra = None
+        gate = LogicGate(g_type, x, y, uid, name, extra)
+        gate.value = bool(value)
+        netlist.add_gate(gate)
+
+    for from_uid, to_uid, idx in data["connections"]:
+        src, dst = netlist.gate(from_uid), netlist.gate(to_uid)
+        if src is None or dst is None or not 0 <= idx < dst.arity:
+            raise ValueError(f"Некорректное соединение: {from_uid} -> {to_uid}[{idx}]")
+        netlist.connect(Connection(src, dst, idx))
+    return netlist
+
+
+def load_circuit(path):
+    """Читает схему, записанную save_circuit"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия файла схемы: {data.get('version')}")
+
+    library = {}
+    for entry in data.get("components", ()):
+        library[entry["name"]] = Component(entry["name"], build_netlist(entry, library))
+    netlist = build_netlist(data, library)
+    netlist.library.update(library)
+    return netlist
+
+
+def read_any(path):
+    """Загружает схему по расширению файла: .json, .bench или .blif"""
+    lower = path.lower()
+    if lower.endswith(".bench"): return read_bench(path)
+    if lower.endswith(".blif"): return read_blif(path)
+    return load_circuit(path)
+
+
+# --- ПОТОКОВАЯ СБОРКА СХЕМЫ ---
+
+class NetlistBuilder:
+    """Собирает Netlist по именованным сетям по мере чтения файла.
+
+    Сеть, которая используется раньше, чем определена, запоминается в
+    списке ожидания; соединения создаются в момент появления ее драйвера.
+    Многовходовые вентили раскладываются в деревья двухвходовых.
+    """
+    def __init__(self):
+        self.netlist = Netlist()
+        self.uid = 0
+        self.drivers = {}      # имя сети -> вентиль-драйвер
+        self.pending = {}      # имя сети -> [(вентиль, вход)] ждущие драйвера
+        self.aliases = {}      # имя сети -> [имена сетей-синонимов (BUFF)]
+        self.inverted = {}     # имя сети -> NOT над ней (общий для всех кубов BLIF)
+        self.outputs = []
+
+    def new_gate(self, g_type, name=None):
+        self.uid += 1
+        gate = LogicGate(g_type, 0, 0, self.uid, name or g_type)
+        self.netlist.add_gate(gate)
+        return gate
+
+    def drive(self, net, gate):
+        """Назначает драйвер сети и подключает всех, кто ее ждал"""
+        if net in self.drivers:
+            raise ValueError(f"Сеть {net} определена дважды")
+        self.drivers[net] = gate
+        for sink, idx in self.pending.pop(net, ()):
+            self.netlist.connect(Connection(gate, sink, idx))
+        for alias in self.aliases.pop(net, ()):
+            self.drive(alias, gate)
+
+    def use(self, net, sink, idx):
+        drv = self.drivers.get(net)
+        if drv is not None:
+            self.netlist.connect(Connection(drv, sink, idx))
+        else:
+            self.pending.setdefault(net, []).append((sink, idx))
+
+    def alias(self, net, source):
+        """net — буфер над source: та же сеть под другим именем"""
+        drv = self.drivers.get(source)
+        if drv is not None:
+            self.drive(net, drv)
+        else:
+            self.aliases.setdefault(source, []).append(net)
+
+    def add_input(self, net):
+        self.drive(net, self.new_gate('INPUT', net))
+
+    def add_output(self, net):
+        self.outputs.append(net)
+        self.use(net, self.new_gate('OUTPUT', net), 0)
+
+    def constant(self, value):
+        """Константа: неподключенные входы равны 0, поэтому AND дает 0, а NAND — 1"""
+        return self.new_gate('NAND' if value else 'AND')
+
+    def tree(self, op, operands):
+        """Сбалансированное дерево двухвходовых op над списком операндов (сеть или вентиль)"""
+        while len(operands) > 1:
+            paired = []
+            for i in range(0, len(operands) - 1, 2):
+                paired.append(self.combine(op, operands[i], operands[i + 1]))
+            if len(operands) % 2:
+                paired.append(operands[-1])
+            operands = paired
+        return operands[0]
+
+    def combine(self, g_type, a, b):
+        gate = self.new_gate(g_type)
+        self.connect_operand(a, gate, 0)
+        self.connect_operand(b, gate, 1)
+        return gate
+
+    def connect_operand(self, operand, sink, idx):
+        if isinstance(operand, LogicGate):
+            self.netlist.connect(Connection(operand, sink, idx))
+        else:
+            self.use(operand, sink, idx)
+
+    def define(self, net, g_type, operands):
+        """Определяет сеть net как g_type над операндами произвольной арности"""
+        if g_type in ('BUF', 'BUFF'):
+            if len(operands) != 1: raise ValueError(f"BUFF {net}: нужен один вход")
+            return self.finish_operand(net, operands[0])
+        if g_type == 'NOT':
+            if len(operands) != 1: raise ValueError(f"NOT {net}: нужен один вход")
+            gate = self.new_gate('NOT')
+            self.connect_operand(operands[0], gate, 0)
+            return self.drive(net, gate)
+        if g_type not in ('AND', 'OR', 'XOR', 'NAND', 'NOR', 'XNOR') or not operands:
+            raise ValueError(f"Неподдерживаемый вентиль {g_type} для сети {net}")
+
+        if len(operands) == 1:
+            if g_type in ('AND', 'OR', 'XOR'):
+                return self.finish_operand(net, operands[0])
+            return self.define(net, 'NOT', operands)
+
+        # Инвертирующий вентиль — только последний в дереве
+        base = {'NAND': 'AND', 'NOR': 'OR', 'XNOR': 'XOR'}.get(g_type, g_type)
+        half = len(operands) // 2
+        left = self.tree(base, list(operands[:half]))
+        right = self.tree(base, list(operands[half:]))
+        self.drive(net, self.combine(g_type, left, right))
+
+    def finish_operand(self, net, operand):
+        if isinstance(operand, LogicGate):
+            self.drive(net, operand)
+        else:
+            self.alias(net, operand)
+
+    def build(self):
+        """Завершает сборку: проверяет ссылки и раскладывает вентили по уровням"""
+        missing = sorted(set(self.pending) | set(self.aliases))
+        if missing:
+            raise ValueError("Неопределенные сети: " + ", ".join(missing[:10]))
+        auto_layout(self.netlist)
+        return self.netlist
+
+
+def auto_layout(netlist):
+    """Размещает вентили столбцами по логической глубине (входы слева, выходы справа)"""
+    compiled = CompiledNetlist(netlist, netlist.connections, optimize=False)
+    depth = {}
+    for members, _ in compiled.components:
+        level = 0
+        for gate in members:
+            for drv in compiled.drivers[gate]:
+                if drv is not None and drv in depth:
+                    level = max(level, depth[drv] + 1)
+        for gate in members:
+            depth[gate] = level
+
+    last = max(depth.values(), default=0) + 1
+    rows = {}
+    for gate in netlist:
+        col = last if gate.g_type == 'OUTPUT' else depth[gate]
+        row = rows.get(col, 0)
+        rows[col] = row + 1
+        gate.x = 40 + col * LAYOUT_STEP_X
+        gate.y = 40 + row * LAYOUT_STEP_Y
+
+
+def read_lines(path, continuation=None):
+    """Построчное чтение без комментариев; continuation — символ переноса строки"""
+    with open(path, encoding="utf-8") as f:
+        buffered = ""
+        for line in f:
+            line = line.split("#", 1)[0].rstrip()
+            if continuation and line.endswith(continuation):
+                buffered += line[:-1] + " "
+                continue
+            line = (buffered + line).strip()
+            buffered = ""
+            if line: yield line
+        if buffered.strip(): yield buffered.strip()
+
+
+# --- ISCAS .bench ---
+
+BENCH_PORT = re.compile(r"^(INPUT|OUTPUT)\s*\(\s*([^)\s]+)\s*\)$", re.IGNORECASE)
+BENCH_GATE = re.compile(r"^([^=\s]+)\s*=\s*(\w+)\s*\(([^)]*)\)$")
+
+
+def read_bench(path):
+    """Потоковый импорт ISCAS .bench: INPUT(x), OUTPUT(y), z = NAND(x, y)"""
+    builder = NetlistBuilder()
+    for num, line in enumerate(read_lines(path), 1):
+        m = BENCH_PORT.match(line)
+        if m:
+            kind, net = m.group(1).upper(), m.group(2)
+            if kind == 'INPUT': builder.add_input(net)
+            else: builder.add_output(net)
+            continue
+        m = BENCH_GATE.match(line)
+        if not m:
+            raise ValueError(f"{path}:{num}: не удалось разобрать строку: {line}")
+        net, g_type = m.group(1), m.group(2).upper()
+        operands = [a.strip() for a in m.group(3).split(",") if a.strip()]
+        if g_type == 'DFF':
+            raise ValueError(f"{path}:{num}: триггеры (DFF) не поддерживаются")
+        try:
+            builder.define(net, g_type, operands)
+        except ValueError as e:
+            raise ValueError(f"{path}:{num}: {e}") from None
+    return builder.build()
+
+
+# --- BLIF ---
+
+def read_blif(path):
+    """Потоковый импорт комбинационного BLIF: .inputs/.outputs/.names с покрытиями"""
+    builder = NetlistBuilder()
+    node = None   # (сеть, входные сети, кубы) текущего .names
+
+    def flush():
+        if node is not None:
+            define_cover(builder, *node)
+
+    for num, line in enumerate(read_lines(path, continuation="\\"), 1):
+        tokens = line.split()
+        if tokens[0].startswith("."):
+            flush()
+            node = None
+            cmd = tokens[0]
+            if cmd == ".inputs":
+                for net in tokens[1:]: builder.add_input(net)
+            elif cmd == ".outputs":
+                for net in tokens[1:]: builder.add_output(net)
+            elif cmd == ".names":
+                if len(tokens) < 2:
+                    raise ValueError(f"{path}:{num}: .names без выходной сети")
+                node = (tokens[-1], tokens[1:-1], [])
+            elif cmd == ".end":
+                break
+            elif cmd not in (".model", ".default_input_arrival", ".default_output_required"):
+                raise ValueError(f"{path}:{num}: директива {cmd} не поддерживается")
+            continue
+
+        if node is None:
+            raise ValueError(f"{path}:{num}: строка покрытия вне .names: {line}")
+        net, inputs, cubes = node
+        if inputs:
+            if len(tokens) != 2 or len(tokens[0]) != len(inputs):
+                raise ValueError(f"{path}:{num}: некорректный куб: {line}")
+            cubes.append((tokens[0], tokens[1]))
+        else:
+            cubes.append(("", tokens[0]))
+    flush()
+    return builder.build()
+
+
+def define_cover(builder, net, inputs, cubes):
+    """Строит сумму произведений по покрытию .names (выходной столбец 0 — инверсия)"""
+    if not cubes:
+        return builder.drive(net, builder.constant(False))
+    phase = cubes[0][1]
+    if any(out != phase for _, out in cubes) or phase not in ("0", "1"):
+        raise ValueError(f"Смешанное или некорректное покрытие сети {net}")
+
+    terms = []
+    for plane, _ in cubes:
+        literals = []
+        for bit, src in zip(plane, inputs):
+            if bit == "1":
+                literals.append(src)
+            elif bit == "0":
+                if src not in builder.inverted:
+                    inv = builder.new_gate('NOT')
+                    builder.use(src, inv, 0)
+                    builder.inverted[src] = inv
+                literals.append(builder.inverted[src])
+            elif bit != "-":
+                raise ValueError(f"Некорректный символ '{bit}' в покрытии сети {net}")
+        if not literals:
+            # Пустой куб покрывает всё пространство — константа
+            return builder.drive(net, builder.constant(phase == "1"))
+        terms.append(builder.tree('AND', literals))
+
+    if phase == "1":
+        builder.finish_operand(net, builder.tree('OR', terms))
+    elif len(terms) == 1:
+        builder.define(net, 'NOT', terms)
+    else:
+        builder.define(net, 'NOR', terms)
@@ -0,0 +1,107 @@
+"""Инструментирование: счетчики и таймеры горячих путей и захват профиля.
+
+Метрики собираются, только пока включены (панель метрик в GUI): выключенный
+счетчик или таймер — одна проверка флага. Таймер копит число вызовов,
+суммарное и наибольшее время; частоты счетчиков считаются между
+обновлениями панели. Профиль cProfile пишется в файл для pstats/snakeviz.
+"""
+import cProfile
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+_NO_TIMER = nullcontext()  # Таймер выключенных метрик: ничего не замеряет
+
+
+class Timer:
+    """Замер блока with: время уходит в Metrics.add_time"""
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.name, time.perf_counter() - self.started)
+
+
+class Metrics:
+    """Именованные счетчики и таймеры; пишутся из GUI и из фонового потока"""
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = Counter()
+            self.timers = {}            # Имя -> [вызовов, сумма, максимум] (секунды)
+            self.last = Counter()       # Счетчики на момент прошлого rates()
+            self.last_time = time.perf_counter()
+
+    def count(self, name, n=1):
+        if not self.enabled or not n: return
+        with self.lock:
+            self.counters[name] += n
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            entry = self.timers.get(name)
+            if entry is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]: entry[2] = seconds
+
+    def timer(self, name):
+        """Контекст with, замеряющий свой блок под именем name"""
+        return Timer(self, name) if self.enabled else _NO_TIMER
+
+    def rates(self):
+        """Частоты счетчиков (в секунду) с прошлого вызова"""
+        now = time.perf_counter()
+        with self.lock:
+            elapsed = now - self.last_time
+            rates = {name: (value - self.last[name]) / elapsed for name, value in self.counters.items()} if elapsed > 0 else {}
+            self.last = Counter(self.counters)
+            self.last_time = now
+        return rates
+
+    def report(self):
+        """Текст панели: счетчики с частотами, затем таймеры"""
+        rates = self.rates()
+        with self.lock:
+            counters = sorted(self.counters.items())
+            timers = sorted((name, list(entry)) for name, entry in self.timers.items())
+        lines = [f"{name}: {value} ({rates.get(name, 0):.0f}/с)" for name, value in counters]
+        for name, (calls, total, worst) in timers:
+            lines.append(f"{name}: {calls}x ср {total / calls * 1000:.1f} макс {worst * 1000:.1f} мс")
+        return "\n".join(lines)
+
+
+class Profiler:
+    """Захват профиля cProfile потока, в котором вызван start() (в GUI — главного)"""
+    def __init__(self):
+        self.profile = None
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self, path=None):
+        """Останавливает захват и возвращает профиль; path — файл, куда он сразу пишется"""
+        profile, self.profile = self.profile, None
+        profile.disable()
+        if path:
+            profile.dump_stats(path)
+        return profile
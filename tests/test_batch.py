@@ -0,0 +1,33 @@
+import pytest
+
+from batch import BatchEvaluator, parse_vectors
+from benchmarks import ripple_carry_adder
+
+
+def bits(value, width):
+    """Младший бит первым — как входы A0 A1 и выходы S0 S1 S2 в файле векторов"""
+    return "".join(str((value >> i) & 1) for i in range(width))
+
+
+def adder_lines():
+    return [f"{bits(a, 2)}{bits(b, 2)} | {bits(a + b, 3)}" for a in range(4) for b in range(4)]
+
+
+def test_evaluate_and_check():
+    evaluator = BatchEvaluator(ripple_carry_adder(2), chunk=5)  # Пачки не кратны числу векторов
+    lines = adder_lines()
+    results = list(evaluator.evaluate(parse_vectors(lines)))
+    assert [(bits_in + " | " + outputs) for _, bits_in, outputs in results] == lines
+    assert not list(evaluator.check(parse_vectors(lines)))
+    assert evaluator.checked == 16 and evaluator.mismatches == 0
+
+    lines[6] = "0110 | 100"    # 2 + 1 = 3, а не 1
+    lines[13] = "1001 | x1x"   # 1 + 2 = 3: безразличные биты не сравниваются
+    lines[14] = "0101 | 1xx"   # 2 + 2 = 4: неверен младший бит, единственный значимый
+    lines.append("0000")       # Без ожидаемых выходов — только считается
+    mismatches = list(evaluator.check(parse_vectors(lines)))
+    assert [(m.line, m.expected, m.outputs) for m in mismatches] == [(7, "100", "110"), (15, "1xx", "001")]
+    assert evaluator.checked == 16 + 17 and evaluator.mismatches == 2
+
+    with pytest.raises(ValueError):
+        list(evaluator.check(parse_vectors(["0110 | 1102"])))
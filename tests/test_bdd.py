@@ -0,0 +1,64 @@
+from benchmarks import parity_tree, ripple_carry_adder
+from bdd import BDD, FALSE, TRUE, build_bdd, build_outputs, circuit_order, parse_expr, sift, check_expression
+from netlist_io import read_bench
+
+C17 = """\
+# c17: имена сетей — числа
+INPUT(1)
+INPUT(2)
+INPUT(3)
+INPUT(6)
+INPUT(7)
+OUTPUT(22)
+OUTPUT(23)
+10 = NAND(1, 3)
+11 = NAND(3, 6)
+16 = NAND(2, 11)
+19 = NAND(11, 7)
+22 = NAND(10, 16)
+23 = NAND(16, 19)
+"""
+
+
+def read_c17(tmp_path):
+    path = tmp_path / "c17.bench"
+    path.write_text(C17)
+    return read_bench(str(path))
+
+
+def test_numeric_input_names(tmp_path):
+    netlist = read_c17(tmp_path)
+    assert check_expression(netlist, 0, "~(~(1&3) & ~(2 & ~(3&6)))") is None
+    assert check_expression(netlist, 1, "~(~(2 & ~(3&6)) & ~(~(3&6) & 7))") is None
+    # 1 и 3 — входы, а не константы: выражение разбирается, выход просто другой
+    assert check_expression(netlist, 0, "~(1&3)") is not None
+
+
+def test_constants_without_such_inputs():
+    bdd = BDD(["A", "B"])
+    assert parse_expr(bdd, "A & 0") == FALSE
+    assert parse_expr(bdd, "A | 1") == TRUE
+    assert parse_expr(bdd, "A ^ A | B & 1") == bdd.variable("B")
+
+
+def test_sift_keeps_functions():
+    netlist = ripple_carry_adder(4)
+    columns = sorted(circuit_order(netlist))  # A0..A3, B0..B3 — плохой порядок для сумматора
+    bdd = BDD(columns)
+    roots = build_outputs(bdd, netlist)
+    words, size = [bdd.word(r, columns) for r in roots], bdd.size(roots)
+    bdd, roots = sift(bdd, roots)
+    assert [bdd.word(r, columns) for r in roots] == words
+    assert bdd.size(roots) < size
+    # Менеджер после просеивания пригоден для новых операций
+    f = parse_expr(bdd, "A0 ^ B0")
+    assert bdd.word(f, columns) == bdd.word(parse_expr(bdd, "(A0 | B0) & ~(A0 & B0)"), columns)
+
+
+def test_wide_circuit_without_recursion():
+    # Глубина графа равна числу входов — больше предела рекурсии Python
+    bdd, (root,) = build_bdd(parity_tree(2000))
+    assert bdd.size([root]) == 2 * 2000 - 1
+    assert bdd.count(root) == 1 << 1999
+    small, (root,) = build_bdd(parity_tree(4))
+    assert small.word(root, ["X0", "X1", "X2", "X3"]) == 0b0110100110010110
@@ -0,0 +1,38 @@
+from benchmarks import CircuitMaker
+from logic_core import LogicGate, Connection, Netlist, Component, instantiate
+
+
+def wide_block(width):
+    """Блок «ИЛИ по width входам»"""
+    m = CircuitMaker()
+    m.outputs("O", [m.tree('OR', m.inputs("I", width))])
+    return Component("OR%d" % width, m.netlist)
+
+
+def test_block_ports_beyond_32():
+    netlist = Netlist()
+    inputs = [LogicGate('INPUT', 0, 0, 1 + i, "X%02d" % i) for i in range(40)]
+    for gate in inputs:
+        netlist.add_gate(gate)
+    block, (pin,) = instantiate(netlist, wide_block(40), 0, 0, 100)
+    for i, gate in enumerate(inputs):
+        netlist.connect(Connection(gate, block, i))
+
+    (conn,) = netlist.connections_of(inputs[35])
+    assert conn.to_gate is block and conn.to_idx == 35
+    assert all(netlist.driver(block, i).from_gate is inputs[i] for i in range(40))
+
+    netlist.remove_gate(inputs[35])
+    assert netlist.driver(block, 35) is None
+    assert netlist.driver(block, 36).from_gate is inputs[36]
+    assert len(netlist.connections_of(block)) == 39 + 1  # 39 драйверов и PIN
+
+    # Слоты удаленного блока переиспользуются без следов старых соединений
+    netlist.remove_gate(pin)
+    netlist.remove_gate(block)
+    assert all(not netlist.connections_of(g) for g in inputs if g in netlist)
+    gate = LogicGate('AND', 0, 0, 200)
+    netlist.add_gate(gate)
+    assert netlist.driver(gate, 0) is None and netlist.driver(gate, 1) is None
+    netlist.connect(Connection(inputs[0], gate, 1))
+    assert netlist.connections_of(inputs[0]) == [Connection(inputs[0], gate, 1)]
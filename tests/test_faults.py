@@ -0,0 +1,18 @@
+from faults import fault_simulate
+from test_bdd import read_c17
+
+
+def test_c17_coverage(tmp_path):
+    netlist = read_c17(tmp_path)
+    # 11 сетей и 12 входов NAND и 2 входа OUTPUT — по две неисправности на каждое место
+    report = fault_simulate(netlist)
+    assert len(report.faults) == 50 and report.num_vectors == 32
+    assert report.coverage == 1.0
+    # Сжатый тест обнаруживает все то же самое
+    assert fault_simulate(netlist, vectors=report.tests).coverage == 1.0
+    assert len(report.tests) <= 5
+
+    # Только «все нули» и «все единицы»: 29 из 50
+    report = fault_simulate(netlist, vectors=[0, 31])
+    assert len(report.detected) == 29
+    assert "7 s-a-0" in {str(f) for f in report.undetected}
@@ -0,0 +1,35 @@
+from logic_core import LogicGate, Connection, Netlist, CompiledNetlist, MAX_LOOP_ITERATIONS
+
+
+def make_ring(size):
+    """Кольцо из ИЛИ против порядка вычисления: 1 от входа X проходит по одному вентилю за проход"""
+    netlist = Netlist()
+    x = LogicGate('INPUT', 0, 0, 1, 'X')
+    gates = [LogicGate('OR', 0, 0, 2 + i) for i in range(size)]
+    out = LogicGate('OUTPUT', 0, 0, 2 + size, 'O')
+    for gate in [x] + gates + [out]:
+        netlist.add_gate(gate)
+    for i in range(size):
+        netlist.connect(Connection(gates[(i + 1) % size], gates[i], 0))
+    netlist.connect(Connection(x, gates[0], 1))
+    netlist.connect(Connection(gates[1], out, 0))
+    return netlist, x, out
+
+
+def test_loop_settling_on_last_sweep_agrees():
+    # Кольцо, которое меняется ровно MAX_LOOP_ITERATIONS проходов и сходится на контрольном,
+    # и кольца на один вентиль короче и длиннее
+    for size in (MAX_LOOP_ITERATIONS, MAX_LOOP_ITERATIONS + 1, MAX_LOOP_ITERATIONS + 2):
+        netlist, x, out = make_ring(size)
+        x.value = True
+        compiled = CompiledNetlist(netlist, netlist.connections)
+        compiled.evaluate()
+        generated = out in compiled.unstable
+
+        x.value = False
+        compiled = CompiledNetlist(netlist, netlist.connections)
+        compiled.evaluate()
+        x.value = True
+        compiled.propagate(x)   # Событийный путь: settle()
+        assert (out in compiled.unstable) == generated, size
+        assert generated == (size > MAX_LOOP_ITERATIONS + 1)
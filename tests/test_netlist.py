@@ -0,0 +1,48 @@
+from logic_core import LogicGate, Connection, Netlist
+
+
+def test_removed_gate_keeps_its_data():
+    netlist = Netlist()
+    a = LogicGate('INPUT', 10, 20, 1, 'A')
+    gate = LogicGate('NOT', 30, 40, 2)
+    for g in (a, gate):
+        netlist.add_gate(g)
+    netlist.connect(Connection(a, gate, 0))
+    row = gate.row
+
+    removed = netlist.remove_gate(gate)
+    assert gate not in netlist and gate.store is not netlist.store
+    assert (gate.g_type, gate.x, gate.y, gate.uid) == ('NOT', 30, 40, 2)
+    assert not netlist.connections_of(a)
+
+    # Строка освобождена схемой сразу и достается следующему вентилю
+    other = LogicGate('AND', 0, 0, 3)
+    netlist.add_gate(other)
+    assert other.row == row
+
+    # Отмена удаления: вентиль возвращается со своими соединениями
+    netlist.add_gate(gate)
+    for conn in removed:
+        netlist.connect(conn)
+    assert netlist.driver(gate, 0) == Connection(a, gate, 0)
+    assert netlist.gate(2) is gate
+
+
+def test_views_and_uid_index():
+    netlist = Netlist()
+    uids = [5, 1, 10**9, -3, 2]
+    for uid in uids:
+        netlist.add_gate(LogicGate('INPUT', uid, 0, uid, "I%d" % uid))
+    assert [g.uid for g in netlist] == sorted(uids)
+    assert len(netlist) == len(uids) and netlist.gate(3) is None
+
+    gate = netlist.gate(10**9)
+    assert netlist.gate(10**9) is gate and gate.x == 10**9
+    del gate
+    # Представление создается заново по строке, данные остаются в хранилище
+    assert netlist.gate(10**9).name == "I%d" % 10**9
+
+    netlist.remove_gate(netlist.gate(-3))
+    netlist.add_gate(LogicGate('NOT', 0, 0, 3000))  # Плотный индекс растет до uid 3000
+    assert [g.uid for g in netlist] == [1, 2, 5, 3000, 10**9]
+    assert netlist.gate(-3) is None and netlist.gate(3000).g_type == 'NOT'
@@ -0,0 +1,15 @@
+from benchmarks import ripple_carry_adder, carry_lookahead_adder, array_multiplier, parity_tree, random_dag
+from logic_core import CompiledNetlist
+
+
+def test_optimized_tables_match():
+    circuits = [ripple_carry_adder(6), carry_lookahead_adder(6), array_multiplier(5),
+                parity_tree(12), random_dag(300, inputs=12, seed=7)]
+    for netlist in circuits:
+        inputs, outputs = netlist.ports()
+        full = CompiledNetlist(netlist, netlist.connections, optimize=False)
+        reduced = CompiledNetlist(netlist, netlist.connections)
+        assert reduced.truth_table(inputs, outputs) == full.truth_table(inputs, outputs)
+        assert len(reduced.order) <= len(full.order)
+    # В случайной схеме есть мертвые и одинаковые вентили — сокращение действительно работает
+    assert len(reduced.order) < len(full.order)
@@ -0,0 +1,27 @@
+from logic_core import LogicGate, Connection, Netlist
+from timing import TimedSimulator
+
+
+def test_not_chain_edges():
+    # X -> НЕ -> НЕ -> НЕ -> O, задержка НЕ = 3
+    netlist = Netlist()
+    x = LogicGate('INPUT', 0, 0, 1, 'X')
+    nots = [LogicGate('NOT', 0, 0, 2 + i) for i in range(3)]
+    out = LogicGate('OUTPUT', 0, 0, 5, 'O')
+    chain = [x] + nots + [out]
+    for gate in chain:
+        netlist.add_gate(gate)
+    for a, b in zip(chain, chain[1:]):
+        netlist.connect(Connection(a, b, 0))
+
+    simulator = TimedSimulator(netlist, {'NOT': 3})
+    result = simulator.run(40, stimuli={x: [(5, 1), (20, 0), (30, 1), (31, 0)]})
+    waves = result.waves
+    assert list(waves[x].changes()) == [(5, 1), (20, 0), (30, 1), (31, 0)]
+    assert [waves[g].initial for g in nots] == [1, 0, 1]
+    assert list(waves[nots[0]].changes()) == [(8, 0), (23, 1), (33, 0), (34, 1)]
+    # Каждый НЕ сдвигает фронты на 3, импульс короче задержки не поглощается
+    assert list(waves[nots[2]].changes()) == [(14, 0), (29, 1), (39, 0), (40, 1)]
+    # OUTPUT без задержки повторяет свой вход
+    assert list(waves[out].changes()) == list(waves[nots[2]].changes())
+    assert waves[out].value_at(13) == 1 and waves[out].value_at(14) == 0
@@ -0,0 +1,207 @@
+"""Временное моделирование: задержки вентилей, тактовые генераторы, диаграммы.
+
+В отличие от CompiledNetlist (нулевые задержки, неподвижная точка), здесь
+у каждого вентиля своя задержка распространения, а время дискретно.
+Планировщик — колесо времени (timing wheel): корзина на каждый такт по
+модулю размера колеса, поэтому постановка события и выбор следующего — O(1).
+Обрабатываются только запланированные изменения значений; вентиль
+пересчитывается, лишь если изменился один из его входов.
+
+Задержка транспортная: импульс короче задержки тоже проходит на выход.
+Результат — диаграмма на каждую сеть в виде списка моментов переключений.
+"""
+import time
+from array import array
+from bisect import bisect_right
+
+from logic_core import (
+    TRUTH, INPUT_CODE, CLOCK_CODE, BLOCK_CODE, PIN_CODE, CLOCK_HALF_PERIOD,
+    LOGIC_TYPES_2_INPUT, LOGIC_TYPES_1_INPUT, CompiledNetlist,
+)
+
+# Задержки по типам вентилей (единиц времени). OUTPUT и PIN — без задержки:
+# у них нет собственной логики, а контура только из них не бывает.
+DEFAULT_DELAYS = {
+    'NOT': 1, 'NAND': 1, 'NOR': 1,
+    'AND': 2, 'OR': 2,
+    'XOR': 3, 'XNOR': 3,
+    'BLOCK': 4,
+    'OUTPUT': 0, 'PIN': 0,
+}
+PROGRESS_STEP = 4096  # Как часто (в единицах времени) сообщать о ходе прогона
+
+
+def check_delays(delays):
+    """Задержки по умолчанию с учетом delays; ValueError при недопустимых значениях"""
+    result = dict(DEFAULT_DELAYS)
+    for g_type, delay in (delays or {}).items():
+        if g_type not in result:
+            raise ValueError(f"Задержка задается только для вентилей, а не для {g_type}")
+        if not isinstance(delay, int) or delay < 0:
+            raise ValueError(f"Задержка {g_type} должна быть целым неотрицательным числом")
+        result[g_type] = delay
+    # Нулевая задержка у логики дала бы бесконечный цикл в контуре за один момент времени
+    for g_type in LOGIC_TYPES_2_INPUT + LOGIC_TYPES_1_INPUT + ('BLOCK',):
+        if result[g_type] < 1:
+            raise ValueError(f"Задержка {g_type} должна быть не меньше 1")
+    return result
+
+
+class Waveform:
+    """Диаграмма сети: начальное значение и моменты переключений (по возрастанию)"""
+    __slots__ = ('initial', 'times')
+
+    def __init__(self, initial, times):
+        self.initial = initial
+        self.times = times      # array('q')
+
+    def __len__(self):
+        return len(self.times)
+
+    def value_at(self, t):
+        """Значение сети в момент t (после всех переключений в t)"""
+        return self.initial ^ (bisect_right(self.times, t) & 1)
+
+    def changes(self):
+        """Пары (момент, новое значение)"""
+        value = self.initial
+        for t in self.times:
+            value ^= 1
+            yield t, value
+
+
+class TimedResult:
+    """Итог прогона: диаграммы наблюдаемых сетей и счетчики"""
+    def __init__(self, duration, waves, events, evaluations, elapsed):
+        self.duration = duration
+        self.waves = waves              # LogicGate -> Waveform
+        self.events = events            # Примененные изменения значений
+        self.evaluations = evaluations  # Пересчеты вентилей
+        self.elapsed = elapsed          # Секунды
+
+
+class TimedSimulator:
+    """Событийная симуляция схемы с задержками на колесе времени.
+
+    Схема (полная, без сокращения — у каждого вентиля своя диаграмма)
+    и начальное состояние снимаются в конструкторе; run() работает только
+    с массивами и годится для фонового потока.
+    """
+    def __init__(self, netlist, delays=None):
+        self.delays = check_delays(delays)
+        compiled = CompiledNetlist(netlist, netlist.connections, optimize=False)
+        self.compiled = compiled
+        order = compiled.order
+
+        self.delay = array('q', (self.delays.get(g.g_type, 0) for g in order))
+        # Полупериод тактового генератора по позиции (0 — не генератор)
+        self.half = array('q', ((g.extra or CLOCK_HALF_PERIOD) if g.g_type == 'CLOCK' else 0 for g in order))
+        horizon = max(max(self.delay, default=0), max(self.half, default=0)) + 1
+        self.wheel_size = 1 << (horizon - 1).bit_length()
+
+        # Начальное состояние — установившееся при текущих значениях входов
+        values, _ = compiled.run([int(g.value) for g in compiled.input_order], 1)
+        self.initial = list(values)
+        in_pos, in_start = compiled.in_pos, compiled.in_start
+        for p, g in enumerate(order):
+            if g.g_type == 'BLOCK':
+                # Сгенерированный код не отдает упакованное значение блока — собираем его
+                index = 0
+                for q in in_pos[in_start[p]:in_start[p + 1]]:
+                    index = index << 1 | (self.initial[q] if q >= 0 else 0)
+                self.initial[p] = g.extra.row_value(index)
+
+    def run(self, duration, watch=None, stimuli=None, progress=None):
+        """Моделирует интервал [0, duration].
+
+        watch — вентили, для которых пишутся диаграммы (по умолчанию все, кроме BLOCK);
+        stimuli — {вход: [(момент, значение), ...]} для изменения входов по ходу прогона;
+        progress(момент, duration) вызывается каждые PROGRESS_STEP единиц времени.
+        """
+        compiled = self.compiled
+        position = compiled.position
+        kinds, in_pos, in_start = compiled.kinds, compiled.in_pos, compiled.in_start
+        sinks, sink_start, extra = compiled.sinks, compiled.sink_start, compiled.extra
+        delay, half, truth = self.delay, self.half, TRUTH
+        n = len(compiled.order)
+        size = self.wheel_size
+        mask = size - 1
+        started = time.perf_counter()
+
+        # Лишний ноль в конце: позиция -1 (неподключенный вход) читает 0 без ветвления
+        values = self.initial + [0]
+        projected = values[:]   # Последнее запланированное значение сети
+        mark = [-1] * n         # Номер дельта-цикла, в котором вентиль уже поставлен на пересчет
+        wheel = [[] for _ in range(size)]  # Корзина: плоский список позиция, значение, ...
+
+        if watch is None:
+            watch = [g for g in compiled.order if g.g_type != 'BLOCK']
+        traces = [None] * n
+        for gate in watch:
+            traces[position[gate]] = array('q')
+
+        for p in range(n):
+            if half[p]:
+                wheel[half[p] & mask] += (p, values[p] ^ 1)
+                projected[p] = values[p] ^ 1
+        pending = sorted((t, position[g], int(v)) for g, changes in (stimuli or {}).items()
+                         for t, v in changes if 0 <= t <= duration)
+        next_stimulus = 0
+
+        # В момент 0 пересчитываются все вентили: контур без неподвижной точки
+        # (генератор из нечетного числа НЕ) начинает колебаться сам
+        touched = [q for q in range(n) if kinds[q] != INPUT_CODE and kinds[q] != CLOCK_CODE]
+        events = evaluations = delta = 0
+        for t in range(duration + 1):
+            slot = t & mask
+            while next_stimulus < len(pending) and pending[next_stimulus][0] == t:
+                _, p, v = pending[next_stimulus]
+                wheel[slot] += (p, v)
+                projected[p] = v
+                next_stimulus += 1
+            bucket = wheel[slot]
+            # Дельта-циклы: события с нулевой задержкой попадают в ту же корзину
+            while bucket or touched:
+                wheel[slot] = []
+                delta += 1
+                for i in range(0, len(bucket), 2):
+                    p = bucket[i]
+                    v = bucket[i + 1]
+                    if values[p] == v: continue
+                    values[p] = v
+                    events += 1
+                    trace = traces[p]
+                    if trace is not None: trace.append(t)
+                    h = half[p]
+                    if h:
+                        wheel[(t + h) & mask] += (p, v ^ 1)
+                        projected[p] = v ^ 1
+                    for q in sinks[sink_start[p]:sink_start[p + 1]]:
+                        if mark[q] != delta:
+                            mark[q] = delta
+                            touched.append(q)
+
+                evaluations += len(touched)
+                for q in touched:
+                    kind = kinds[q]
+                    s = in_start[q]
+                    if kind == BLOCK_CODE:
+                        index = 0
+                        for d in in_pos[s:in_start[q + 1]]:
+                            index = index << 1 | values[d]
+                        v = extra[q].row_value(index)
+                    elif kind == PIN_CODE:
+                        v = (values[in_pos[s]] >> extra[q]) & 1
+                    else:
+                        v = (truth[kind] >> (values[in_pos[s]] << 1 | values[in_pos[s + 1]])) & 1
+                    if v != projected[q]:
+                        projected[q] = v
+                        wheel[(t + delay[q]) & mask] += (q, v)
+                touched = []
+                bucket = wheel[slot]
+
+            if progress and t % PROGRESS_STEP == 0:
+                progress(t, duration)
+
+        waves = {g: Waveform(self.initial[position[g]], traces[position[g]]) for g in watch}
+        return TimedResult(duration, waves, events, evaluations, time.perf_counter() - started)